@@ -0,0 +1,160 @@
+import os
+import queue
+import tempfile
+import threading
+
+from profiler import callback_name, profiler
+
+# Background jobs for the Tk front ends.
+#
+# Jobs run one after another on a single worker thread, typically against
+# a DocumentSnapshot so the user can keep editing. The worker never touches
+# Tk: progress, results and errors are put on a queue that the Tk thread
+# drains with after() while jobs are outstanding.
+
+
+def _read_umask():
+    # os.umask can only be read by setting it, so do it once at import
+    # time, on the main thread, rather than from the worker
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _read_umask()
+
+
+def atomic_write(path, write, encoding="utf-8"):
+    """Call write(fp) on a temp file next to path, then rename it over path.
+
+    Readers see either the old or the complete new file, and a failed
+    write leaves the old file untouched. The new file gets the mode of
+    the file it replaces, or the umask default for a new file, as
+    open(path, "w") would.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with profiler.span(f"write {os.path.basename(path)}", "io"):
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+        try:
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.chmod(temp_path, mode)
+            with os.fdopen(fd, "w", encoding=encoding) as fp:
+                write(fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+
+def counted(iterable, progress, every=1000):
+    # Pass items through, calling progress(count) every `every` items
+    count = 0
+    for item in iterable:
+        yield item
+        count += 1
+        if count % every == 0:
+            progress(count)
+    progress(count)
+
+
+class Job:
+    __slots__ = ("run", "on_start", "on_progress", "on_done", "on_error")
+
+    def __init__(self, run, on_start=None, on_progress=None, on_done=None, on_error=None):
+        self.run = run
+        self.on_start = on_start
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+
+
+class BackgroundWorker:
+    """Single worker thread whose callbacks run on the Tk thread.
+
+    submit(run, ...) queues run(progress) for the worker; progress(done)
+    may be called from the job to report how far it got. on_start(),
+    on_progress(done), on_done(result) and on_error(exception) are called
+    from the Tk event loop of `widget`.
+    """
+
+    def __init__(self, widget, poll_ms=50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.pending = 0
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._poll_id = None
+        self._thread = threading.Thread(target=self._run, name="background-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def submit(self, run, on_start=None, on_progress=None, on_done=None, on_error=None):
+        job = Job(run, on_start, on_progress, on_done, on_error)
+        self.pending += 1
+        self._jobs.put(job)
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+        return job
+
+    def close(self):
+        # Let queued jobs finish (e.g. a save in progress), then stop
+        self._jobs.put(None)
+        self._thread.join()
+        self._poll()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            self._results.put((job, "start", None))
+
+            def progress(done, job=job):
+                self._results.put((job, "progress", done))
+
+            try:
+                with profiler.span(callback_name(job.run), "background"):
+                    result = job.run(progress)
+            except Exception as e:
+                self._results.put((job, "error", e))
+            else:
+                self._results.put((job, "done", result))
+
+    def _poll(self):
+        self._poll_id = None
+        latest_progress = {}
+        while True:
+            try:
+                job, kind, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                # Only the newest progress of a job matters
+                latest_progress[job] = value
+                continue
+            if latest_progress.get(job) is not None and job.on_progress:
+                job.on_progress(latest_progress.pop(job))
+            if kind == "start":
+                if job.on_start:
+                    job.on_start()
+            else:
+                self.pending -= 1
+                callback = job.on_done if kind == "done" else job.on_error
+                if callback:
+                    callback(value)
+        for job, done in latest_progress.items():
+            if job.on_progress:
+                job.on_progress(done)
+        if self.pending and self._poll_id is None:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
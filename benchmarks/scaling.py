@@ -0,0 +1,428 @@
+"""Scaling benchmarks for the designer core at 10, 1k, 10k and 100k elements.
+
+The core tier needs no display: it runs against the Document model,
+html_export and project_file directly, i.e. the code behind element
+insertion, generate_html/export_html and save/load in both front ends.
+The ui tier (--ui) drives a real WebDesignApp and WebDesignerApp for
+insertion, selection and properties-panel refresh; it needs a display,
+or use --xvfb to run the whole suite under xvfb-run.
+
+    python benchmarks/scaling.py [--sizes 10,1000,...] [--repeat N]
+                                 [--ui | --xvfb] [--json FILE]
+                                 [--baseline FILE] [--tolerance 1.5]
+
+Each time is the best of --repeat runs. The exit status is 1 if a
+benchmark grows faster with the element count than it should, or (with
+--baseline, a JSON file of an earlier run) got slower by more than
+--tolerance times.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import background  # noqa: E402
+import html_export  # noqa: E402
+import project_file  # noqa: E402
+from document import Document, TEMPLATES  # noqa: E402
+from layout import RowLayout  # noqa: E402
+
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+
+# Times below this are mostly timer and interpreter noise; they are
+# reported but not used for scaling or regression checks
+NOISE_FLOOR = 0.002
+
+# Allowed excess of the measured growth exponent over the expected one
+EXPONENT_SLACK = 0.35
+
+# Selections and panel refreshes timed per ui measurement
+UI_OPERATIONS = 50
+
+# WebDesignerApp's widgets mode embeds one Frame per element, so larger
+# documents take minutes to build and are skipped
+FREEFORM_WIDGETS_LIMIT = 10000
+
+_FLOW_TYPES = TEMPLATES["Landing Page"]
+_FREEFORM_TYPES = ("header", "paragraph", "button", "image")
+
+
+def flow_items(n):
+    return [{"type": type_} for type_ in itertools.islice(itertools.cycle(_FLOW_TYPES), n)]
+
+
+def freeform_items(n):
+    # Same shape as WebDesignerApp.add_element creates
+    items = []
+    for i, type_ in zip(range(n), itertools.cycle(_FREEFORM_TYPES)):
+        styles = {"bg_color": "white", "text_color": "black", "padding": 10, "margin": 5,
+                  "border_radius": 0, "font_size": 24 if type_ == "header" else 14}
+        items.append({"type": type_, "content": f"{type_} {i}", "styles": styles,
+                      "x": 100, "y": 30 + 80 * i})
+    return items
+
+
+def flow_document(n):
+    document = Document()
+    document.add_elements(flow_items(n))
+    return document
+
+
+class NullWriter:
+    def writelines(self, lines):
+        for _ in lines:
+            pass
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+class Benchmark:
+    """One measurement; run(n, workdir) returns the seconds of one trial.
+
+    expected is the exponent of the growth with n that the operation
+    should have (1 for linear, 0 for constant).
+    """
+
+    def __init__(self, name, tier, run, expected=1, unit="seconds", max_size=None):
+        self.name = name
+        self.tier = tier
+        self.run = run
+        self.expected = expected
+        self.unit = unit
+        self.max_size = max_size
+
+
+# -- core tier ------------------------------------------------------------------
+
+def bench_insert(n, workdir):
+    # One element per call, as the toolbox buttons do
+    document = Document()
+    types = list(itertools.islice(itertools.cycle(_FLOW_TYPES), n))
+
+    def run():
+        for type_ in types:
+            document.add_element(type_)
+    return timed(run)
+
+
+def bench_insert_many(n, workdir):
+    items = flow_items(n)
+    return timed(lambda: Document().add_elements(items))
+
+
+def bench_generate_html(n, workdir):
+    document = flow_document(n)
+    return timed(lambda: html_export.generate_html(document))
+
+
+def bench_generate_html_cached(n, workdir):
+    # Repeated export with an unchanged document (preview, re-export)
+    document = flow_document(n)
+    cache = html_export.FragmentCache(document)
+    html_export.write_html(document, NullWriter(), cache)
+    return timed(lambda: html_export.generate_html(document, cache))
+
+
+def bench_export_html(n, workdir):
+    # What the export job does: a snapshot streamed into a temp file
+    document = flow_document(n)
+    path = os.path.join(workdir, "export.html")
+
+    def run():
+        snapshot = document.snapshot()
+        background.atomic_write(path, lambda fp: html_export.write_html(snapshot, fp))
+    return timed(run)
+
+
+def bench_export_minified(n, workdir):
+    document = flow_document(n)
+    path = os.path.join(workdir, "export.min.html")
+    return timed(lambda: background.atomic_write(
+        path, lambda fp: html_export.write_html(document, fp, minify=True)))
+
+
+def bench_export_freeform(n, workdir):
+    document = Document()
+    document.add_elements(freeform_items(n))
+    path = os.path.join(workdir, "freeform.html")
+    return timed(lambda: background.atomic_write(
+        path, lambda fp: html_export.write_freeform_html(document, fp)))
+
+
+def bench_layout_edits(n, workdir):
+    # Canvas row bookkeeping for edits at the front and for moves across
+    # the whole document, the worst case for shifting rows
+    layout = RowLayout([40] * n)
+
+    def run():
+        for _ in range(UI_OPERATIONS):
+            layout.insert(0, 40)
+            layout.pop(0)
+            layout.move(0, n - 1)
+            layout.move(n - 1, 0)
+    return timed(run)
+
+
+def bench_save(n, workdir):
+    document = flow_document(n)
+    path = os.path.join(workdir, "save.wdp")
+    return timed(lambda: background.atomic_write(
+        path, lambda fp: project_file.write_project(document.snapshot(), fp)))
+
+
+def bench_load(n, workdir):
+    path = os.path.join(workdir, "load.wdp")
+    project_file.save_project(flow_document(n), path)
+    return timed(lambda: project_file.load_project(path))
+
+
+# -- ui tier --------------------------------------------------------------------
+
+class _FlowApp:
+    # A WebDesignApp that has finished its deferred startup
+    def __init__(self, workdir):
+        import tkinter as tk
+        import journal
+        import web_designer
+
+        # Keep the benchmark away from a real untitled session's journal
+        journal.JOURNAL_DIR = workdir
+        self.root = tk.Tk()
+        self.app = web_designer.WebDesignApp(self.root)
+        deadline = time.perf_counter() + 10
+        while self.app.startup_time is None and time.perf_counter() < deadline:
+            self.root.update()
+
+    def __enter__(self):
+        return self.app
+
+    def __exit__(self, *exc_info):
+        self.app.worker.close()
+        self.app.journal.close(discard=True)
+        self.root.destroy()
+
+
+def _filled_flow_app(n, workdir):
+    flow = _FlowApp(workdir)
+    with flow.app.batch_update():
+        flow.app.document.add_elements(flow_items(n))
+    flow.root.update()
+    return flow
+
+
+def _spread(document, count):
+    # count elements spread over the whole document
+    elements = document.elements
+    step = max(1, len(elements) // count)
+    return [elements[i % len(elements)] for i in range(0, step * count, step)]
+
+
+def bench_ui_insert(n, workdir):
+    # Until the canvas shows the new rows
+    with _FlowApp(workdir) as app:
+        items = flow_items(n)
+
+        def run():
+            with app.batch_update():
+                app.document.add_elements(items)
+            app.root.update()
+        return timed(run)
+
+
+def bench_ui_select(n, workdir):
+    with _filled_flow_app(n, workdir) as app:
+        targets = _spread(app.document, UI_OPERATIONS)
+
+        def run():
+            for element in targets:
+                app.select_element(element)
+                app.root.update_idletasks()
+        return timed(run)
+
+
+def bench_ui_properties(n, workdir):
+    with _filled_flow_app(n, workdir) as app:
+        app.select_element(app.document.elements[n // 2])
+
+        def run():
+            for _ in range(UI_OPERATIONS):
+                app.update_properties_panel()
+                app.root.update_idletasks()
+        return timed(run)
+
+
+def bench_ui_freeform_insert(n, workdir, render_mode="items"):
+    import tkinter as tk
+    import main
+
+    root = tk.Tk()
+    try:
+        app = main.WebDesignerApp(root, render_mode)
+        root.update()
+        items = freeform_items(n)
+
+        def run():
+            app.document.add_elements(items)
+            root.update()
+        return timed(run)
+    finally:
+        root.destroy()
+
+
+BENCHMARKS = [
+    Benchmark("insert", "core", bench_insert),
+    Benchmark("insert_many", "core", bench_insert_many),
+    Benchmark("generate_html", "core", bench_generate_html),
+    Benchmark("generate_html_cached", "core", bench_generate_html_cached),
+    Benchmark("export_html", "core", bench_export_html),
+    Benchmark("export_minified", "core", bench_export_minified),
+    Benchmark("export_freeform", "core", bench_export_freeform),
+    Benchmark("layout_edits", "core", bench_layout_edits, expected=0,
+              unit=f"seconds per {UI_OPERATIONS} rounds of edits"),
+    Benchmark("save", "core", bench_save),
+    Benchmark("load", "core", bench_load),
+    Benchmark("ui_insert", "ui", bench_ui_insert),
+    Benchmark("ui_select", "ui", bench_ui_select, expected=0,
+              unit=f"seconds per {UI_OPERATIONS} selections"),
+    Benchmark("ui_properties", "ui", bench_ui_properties, expected=0,
+              unit=f"seconds per {UI_OPERATIONS} refreshes"),
+    Benchmark("ui_freeform_insert", "ui", bench_ui_freeform_insert),
+    Benchmark("ui_freeform_insert_widgets", "ui",
+              lambda n, workdir: bench_ui_freeform_insert(n, workdir, "widgets"),
+              max_size=FREEFORM_WIDGETS_LIMIT),
+]
+
+
+# -- analysis -------------------------------------------------------------------
+
+def growth_exponent(times):
+    """Exponent k of time ~ n**k between the two largest measurable sizes."""
+    points = sorted((n, t) for n, t in times.items() if t >= NOISE_FLOOR)
+    if len(points) < 2:
+        return None
+    (n1, t1), (n2, t2) = points[-2:]
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+
+def find_problems(results, baseline=None, tolerance=1.5):
+    problems = []
+    for name, result in results.items():
+        exponent = result["exponent"]
+        if exponent is not None and exponent > result["expected_exponent"] + EXPONENT_SLACK:
+            problems.append(f"{name}: grows as n^{exponent:.2f}, expected n^{result['expected_exponent']}")
+        previous = (baseline or {}).get(name)
+        if not previous:
+            continue
+        for size, seconds in result["times"].items():
+            old = previous["times"].get(size)
+            if old is not None and old >= NOISE_FLOOR and seconds > old * tolerance:
+                problems.append(f"{name} at {size} elements: {seconds:.4f}s, was {old:.4f}s")
+    return problems
+
+
+# -- driver ---------------------------------------------------------------------
+
+def run_suite(benchmarks, sizes, repeat, report=print):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="wd-bench-") as workdir:
+        for benchmark in benchmarks:
+            times = {}
+            for n in sizes:
+                if benchmark.max_size is not None and n > benchmark.max_size:
+                    continue
+                times[n] = min(benchmark.run(n, workdir) for _ in range(repeat))
+                report(f"{benchmark.name:>22} {n:>8}: {times[n] * 1000:10.2f} ms")
+            results[benchmark.name] = {
+                "tier": benchmark.tier,
+                "unit": benchmark.unit,
+                "expected_exponent": benchmark.expected,
+                "times": {str(n): t for n, t in times.items()},
+                "exponent": growth_exponent(times),
+            }
+    return results
+
+
+def rerun_under_xvfb(argv):
+    xvfb_run = shutil.which("xvfb-run")
+    if xvfb_run is None:
+        print("xvfb-run not found", file=sys.stderr)
+        return 1
+    argv = [arg for arg in argv if arg != "--xvfb"] + ["--ui"]
+    return subprocess.call([xvfb_run, "-a", sys.executable, os.path.abspath(__file__)] + argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated element counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ui", action="store_true", help="also run the Tk benchmarks (needs a display)")
+    parser.add_argument("--xvfb", action="store_true", help="run everything under xvfb-run, with --ui")
+    parser.add_argument("--only", metavar="NAMES", help="comma-separated benchmark names")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="allowed slowdown factor against the baseline")
+    args = parser.parse_args(argv)
+
+    if args.xvfb:
+        return rerun_under_xvfb(argv)
+
+    if args.ui:
+        import tkinter as tk
+        try:
+            tk.Tk().destroy()
+        except tk.TclError as e:
+            print(f"ui benchmarks could not run: {e}", file=sys.stderr)
+            return 1
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    tiers = ("core", "ui") if args.ui else ("core",)
+    benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.tier in tiers]
+    if args.only:
+        names = set(args.only.split(","))
+        benchmarks = [benchmark for benchmark in benchmarks if benchmark.name in names]
+
+    results = run_suite(benchmarks, sizes, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fp:
+            baseline = json.load(fp)["results"]
+    problems = find_problems(results, baseline, args.tolerance)
+
+    for name, result in results.items():
+        if result["exponent"] is not None:
+            print(f"{name:>22}: ~n^{result['exponent']:.2f}")
+    for problem in problems:
+        print(f"PROBLEM {problem}", file=sys.stderr)
+
+    if args.json:
+        meta = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "sizes": sizes,
+        }
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump({"meta": meta, "results": results, "problems": problems}, fp, indent=2)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Cold-start benchmark for the flow designer (web_designer.py).
+
+Every run starts a fresh interpreter, imports the app, builds the main
+window and spins the event loop until the first paint and until the
+deferred startup work is done. Times are seconds since the interpreter
+began importing the app.
+
+    python benchmarks/startup.py [--runs N] [--json FILE]
+
+Needs a display (e.g. run under xvfb-run on a headless machine).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line
+CHILD = r"""
+import json, shutil, sys, tempfile, time
+start = time.perf_counter()
+import tkinter as tk
+import web_designer
+imported = time.perf_counter()
+# Keep the user's journals out of it: an orphaned one would open the
+# modal recovery dialog and stall the run until the timeout
+import journal
+journal.JOURNAL_DIR = tempfile.mkdtemp(prefix="wd-startup-")
+root = tk.Tk()
+app = web_designer.WebDesignApp(root)
+built = time.perf_counter()
+deadline = built + 10
+while app.startup_time is None and time.perf_counter() < deadline:
+    root.update()
+print(json.dumps({
+    "import": imported - start,
+    "construct": built - imported,
+    "first_paint": app.first_paint_time - start if app.first_paint_time else None,
+    "startup_complete": app.startup_time - start if app.startup_time else None,
+}))
+app.exit_app()
+root.destroy()
+shutil.rmtree(journal.JOURNAL_DIR, ignore_errors=True)
+"""
+
+METRICS = ("import", "construct", "first_paint", "startup_complete")
+
+
+def run_once():
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, capture_output=True, text=True,
+                            timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run[metric] is not None]
+        if values:
+            summary[metric] = {"median": statistics.median(values), "min": min(values)}
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        runs = [run_once() for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"startup benchmark could not run: {e}", file=sys.stderr)
+        return 1
+
+    summary = summarize(runs)
+    for metric, values in summary.items():
+        print(f"{metric:>17}: median {values['median'] * 1000:8.1f} ms   min {values['min'] * 1000:8.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump({"runs": runs, "summary": summary}, fp, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
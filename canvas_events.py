@@ -0,0 +1,73 @@
+import tkinter as tk
+
+# Delegated mouse handling and drag feedback for the design canvases.
+#
+# Instead of binding a closure per element widget, every widget of an
+# element (the row frame and all of its children) gets one shared bind tag.
+# The handlers are bound to that tag once per application with bind_class,
+# and find the element under the pointer from the event's screen
+# coordinates through the front end's hit-test index. Clicks on any child
+# widget (labels, text fields, buttons) reach the same handler.
+
+
+def add_bindtag(widget, tag):
+    """Give widget and all of its descendants the bind tag `tag`.
+
+    The tag goes right after the widget's own tag, so its handlers run
+    before the class bindings (e.g. a Text's cursor placement).
+    """
+    tags = widget.bindtags()
+    if tag not in tags:
+        widget.bindtags(tags[:1] + (tag,) + tags[1:])
+    for child in widget.winfo_children():
+        add_bindtag(child, tag)
+
+
+def canvas_point(canvas, event):
+    # Canvas coordinates of the pointer, whichever widget got the event
+    return (canvas.canvasx(event.x_root - canvas.winfo_rootx()),
+            canvas.canvasy(event.y_root - canvas.winfo_rooty()))
+
+
+class OutlineGhost:
+    """Outline and insertion marker shown over a canvas while dragging.
+
+    Canvas window items are always drawn above other canvas items, so the
+    outline is made of four thin frames (and the marker of one) placed
+    over the canvas from its parent instead. They are created on first
+    use and only moved afterwards. Coordinates are relative to the
+    visible canvas area.
+    """
+
+    def __init__(self, canvas, color, thickness=2):
+        self.canvas = canvas
+        self.color = color
+        self.thickness = thickness
+        self._bars = None
+        self._marker = None
+
+    def _create(self):
+        parent = self.canvas.master
+        self._bars = [tk.Frame(parent, bg=self.color, bd=0, highlightthickness=0) for _ in range(4)]
+        self._marker = tk.Frame(parent, bg=self.color, bd=0, highlightthickness=0)
+
+    def show(self, x, y, width, height):
+        if self._bars is None:
+            self._create()
+        t = self.thickness
+        top, bottom, left, right = self._bars
+        top.place(in_=self.canvas, x=x, y=y, width=width, height=t)
+        bottom.place(in_=self.canvas, x=x, y=y + height - t, width=width, height=t)
+        left.place(in_=self.canvas, x=x, y=y, width=t, height=height)
+        right.place(in_=self.canvas, x=x + width - t, y=y, width=t, height=height)
+
+    def show_marker(self, x, y, width):
+        if self._marker is None:
+            self._create()
+        self._marker.place(in_=self.canvas, x=x, y=y - self.thickness, width=width,
+                           height=2 * self.thickness)
+
+    def hide(self):
+        if self._bars is not None:
+            for widget in self._bars + [self._marker]:
+                widget.place_forget()
@@ -0,0 +1,610 @@
+import itertools
+import sys
+import weakref
+
+# Tk-free document model shared by the designer front ends.
+#
+# The GUI never owns element data; it subscribes to a Document and mirrors
+# whatever the model reports. Exports, validation and batch jobs can import
+# this module (and html_export) without a Tk interpreter.
+
+DEFAULT_SETTINGS = {
+    "bg_color": "#ffffff",
+    "font_family": "Arial",
+    "accent_color": "#3498db",
+}
+
+# Default content and styles for each element type of the flow designer
+# (web_designer.py). A content of None means the element has no text.
+ELEMENT_DEFAULTS = {
+    "header": ("New Header", {
+        "font_size": 18,
+        "font_weight": "bold",
+        "color": "#333333",
+        "alignment": "left"
+    }),
+    "paragraph": ("Lorem ipsum...", {
+        "font_size": 12,
+        "color": "#333333",
+        "line_height": 1.5
+    }),
+    "button": ("Click Me", {
+        "background_color": DEFAULT_SETTINGS["accent_color"],
+        "color": "white",
+        "font_size": 12,
+        "font_weight": "bold"
+    }),
+    "image": ("placeholder.png", {  # In a real app, this would be an image path
+        "width": "auto",
+        "height": "auto"
+    }),
+    "divider": (None, {
+        "height": 2,
+        "color": "#cccccc"
+    }),
+    "form": ("Contact Form", {}),  # Styles would be more complex for a form
+}
+
+# Element sequences offered by Insert > Template
+TEMPLATES = {
+    "Landing Page": ["header", "paragraph", "button", "image", "divider", "form"],
+    "Article": ["header", "image", "paragraph", "paragraph", "divider", "paragraph"],
+    "Contact Page": ["header", "paragraph", "divider", "form"],
+}
+
+_UNSET = object()
+
+# Process-wide element serial numbers (Element.uid)
+_uids = itertools.count()
+
+
+class StyleSet(dict):
+    # Immutable style mapping. Identical style sets are shared between
+    # elements through intern_styles(), so a page of thousands of similarly
+    # styled blocks holds only a handful of style objects.
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("StyleSet is immutable; use Document.update_element()")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        # Cached: style sets are used as keys of the renderers' style caches
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(self._key())
+            return self._hash
+
+    def _key(self):
+        return tuple(sorted(self.items(), key=lambda item: item[0]))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (intern_styles, (dict(self),))
+
+
+_style_pool = weakref.WeakValueDictionary()
+
+
+def intern_styles(styles):
+    if type(styles) is StyleSet:
+        return styles  # style sets only come from here, so already shared
+    if styles is None:
+        styles = {}
+    key = tuple(sorted(styles.items(), key=lambda item: item[0]))
+    try:
+        shared = _style_pool.get(key)
+    except TypeError:
+        # Unhashable style values (lists etc.) are simply not shared
+        return styles if type(styles) is StyleSet else StyleSet(styles)
+    if shared is None:
+        shared = StyleSet(styles)
+        _style_pool[key] = shared
+    return shared
+
+
+class Element:
+    __slots__ = ("id", "type", "content", "styles", "x", "y", "version", "gen", "older", "uid")
+
+    def __init__(self, element_id, type_, content=None, styles=None, x=None, y=None):
+        self.id = element_id
+        self.type = sys.intern(type_)
+        self.content = content
+        self.styles = intern_styles(styles)
+        # Only used by the freeform designer (main.py); None in flow layouts
+        self.x = x
+        self.y = y
+        # Bumped on every change so renderers can cache per-element output
+        self.version = 0
+        # Snapshot generation of the current state, and a frozen copy of the
+        # previous state while a snapshot may still see it
+        self.gen = 0
+        self.older = None
+        # Identity of the element that survives copy(), unlike id(), and
+        # that no other element ever gets, unlike the id string
+        self.uid = next(_uids)
+
+    def to_dict(self):
+        data = {"id": self.id, "type": self.type, "content": self.content,
+                "styles": dict(self.styles)}
+        if self.x is not None:
+            data["x"] = self.x
+            data["y"] = self.y
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["type"], data.get("content"),
+                   data.get("styles"), data.get("x"), data.get("y"))
+
+    def copy(self):
+        # Styles are immutable and shared, so a shallow copy is independent
+        element = Element.__new__(Element)
+        element.id = self.id
+        element.type = self.type
+        element.content = self.content
+        element.styles = self.styles
+        element.x = self.x
+        element.y = self.y
+        element.version = self.version
+        element.gen = self.gen
+        element.older = self.older
+        element.uid = self.uid
+        return element
+
+    def __repr__(self):
+        return f"Element({self.id!r}, {self.type!r})"
+
+
+class _PositionIndex:
+    """Positions of the elements of a document, for Document.index_of.
+
+    A second copy of the element order, cut into blocks of at most
+    2 * BLOCK elements, with a Fenwick tree over the block sizes. Finding
+    an element's position, inserting and deleting each touch one block
+    (list operations in C) and O(log n) tree nodes; only splitting, adding
+    or dropping blocks re-derives the tree, in O(n / BLOCK).
+    """
+
+    BLOCK = 256
+
+    def __init__(self):
+        self.blocks = []
+        self.size = 0
+        self.block_of = {}  # element id -> block holding the element
+        self._block_index = {}  # id(block) -> index in blocks
+        self._tree = [0]
+
+    def _rebuild(self):
+        blocks = self.blocks
+        n = len(blocks)
+        tree = [0] * (n + 1)
+        for i in range(1, n + 1):
+            tree[i] += len(blocks[i - 1])
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._block_index = {id(block): i for i, block in enumerate(blocks)}
+
+    def _add(self, block_index, delta):
+        tree = self._tree
+        n = len(tree) - 1
+        i = block_index + 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def _before(self, block_index):
+        # Number of elements in the blocks before block_index
+        tree = self._tree
+        total = 0
+        while block_index > 0:
+            total += tree[block_index]
+            block_index -= block_index & -block_index
+        return total
+
+    def _find(self, index):
+        # Block holding position index and the offset in it; (len(blocks), 0)
+        # for the end of the document
+        tree = self._tree
+        n = len(tree) - 1
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            candidate = pos + step
+            if candidate <= n and tree[candidate] <= index:
+                pos = candidate
+                index -= tree[candidate]
+            step >>= 1
+        return pos, index
+
+    def index_of(self, element):
+        block = self.block_of[element.id]
+        return self._before(self._block_index[id(block)]) + block.index(element)
+
+    def insert(self, index, elements):
+        blocks = self.blocks
+        block_of = self.block_of
+        self.size += len(elements)
+        if index >= self.size - len(elements) and blocks:
+            pos = len(blocks) - 1  # appending, the common case
+            offset = len(blocks[pos])
+        else:
+            pos, offset = self._find(index)
+        if pos < len(blocks) and len(blocks[pos]) + len(elements) <= 2 * self.BLOCK:
+            block = blocks[pos]
+            block[offset:offset] = elements
+            for element in elements:
+                block_of[element.id] = block
+            self._add(pos, len(elements))
+            return
+        # Re-cut the block and the new elements into blocks of BLOCK
+        if pos < len(blocks):
+            block = blocks[pos]
+            items = block[:offset] + elements + block[offset:]
+        else:
+            items = elements
+        step = self.BLOCK
+        new_blocks = [items[i:i + step] for i in range(0, len(items), step)]
+        blocks[pos:pos + 1] = new_blocks
+        for block in new_blocks:
+            for element in block:
+                block_of[element.id] = block
+        self._rebuild()
+
+    def delete(self, index, elements):
+        # Remove the run of elements that starts at position index
+        block_of = self.block_of
+        for element in elements:
+            del block_of[element.id]
+        self.size -= len(elements)
+        blocks = self.blocks
+        start, start_offset = self._find(index)
+        block = blocks[start]
+        if start_offset + len(elements) <= len(block):
+            del block[start_offset:start_offset + len(elements)]
+            if block:
+                self._add(start, -len(elements))
+                return
+            del blocks[start]
+        else:
+            end, end_offset = self._find(index + len(elements))
+            del blocks[start][start_offset:]
+            if end < len(blocks):
+                del blocks[end][:end_offset]
+            del blocks[start + 1:end]
+            blocks[:] = [block for block in blocks if block]
+        self._rebuild()
+
+
+class DocumentSnapshot:
+    """Read-only view of a document at one point in time.
+
+    Shares the element list and settings with the document until the
+    document changes them (copy-on-write), so taking a snapshot is O(1).
+    Elements changed later keep their old state in a chain of frozen
+    copies (Element.older); iteration yields each element as it was when
+    the snapshot was taken. Safe to iterate from a worker thread while the
+    document keeps changing. Supports what the exporters use: iteration,
+    len() and .settings.
+    """
+
+    __slots__ = ("elements", "settings", "revision", "generation", "__weakref__")
+
+    def __init__(self, elements, settings, revision, generation):
+        self.elements = elements  # never modified once shared
+        self.settings = settings
+        self.revision = revision
+        self.generation = generation
+
+    def __iter__(self):
+        generation = self.generation
+        for element in self.elements:
+            while True:
+                while element.gen > generation:
+                    element = element.older
+                state = element.copy()
+                # The document raises gen before it changes a shared element,
+                # so if gen is still visible here the copy is consistent
+                if element.gen <= generation:
+                    break
+            yield state
+
+    def __len__(self):
+        return len(self.elements)
+
+
+class Document:
+    """Ordered element tree plus global settings.
+
+    Elements are looked up by id through a dict index, and their position
+    through a _PositionIndex, so lookup is O(1) and finding, deleting and
+    moving an element are O(log n) plus list operations done in C.
+
+    Listeners are called as listener(event, *args) with one of:
+      "added", element, index
+      "added_many", elements, index
+      "removed", element, index
+      "removed_many", elements, index
+      "moved", element, old_index, new_index
+      "changed", element, previous
+      "settings", settings, previous
+      "cleared", elements
+    where previous maps the changed fields (or settings) to their old
+    values and elements of "cleared" is the removed element list, so
+    listeners such as the undo history can invert any change.
+
+    revision counts the notified changes, so callers can tell whether the
+    document changed since they last looked.
+    """
+
+    def __init__(self, settings=None):
+        self.elements = []
+        self.settings = dict(DEFAULT_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+        self._listeners = []
+        self._by_id = {}
+        self._order = _PositionIndex()
+        self._next_id = 0
+        self.revision = 0
+        # Copy-on-write state for snapshots
+        self._generation = 0
+        self._snapshots = weakref.WeakSet()
+        self._elements_shared = False
+        self._settings_shared = False
+
+    # -- observers -------------------------------------------------------
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event, *args):
+        # A failing listener must not keep the change from the others (the
+        # undo history and journal would disagree with the document); the
+        # first error is raised once all of them have been called
+        self.revision += 1
+        error = None
+        for listener in list(self._listeners):
+            try:
+                listener(event, *args)
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+
+    # -- indexes ---------------------------------------------------------
+
+    def _new_id(self, type_):
+        while True:
+            element_id = f"{type_}_{self._next_id}"
+            self._next_id += 1
+            if element_id not in self._by_id:
+                return element_id
+
+    def _reserve_id(self, element_id):
+        # Ids that come from a file or journal keep later _new_id() calls
+        # clear of them, so a deleted element's id is never handed out again
+        suffix = element_id.rpartition("_")[2]
+        if suffix.isascii() and suffix.isdigit() and int(suffix) >= self._next_id:
+            self._next_id = int(suffix) + 1
+
+    # -- queries ---------------------------------------------------------
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __contains__(self, element):
+        return self._by_id.get(element.id) is element
+
+    def get(self, element_id):
+        return self._by_id.get(element_id)
+
+    def index_of(self, element):
+        return self._order.index_of(element)
+
+    # -- copy-on-write ---------------------------------------------------
+
+    def _own_elements(self):
+        # Called before changing the element list: a snapshot may share it
+        if self._elements_shared:
+            self.elements = self.elements[:]
+            self._elements_shared = False
+
+    def _preserve(self, element):
+        # Called before changing an element: keep the state that a live
+        # snapshot may still see as a frozen copy
+        snapshots = self._snapshots
+        if snapshots:
+            generations = [snapshot.generation for snapshot in snapshots]
+            if element.gen <= max(generations):
+                older = element.copy()
+                # Drop versions older than what the oldest snapshot sees
+                oldest = min(generations)
+                node = older
+                while node is not None and node.gen > oldest:
+                    node = node.older
+                if node is not None:
+                    node.older = None
+                element.older = older
+        else:
+            element.older = None
+        element.gen = self._generation
+
+    # -- mutations -------------------------------------------------------
+
+    def _new_element(self, type_, content=_UNSET, styles=None, x=None, y=None):
+        if content is _UNSET or styles is None:
+            default_content, default_styles = ELEMENT_DEFAULTS.get(type_, (None, {}))
+            if content is _UNSET:
+                content = default_content
+            if styles is None:
+                styles = default_styles
+                if type_ == "button" and styles["background_color"] != self.settings["accent_color"]:
+                    styles = dict(styles, background_color=self.settings["accent_color"])
+        element = Element(self._new_id(type_), type_, content, styles, x, y)
+        element.gen = self._generation
+        self._by_id[element.id] = element
+        return element
+
+    def add_element(self, type_, content=_UNSET, styles=None, x=None, y=None, index=None):
+        element = self._new_element(type_, content, styles, x, y)
+        self._own_elements()
+        if index is None or index >= len(self.elements):
+            index = len(self.elements)
+            self.elements.append(element)
+        else:
+            self.elements.insert(index, element)
+        self._order.insert(index, [element])
+        self._notify("added", element, index)
+        return element
+
+    def add_elements(self, items, index=None):
+        # Bulk insert. items are dicts with "type" and optional "content",
+        # "styles", "x" and "y". Listeners get one "added_many" event.
+        elements = [self._new_element(item["type"], item.get("content", _UNSET), item.get("styles"),
+                                      item.get("x"), item.get("y"))
+                    for item in items]
+        if not elements:
+            return elements
+        self._own_elements()
+        if index is None or index >= len(self.elements):
+            index = len(self.elements)
+        self.elements[index:index] = elements
+        self._order.insert(index, elements)
+        self._notify("added_many", elements, index)
+        return elements
+
+    def remove_element(self, element):
+        index = self.index_of(element)
+        self._own_elements()
+        del self.elements[index]
+        del self._by_id[element.id]
+        self._order.delete(index, [element])
+        self._notify("removed", element, index)
+
+    def insert_elements(self, elements, index=None):
+        # Insert already built elements (e.g. read from a project file or
+        # replayed from a journal), keeping their ids unless taken.
+        # Listeners get one "added_many" event.
+        if not elements:
+            return elements
+        self._own_elements()
+        by_id = self._by_id
+        for element in elements:
+            self._reserve_id(element.id)
+        for element in elements:
+            if element.id in by_id:
+                element.id = self._new_id(element.type)
+            by_id[element.id] = element
+        if index is None or index >= len(self.elements):
+            index = len(self.elements)
+        self.elements[index:index] = elements
+        self._order.insert(index, elements)
+        self._notify("added_many", elements, index)
+        return elements
+
+    def remove_elements(self, index, count):
+        # Bulk removal of a contiguous run. Listeners get one "removed_many" event.
+        elements = self.elements[index:index + count]
+        if not elements:
+            return elements
+        self._own_elements()
+        del self.elements[index:index + count]
+        by_id = self._by_id
+        for element in elements:
+            del by_id[element.id]
+        self._order.delete(index, elements)
+        self._notify("removed_many", elements, index)
+        return elements
+
+    def move_element(self, element, new_index):
+        old_index = self.index_of(element)
+        new_index = max(0, min(new_index, len(self.elements) - 1))
+        if new_index == old_index:
+            return
+        self._own_elements()
+        del self.elements[old_index]
+        self.elements.insert(new_index, element)
+        self._order.delete(old_index, [element])
+        self._order.insert(new_index, [element])
+        self._notify("moved", element, old_index, new_index)
+
+    def update_element(self, element, content=_UNSET, styles=None, x=None, y=None):
+        self._preserve(element)
+        previous = {}
+        if content is not _UNSET:
+            previous["content"] = element.content
+            element.content = content
+        if styles is not None:
+            previous["styles"] = element.styles
+            element.styles = intern_styles(styles)
+        if x is not None:
+            previous["x"] = element.x
+            element.x = x
+        if y is not None:
+            previous["y"] = element.y
+            element.y = y
+        element.version += 1
+        self._notify("changed", element, previous)
+
+    def update_settings(self, **settings):
+        previous = {name: self.settings.get(name) for name in settings}
+        if self._settings_shared:
+            self.settings = dict(self.settings)
+            self._settings_shared = False
+        self.settings.update(settings)
+        self._notify("settings", self.settings, previous)
+
+    def clear(self):
+        elements = self.elements
+        self.elements = []
+        self._elements_shared = False
+        self._by_id = {}
+        self._order = _PositionIndex()
+        self._notify("cleared", elements)
+
+    def snapshot(self):
+        # O(1): the list and settings are copied by the next change, if any
+        snapshot = DocumentSnapshot(self.elements, self.settings, self.revision, self._generation)
+        self._generation += 1
+        self._elements_shared = self._settings_shared = True
+        self._snapshots.add(snapshot)
+        return snapshot
+
+    # -- serialization ---------------------------------------------------
+
+    def to_dict(self):
+        return {"settings": dict(self.settings),
+                "elements": [element.to_dict() for element in self.elements]}
+
+    @classmethod
+    def from_dict(cls, data):
+        document = cls(data.get("settings"))
+        elements = [Element.from_dict(item) for item in data.get("elements", [])]
+        for element in elements:
+            document._reserve_id(element.id)
+        for element in elements:
+            if element.id in document._by_id:
+                element.id = document._new_id(element.type)
+            document._by_id[element.id] = element
+            document.elements.append(element)
+        document._order.insert(0, document.elements)
+        return document
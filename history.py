@@ -0,0 +1,225 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# Undo/redo for a Document.
+#
+# The history listens to document events, which carry what is needed to
+# invert them (old field values, removed elements and their positions), so
+# an entry stores only the changed fields and the affected elements, never
+# a copy of the document. Undoing an entry applies the inverse operations
+# through the normal Document methods; the events those produce are
+# recorded as the matching redo entry, so undo and redo cost O(size of the
+# change) whatever the document size.
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+
+# Rough cost of keeping a removed element alive in the history
+_ELEMENT_BYTES = 200
+_RECORD_BYTES = 64
+
+_BULK_EVENTS = ("added_many", "removed_many", "cleared")
+
+
+def _record_size(record):
+    kind = record[0]
+    if kind in _BULK_EVENTS:
+        elements = record[1]
+        if kind == "added_many":
+            # Still referenced by the document; the history holds a list only
+            return _RECORD_BYTES + 8 * len(elements)
+        return _RECORD_BYTES + sum(_ELEMENT_BYTES + sys.getsizeof(element.content) for element in elements)
+    if kind == "changed" or kind == "settings":
+        return _RECORD_BYTES + sum(sys.getsizeof(value) for value in record[-1].values())
+    if kind == "removed":
+        return _RECORD_BYTES + _ELEMENT_BYTES + sys.getsizeof(record[1].content)
+    return _RECORD_BYTES
+
+
+class UndoEntry:
+    # Document events recorded for one user action, in order
+    __slots__ = ("records", "size", "time", "sealed")
+
+    def __init__(self):
+        self.records = []
+        self.size = 0
+        self.time = time.monotonic()
+        self.sealed = False
+
+    def add(self, record):
+        self.records.append(record)
+        self.size += _record_size(record)
+
+
+class UndoHistory:
+    """Command history of one document with a memory budget.
+
+    Consecutive edits of the same element within coalesce_seconds (typing
+    into a field, dragging) are merged into one entry; group() merges all
+    events of a block. When the recorded entries exceed memory_budget
+    bytes (estimated), the oldest undo entries are dropped.
+    """
+
+    def __init__(self, document, memory_budget=DEFAULT_MEMORY_BUDGET, coalesce_seconds=1.0):
+        self.document = document
+        self.memory_budget = memory_budget
+        self.coalesce_seconds = coalesce_seconds
+        self.undo_stack = []
+        self.redo_stack = []
+        self.memory_used = 0
+        self._group = None
+        self._group_depth = 0
+        self._replay_target = None  # entry receiving events while undoing/redoing
+        self._paused = 0
+        document.subscribe(self._on_document_event)
+
+    # -- recording -------------------------------------------------------
+
+    def _on_document_event(self, event, *args):
+        if self._paused:
+            return
+        record = (event,) + args
+        if event == "settings":
+            record = ("settings", args[1])
+        if self._replay_target is not None:
+            self._replay_target.add(record)
+            return
+        if self.redo_stack:
+            self.memory_used -= sum(entry.size for entry in self.redo_stack)
+            self.redo_stack = []
+
+        if self._group is not None:
+            entry = self._group
+        elif self._coalesce(record):
+            return
+        else:
+            entry = UndoEntry()
+            self.undo_stack.append(entry)
+        before = entry.size
+        entry.add(record)
+        self.memory_used += entry.size - before
+        self._enforce_budget()
+
+    def _coalesce(self, record):
+        # Merge a repeated edit of one element into the previous entry
+        if not self.undo_stack:
+            return False
+        entry = self.undo_stack[-1]
+        now = time.monotonic()
+        if entry.sealed or len(entry.records) != 1 or now - entry.time > self.coalesce_seconds:
+            return False
+        last = entry.records[0]
+        kind = record[0]
+        if kind != last[0] or kind not in ("changed", "moved") or record[1] is not last[1]:
+            return False
+        if kind == "changed":
+            previous = dict(record[2])
+            previous.update(last[2])  # the oldest value of each field wins
+            merged = ("changed", last[1], previous)
+        else:
+            merged = ("moved", last[1], last[2], record[3])
+        before = entry.size
+        entry.records[0] = merged
+        entry.size = _record_size(merged)
+        entry.time = now
+        self.memory_used += entry.size - before
+        return True
+
+    def _enforce_budget(self):
+        stack = self.undo_stack
+        drop = 0
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while self.memory_used > self.memory_budget and drop < len(stack) - 1:
+            self.memory_used -= stack[drop].size
+            drop += 1
+        if drop:
+            del stack[:drop]
+
+    @contextmanager
+    def group(self):
+        # All events inside the block become one undo entry
+        if self._group_depth == 0:
+            self._group = UndoEntry()
+        self._group_depth += 1
+        try:
+            yield
+        finally:
+            self._group_depth -= 1
+            if self._group_depth == 0:
+                entry, self._group = self._group, None
+                if entry.records:
+                    entry.sealed = True
+                    self.undo_stack.append(entry)
+                    self._enforce_budget()
+
+    @contextmanager
+    def paused(self):
+        # Events inside the block are not recorded. Only for changes that
+        # leave the recorded ones valid, such as appending the elements of
+        # a project that is being loaded.
+        self._paused += 1
+        try:
+            yield
+        finally:
+            self._paused -= 1
+
+    def seal(self):
+        # The next edit starts a new entry even if it could be merged
+        if self.undo_stack:
+            self.undo_stack[-1].sealed = True
+
+    def clear(self):
+        self.undo_stack = []
+        self.redo_stack = []
+        self.memory_used = 0
+
+    # -- undo / redo -----------------------------------------------------
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        return self._step(self.undo_stack, self.redo_stack)
+
+    def redo(self):
+        return self._step(self.redo_stack, self.undo_stack)
+
+    def _step(self, source, target):
+        if not source:
+            return False
+        entry = source.pop()
+        inverse = UndoEntry()
+        inverse.sealed = True
+        self._replay_target = inverse
+        try:
+            for record in reversed(entry.records):
+                self._invert(record)
+        finally:
+            self._replay_target = None
+        target.append(inverse)
+        self.memory_used += inverse.size - entry.size
+        return True
+
+    def _invert(self, record):
+        document = self.document
+        kind = record[0]
+        if kind == "added":
+            document.remove_element(record[1])
+        elif kind == "added_many":
+            document.remove_elements(record[2], len(record[1]))
+        elif kind == "removed":
+            document.insert_elements([record[1]], record[2])
+        elif kind == "removed_many":
+            document.insert_elements(record[1], record[2])
+        elif kind == "moved":
+            document.move_element(record[1], record[2])
+        elif kind == "changed":
+            document.update_element(record[1], **record[2])
+        elif kind == "settings":
+            document.update_settings(**record[1])
+        elif kind == "cleared":
+            # Elements added after the clear are undone by earlier records
+            document.insert_elements(record[1], 0)
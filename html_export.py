@@ -0,0 +1,612 @@
+# HTML generation from a Document. Does not import tkinter, so exports can
+# run in worker processes, scripts or CI.
+#
+# Pages are produced as a stream of fragments (iter_html) so that exports
+# can be written straight into a buffered file or socket without ever
+# holding the whole document as one string.
+#
+# With minify=True the export is optimized for size: identical style sets
+# become shared generated CSS classes, declarations that match the element
+# type's base rule are dropped, and markup and stylesheet are minified.
+#
+# Only the stylesheet rules needed by the element types on the page are
+# emitted. With an external stylesheet, rules for the first screen of
+# elements stay inline and the rest go to a separate, cacheable .css file
+# (iter_stylesheet).
+
+import itertools
+import re
+
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+
+# Characters that could end a declaration or the <style> element
+_CSS_UNSAFE = str.maketrans("", "", "<>{};")
+
+_CSS_PROPERTY = re.compile(r"-?[a-zA-Z][-a-zA-Z]*$")
+_WHITESPACE_BETWEEN_TAGS = re.compile(r">\s+<")
+
+
+def escape(text):
+    if text is None:
+        return ""
+    text = str(text)
+    # Most content has nothing to escape; the substring checks are much
+    # cheaper than running the translation table over it
+    if "&" in text or "<" in text or ">" in text or '"' in text or "'" in text:
+        return text.translate(_ESCAPE_TABLE)
+    return text
+
+
+def minify_markup(markup):
+    return _WHITESPACE_BETWEEN_TAGS.sub("><", markup).strip()
+
+
+class ElementRenderer:
+    """Markup for one element type.
+
+    markup is a template with {content} and {style} fields and style_format
+    a str.format template for the style attribute. defaults fill in missing
+    style keys; setting_defaults name styles that fall back to a global
+    setting (e.g. a button's background follows the accent colour), which
+    makes the type depend on those settings. selector is the CSS selector
+    of the element's tag, used by minified exports to move styles into
+    classes.
+
+    The markup around the content is precomputed once per style set.
+    Styles are interned by the document, so all elements sharing a style
+    set reuse the same prefix and suffix and rendering one element is a
+    dict lookup and two string concatenations. Call prepare(settings)
+    before rendering with a given set of global settings.
+    """
+
+    __slots__ = ("style_format", "defaults", "setting_defaults", "dependencies", "selector",
+                 "constant", "minified_constant", "_before", "_after", "_minified_before",
+                 "_minified_after", "_parts", "_values")
+
+    MAX_CACHED_STYLES = 4096
+
+    def __init__(self, markup, style_format=None, defaults=None, setting_defaults=None, selector=None):
+        self.style_format = style_format
+        self.defaults = defaults or {}
+        self.setting_defaults = setting_defaults or {}
+        self.dependencies = tuple(self.setting_defaults.values())
+        self.selector = selector
+        # Markup without a content field is emitted as is
+        self.constant = markup if "{content}" not in markup else None
+        self._before, _, self._after = markup.partition("{content}")
+
+        minified = minify_markup(markup.replace(' style="{style}"', "{class}"))
+        self.minified_constant = minified if self.constant is not None else None
+        self._minified_before, _, self._minified_after = minified.partition("{content}")
+
+        self._parts = {}  # id(styles) -> (styles, prefix, suffix)
+        self._values = None
+
+    def prepare(self, settings):
+        # Called once per export: drop cached markup if a setting this type
+        # depends on has changed since the last one
+        if self.dependencies:
+            values = tuple([settings[name] for name in self.dependencies])
+            if values != self._values:
+                self._values = values
+                self._parts.clear()
+
+    def _format_style(self, styles, settings):
+        values = dict(self.defaults)
+        for style_key, setting in self.setting_defaults.items():
+            values[style_key] = settings[setting]
+        values.update(styles)
+        return self.style_format.format_map(values)
+
+    def style(self, styles, settings):
+        return escape(self._format_style(styles, settings))
+
+    def declarations(self, styles, settings):
+        # The style attribute as (property, value) pairs, safe for a stylesheet
+        if not self.style_format:
+            return []
+        pairs = []
+        for declaration in self._format_style(styles, settings).split(";"):
+            prop, _, value = declaration.partition(":")
+            prop = prop.strip()
+            if _CSS_PROPERTY.match(prop):
+                pairs.append((prop, value.strip().translate(_CSS_UNSAFE)))
+        return pairs
+
+    def _add_parts(self, styles, settings):
+        style = self.style(styles, settings) if self.style_format else ""
+        if len(self._parts) >= self.MAX_CACHED_STYLES:
+            self._parts.clear()
+        # The entry keeps the style set alive, so its id cannot be reused
+        entry = self._parts[id(styles)] = (styles, self._before.replace("{style}", style),
+                                           self._after.replace("{style}", style))
+        return entry
+
+    def render(self, element, settings):
+        constant = self.constant
+        if constant is not None:
+            return constant
+        styles = element.styles
+        entry = self._parts.get(id(styles))
+        if entry is None or entry[0] is not styles:
+            entry = self._add_parts(styles, settings)
+        return entry[1] + escape(element.content) + entry[2]
+
+    def render_minified(self, element, class_attribute):
+        if self.minified_constant is not None:
+            return self.minified_constant
+        return (self._minified_before.replace("{class}", class_attribute) + escape(element.content)
+                + self._minified_after.replace("{class}", class_attribute))
+
+
+def prepare_renderers(renderers, settings):
+    for renderer in renderers.values():
+        renderer.prepare(settings)
+
+
+FORM_HTML = """
+            <div class="form-container">
+                <h2>Contact Form</h2>
+                <form>
+                    <label for="name">Name:</label><br>
+                    <input type="text" id="name" name="name"><br>
+                    <label for="email">Email:</label><br>
+                    <input type="email" id="email" name="email"><br>
+                    <label for="message">Message:</label><br>
+                    <textarea id="message" name="message" rows="5"></textarea><br>
+                    <button type="submit">Submit</button>
+                </form>
+            </div>
+            """
+
+# Renderers of the flow designer (web_designer.py)
+RENDERERS = {
+    "header": ElementRenderer(
+        "<h1 style=\"{style}\">{content}</h1>\n",
+        "font-size: {font_size}px; font-weight: {font_weight}; color: {color};",
+        {"font_size": 18, "font_weight": "bold", "color": "#333333"}, selector="h1"),
+    "paragraph": ElementRenderer(
+        "<p style=\"{style}\">{content}</p>\n",
+        "font-size: {font_size}px; color: {color}; line-height: {line_height};",
+        {"font_size": 12, "color": "#333333", "line_height": 1.5}, selector="p"),
+    "button": ElementRenderer(
+        "<button style=\"{style}\">{content}</button>\n",
+        "background-color: {background_color}; color: {color}; font-size: {font_size}px; "
+        "font-weight: {font_weight};",
+        {"color": "white", "font_size": 12, "font_weight": "bold"},
+        {"background_color": "accent_color"}, selector="button"),
+    # In a real app, use the content as the image source
+    "image": ElementRenderer("<div class=\"image-placeholder\">{content}</div>\n"),
+    "divider": ElementRenderer("<div class=\"divider\"></div>\n"),
+    "form": ElementRenderer(FORM_HTML),
+}
+
+# Page stylesheet of the flow designer as (types, selectors, declarations).
+# A rule is emitted only if the page contains one of its element types;
+# types=None marks rules of the page frame itself. Values may refer to
+# global settings as {name}.
+STYLESHEET = [
+    (None, ("body",), (
+        ("font-family", "{font_family}, sans-serif"),
+        ("margin", "0"),
+        ("padding", "20px"),
+        ("background-color", "{bg_color}"))),
+    (None, (".container",), (
+        ("max-width", "800px"),
+        ("margin", "0 auto"))),
+    (("header",), ("h1",), (
+        ("color", "#333333"),
+        ("font-size", "18px"),
+        ("font-weight", "bold"))),
+    (("paragraph",), ("p",), (
+        ("color", "#333333"),
+        ("font-size", "12px"),
+        ("line-height", "1.5"))),
+    # Also styles the form's submit button
+    (("button", "form"), ("button",), (
+        ("background-color", "{accent_color}"),
+        ("color", "white"),
+        ("padding", "10px 15px"),
+        ("border", "none"),
+        ("cursor", "pointer"),
+        ("font-size", "12px"),
+        ("font-weight", "bold"))),
+    (("image",), (".image-placeholder",), (
+        ("width", "150px"),
+        ("height", "100px"),
+        ("background-color", "#f0f0f0"),
+        ("display", "flex"),
+        ("justify-content", "center"),
+        ("align-items", "center"),
+        ("border", "1px dashed #ccc"),
+        ("color", "#7f8c8d"),
+        ("font-size", "12px"))),
+    (("divider",), (".divider",), (
+        ("height", "2px"),
+        ("background-color", "#cccccc"),
+        ("margin", "20px 0"))),
+    (("form",), (".form-container",), (
+        ("padding", "20px"),
+        ("border", "1px solid #eee"),
+        ("background-color", "#f9f9f9"))),
+    (("form",), (".form-container input[type=\"text\"]",
+                 ".form-container input[type=\"email\"]",
+                 ".form-container textarea"), (
+        ("width", "calc(100% - 20px)"),
+        ("padding", "8px"),
+        ("margin-bottom", "10px"),
+        ("border", "1px solid #ddd"))),
+    (("form",), (".form-container button",), (
+        ("width", "auto"),
+        ("padding", "8px 20px"))),
+]
+
+# Number of leading elements whose rules are kept inline when the rest of
+# the stylesheet is external; roughly what fits on the first screen
+CRITICAL_ELEMENTS = 12
+
+_FREEFORM_STYLE = ("background-color: {bg_color}; color: {text_color}; padding: {padding}px; "
+                   "margin: {margin}px; border-radius: {border_radius}px; font-size: {font_size}px; ")
+_FREEFORM_DEFAULTS = {"bg_color": "#ffffff", "text_color": "#000000", "padding": 10, "margin": 5,
+                      "border_radius": 0, "font_size": 14}
+
+# Renderers of the freeform designer (main.py)
+FREEFORM_RENDERERS = {
+    "header": ElementRenderer("<h1 style=\"{style}\">{content}</h1>\n", _FREEFORM_STYLE, _FREEFORM_DEFAULTS,
+                              selector="h1"),
+    "paragraph": ElementRenderer("<p style=\"{style}\">{content}</p>\n", _FREEFORM_STYLE, _FREEFORM_DEFAULTS,
+                                 selector="p"),
+    "button": ElementRenderer("<button style=\"{style}\">{content}</button>\n", _FREEFORM_STYLE,
+                              _FREEFORM_DEFAULTS, selector="button"),
+    "image": ElementRenderer("<img src=\"#\" alt=\"{content}\" style=\"{style}\">\n",
+                             _FREEFORM_STYLE + " width:100%; height:auto;", _FREEFORM_DEFAULTS,
+                             selector="img"),
+}
+
+FREEFORM_STYLESHEET = [
+    (None, ("body",), (("font-family", "Arial, sans-serif"),)),
+]
+
+
+def setting_dependencies(renderers):
+    # Global settings each element type's markup depends on
+    return {type_: renderer.dependencies for type_, renderer in renderers.items() if renderer.dependencies}
+
+
+SETTING_DEPENDENCIES = setting_dependencies(RENDERERS)
+
+
+def _flow_head(settings, rules, link):
+    lines = ["<!DOCTYPE html>\n<html>\n<head>\n    <title>My Web Design</title>\n    <style>\n"]
+    for selectors, declarations in rules:
+        lines.append("        " + ",\n        ".join(selectors) + " {\n")
+        for prop, value in declarations:
+            lines.append(f"            {prop}: {value.format_map(settings)};\n")
+        lines.append("        }\n")
+    lines.append("        </style>\n")
+    if link:
+        lines.append(f"        {link}\n")
+    lines.append("        </head>\n        <body>\n        <div class=\"container\">\n")
+    return "".join(lines)
+
+
+def _freeform_head(settings, rules, link):
+    lines = ["<!DOCTYPE html>\n<html>\n<head>\n<style>\n"]
+    for selectors, declarations in rules:
+        body = " ".join(f"{prop}: {value.format_map(settings)};" for prop, value in declarations)
+        lines.append(f"{', '.join(selectors)} {{ {body} }}\n")
+    lines.append("</style>\n")
+    if link:
+        lines.append(f"{link}\n")
+    lines.append("</head>\n<body>\n")
+    return "".join(lines)
+
+
+class PageFormat:
+    # Renderers, stylesheet and page frame of one kind of exported page.
+    # head(settings, rules, link) returns the readable page head for the
+    # given (selectors, declarations) rules and optional <link> tag;
+    # minified_head has {css} and {link} fields.
+    __slots__ = ("renderers", "stylesheet", "head", "foot", "minified_head", "minified_foot")
+
+    def __init__(self, renderers, stylesheet, head, foot, minified_head, minified_foot):
+        self.renderers = renderers
+        self.stylesheet = stylesheet
+        self.head = head
+        self.foot = foot
+        self.minified_head = minified_head
+        self.minified_foot = minified_foot
+
+
+FLOW_PAGE = PageFormat(
+    RENDERERS, STYLESHEET, _flow_head,
+    """
+        </div>
+        </body>
+        </html>""",
+    "<!DOCTYPE html><html><head><title>My Web Design</title><style>{css}</style>{link}</head>"
+    "<body><div class=\"container\">",
+    "</div></body></html>")
+
+FREEFORM_PAGE = PageFormat(
+    FREEFORM_RENDERERS, FREEFORM_STYLESHEET, _freeform_head,
+    "</body>\n</html>",
+    "<!DOCTYPE html><html><head><style>{css}</style>{link}</head><body>",
+    "</body></html>")
+
+PAGE_FOOTER = FLOW_PAGE.foot
+
+
+class FragmentCache:
+    """Memoized per-element HTML fragments.
+
+    Entries are keyed by Element.uid, which snapshot copies share with the
+    live element, and remember the element's id and version and the values
+    of the global settings the element type depends on, so a repeated
+    export only re-renders elements that changed since the last one. An
+    element that later gets the same id string never sees another's entry.
+    Subscribing to the document drops entries of removed elements.
+    Minified exports do not use the cache.
+    """
+
+    def __init__(self, document=None, render=None, dependencies=None):
+        self.render = render or render_element
+        self.dependencies = SETTING_DEPENDENCIES if dependencies is None else dependencies
+        self.hits = 0
+        self.misses = 0
+        self._fragments = {}
+        if document is not None:
+            document.subscribe(self._on_document_event)
+
+    def _on_document_event(self, event, *args):
+        if event == "removed":
+            self._fragments.pop(args[0].uid, None)
+        elif event == "removed_many":
+            for element in args[0]:
+                self._fragments.pop(element.uid, None)
+        elif event == "cleared":
+            self._fragments.clear()
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def fragment(self, element, settings):
+        names = self.dependencies.get(element.type)
+        key = (element.id, element.version, tuple([settings[name] for name in names]) if names else None)
+        entry = self._fragments.get(element.uid)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        fragment = self.render(element, settings)
+        self._fragments[element.uid] = (key, fragment)
+        return fragment
+
+    def clear(self):
+        self._fragments.clear()
+
+
+# -- stylesheet selection -----------------------------------------------------
+
+def used_types(document, renderers, critical_elements=None):
+    """Element types on the page, as (critical, deferred) sets.
+
+    critical holds the types of the first critical_elements elements (all
+    of them if None), deferred the remaining types that only occur further
+    down. Stops scanning once every known type has been seen.
+    """
+    elements = iter(document)
+    critical = {element.type for element in itertools.islice(elements, critical_elements)}
+    deferred = set()
+    missing = set(renderers) - critical
+    if missing and critical_elements is not None:
+        for element in elements:
+            if element.type in missing:
+                missing.discard(element.type)
+                deferred.add(element.type)
+                if not missing:
+                    break
+    return critical, deferred
+
+
+class StylePlan:
+    # Stylesheet rules of one page, split into the ones inlined in <style>
+    # and the ones moved to the external stylesheet
+    __slots__ = ("inline", "external", "inline_types", "external_types")
+
+    def __init__(self, page, critical, deferred):
+        self.inline = []
+        self.external = []
+        self.inline_types = critical
+        self.external_types = deferred
+        for types, selectors, declarations in page.stylesheet:
+            if types is None or not critical.isdisjoint(types):
+                self.inline.append((selectors, declarations))
+            elif not deferred.isdisjoint(types):
+                self.external.append((selectors, declarations))
+
+
+def plan_styles(document, page, external=False):
+    critical, deferred = used_types(document, page.renderers, CRITICAL_ELEMENTS if external else None)
+    return StylePlan(page, critical, deferred)
+
+
+def stylesheet_link(href):
+    return f'<link rel="stylesheet" href="{escape(href)}">'
+
+
+def _rule_map(rules, settings):
+    # Rules merged by selector, with settings filled in
+    merged = {}
+    for selectors, declarations in rules:
+        rule = merged.setdefault(",".join(selectors), {})
+        for prop, value in declarations:
+            rule[prop] = value.format_map(settings)
+    return merged
+
+
+def _add_base_rules(merged, renderers, types, settings):
+    # Default declarations of each styled element type, under its selector
+    for type_, renderer in renderers.items():
+        if renderer.selector and type_ in types:
+            rule = merged.setdefault(renderer.selector, {})
+            for prop, value in renderer.declarations({}, settings):
+                rule.setdefault(prop, value)
+    return merged
+
+
+def _minified_css(merged):
+    return "".join(f"{selector}{{{';'.join(f'{prop}:{value}' for prop, value in declarations.items())}}}"
+                   for selector, declarations in merged.items() if declarations)
+
+
+def iter_stylesheet(document, minify=False, page=None):
+    """The external stylesheet matching an export with stylesheet_href."""
+    page = page or FLOW_PAGE
+    settings = document.settings
+    plan = plan_styles(document, page, external=True)
+    if minify:
+        prepare_renderers(page.renderers, settings)
+        merged = _add_base_rules(_rule_map(plan.external, settings), page.renderers,
+                                 plan.external_types, settings)
+        yield _minified_css(merged)
+        return
+    for selectors, declarations in plan.external:
+        yield ",\n".join(selectors) + " {\n"
+        for prop, value in declarations:
+            yield f"    {prop}: {value.format_map(settings)};\n"
+        yield "}\n"
+
+
+def write_stylesheet(document, fp, minify=False, page=None):
+    fp.writelines(iter_stylesheet(document, minify, page))
+
+
+# -- pages --------------------------------------------------------------------
+
+def iter_page(document, page, cache=None, minify=False, stylesheet_href=None):
+    plan = plan_styles(document, page, external=stylesheet_href is not None)
+    link = stylesheet_link(stylesheet_href) if stylesheet_href is not None else ""
+    if minify:
+        yield from _iter_minified_page(document, page, plan, link)
+        return
+
+    settings = document.settings
+    yield page.head(settings, plan.inline, link)
+
+    renderers = page.renderers
+    prepare_renderers(renderers, settings)
+    if cache is None:
+        for element in document:
+            renderer = renderers.get(element.type)
+            if renderer is not None:
+                yield renderer.render(element, settings)
+    else:
+        for element in document:
+            yield cache.fragment(element, settings)
+
+    yield page.foot
+
+
+def _iter_minified_page(document, page, plan, link):
+    settings = document.settings
+    renderers = page.renderers
+    prepare_renderers(renderers, settings)
+
+    # Inline rules, merged by selector; every styled element type on the
+    # page gets a base rule holding its default declarations
+    rules = _add_base_rules(_rule_map(plan.inline, settings), renderers, plan.inline_types, settings)
+    # Declarations equal to the base rule are dropped, wherever it is emitted
+    base_rules = _add_base_rules(_rule_map(plan.inline + plan.external, settings), renderers,
+                                 plan.inline_types | plan.external_types, settings)
+
+    # First pass: one class per distinct set of non-default declarations.
+    # Only distinct style sets are kept, never the rendered elements.
+    classes = {}  # declarations -> class name
+    assigned = {}  # (type, id(styles)) -> (styles, class attribute)
+    for element in document:
+        renderer = renderers.get(element.type)
+        if renderer is None or not renderer.selector:
+            continue
+        styles = element.styles
+        key = (element.type, id(styles))
+        entry = assigned.get(key)
+        if entry is not None and entry[0] is styles:
+            continue
+        base = base_rules[renderer.selector]
+        declarations = tuple([(prop, value) for prop, value in renderer.declarations(styles, settings)
+                              if base.get(prop) != value])
+        attribute = ""
+        if declarations:
+            name = classes.get(declarations)
+            if name is None:
+                name = classes[declarations] = f"s{len(classes):x}"
+            attribute = f' class="{name}"'
+        assigned[key] = (styles, attribute)
+
+    # Generated classes are specific to this page and always stay inline
+    css = _minified_css(rules) + "".join(
+        f".{name}{{{';'.join(f'{prop}:{value}' for prop, value in declarations)}}}"
+        for declarations, name in classes.items())
+    yield page.minified_head.replace("{link}", link).replace("{css}", css)
+
+    # Second pass: emit the elements
+    for element in document:
+        renderer = renderers.get(element.type)
+        if renderer is None:
+            continue
+        entry = assigned.get((element.type, id(element.styles))) if renderer.selector else None
+        yield renderer.render_minified(element, entry[1] if entry else "")
+
+    yield page.minified_foot
+
+
+def generate_html(document, cache=None, minify=False, stylesheet_href=None):
+    return "".join(iter_html(document, cache, minify, stylesheet_href))
+
+
+def write_html(document, fp, cache=None, minify=False, stylesheet_href=None):
+    # fp is any object with writelines(), e.g. an open text file or a
+    # socket.makefile("w"); memory use stays constant in the page size.
+    # With stylesheet_href, write the rest of the CSS with write_stylesheet.
+    fp.writelines(iter_html(document, cache, minify, stylesheet_href))
+
+
+def iter_html(document, cache=None, minify=False, stylesheet_href=None):
+    return iter_page(document, FLOW_PAGE, cache, minify, stylesheet_href)
+
+
+def render_element(element, settings):
+    renderer = RENDERERS.get(element.type)
+    if renderer is None:
+        return ""
+    renderer.prepare(settings)
+    return renderer.render(element, settings)
+
+
+def generate_freeform_html(document, cache=None, minify=False):
+    return "".join(iter_freeform_html(document, cache, minify))
+
+
+def write_freeform_html(document, fp, cache=None, minify=False):
+    fp.writelines(iter_freeform_html(document, cache, minify))
+
+
+def iter_freeform_html(document, cache=None, minify=False):
+    # Page layout used by the freeform designer (main.py)
+    return iter_page(document, FREEFORM_PAGE, cache, minify)
+
+
+def render_freeform_element(element, settings):
+    renderer = FREEFORM_RENDERERS.get(element.type)
+    if renderer is None:
+        return ""
+    renderer.prepare(settings)
+    return renderer.render(element, settings)
@@ -0,0 +1,398 @@
+import json
+import os
+import threading
+
+from document import Document, Element
+import project_file
+from profiler import profiler
+
+# Append-only operation journal for autosave and crash recovery.
+#
+# Every document change is encoded on the caller's thread as one compact
+# JSON line (cost proportional to the edit, not the document) and queued;
+# a background thread appends queued lines to "<project>.wdp.journal" and
+# fsyncs them about once per flush interval. The first line is a header
+# naming the project file the operations apply to and the process writing
+# the journal. Untitled sessions are journaled in a per-user directory,
+# one file per process, and a journal is only offered for recovery once
+# the process that wrote it is no longer running. After compact_every
+# operations the journal is rewritten as a header plus a full snapshot,
+# so a crashed session is restored by loading the base (project file or
+# snapshot) and replaying a bounded number of operations.
+#
+# Operations, one JSON array per line:
+#   ["a", index, [row, ...]]        elements inserted at index
+#   ["r", id]                       element removed
+#   ["R", index, count]             run of elements removed
+#   ["m", id, new_index]            element moved
+#   ["c", row]                      element content/styles/position changed
+#   ["s", settings]                 global settings changed
+#   ["x"]                           document cleared
+#   ["S", settings, [row, ...]]     snapshot of the whole document
+# where row is [id, type, content, styles] plus x, y for freeform elements.
+
+JOURNAL_FORMAT = "wdp-journal"
+JOURNAL_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".web_designer", "journals")  # untitled sessions
+UNTITLED_PREFIX = "untitled-"
+UNTITLED_SUFFIX = ".wdp" + JOURNAL_SUFFIX
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def journal_path(project=None):
+    if project:
+        return project + JOURNAL_SUFFIX
+    return os.path.join(JOURNAL_DIR, f"{UNTITLED_PREFIX}{os.getpid()}{UNTITLED_SUFFIX}")
+
+
+def _row(element):
+    row = [element.id, element.type, element.content, element.styles]
+    if element.x is not None:
+        row += [element.x, element.y]
+    return row
+
+
+class _Rewrite:
+    # Queued request to start the journal file over: header plus an
+    # optional DocumentSnapshot to write as the new base
+    __slots__ = ("path", "header", "snapshot")
+
+    def __init__(self, path, header, snapshot=None):
+        self.path = path
+        self.header = header
+        self.snapshot = snapshot
+
+
+class _Remove:
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+
+class Journal:
+    """Records the operations of one document into a journal file.
+
+    attach(document, project) starts a fresh journal for the given project
+    file (None for an untitled one); with snapshot=True it starts from a
+    snapshot of the document instead of from the project file, e.g. after
+    a recovery. close() stops the writer thread; discard=True also deletes
+    the journal, as on a clean exit.
+    """
+
+    def __init__(self, flush_interval=1.0, compact_every=2000):
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.document = None
+        self.project = None
+        self.path = None
+        self.errors = []  # I/O errors of the writer thread, newest last
+        self._ops = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stopping = False
+        self._thread = None
+
+    # -- recording (caller's thread) -------------------------------------
+
+    def attach(self, document, project=None, snapshot=False):
+        self.detach()
+        self.document = document
+        self.project = project
+        old_path, self.path = self.path, journal_path(project)
+        self._queue_rewrite(snapshot)
+        if old_path is not None and old_path != self.path:
+            self._queue_remove(old_path)
+        document.subscribe(self._on_document_event)
+        self._start()
+
+    def detach(self):
+        if self.document is not None:
+            self.document.unsubscribe(self._on_document_event)
+            self.document = None
+
+    def _queue_rewrite(self, snapshot):
+        header = _encode({"format": JOURNAL_FORMAT, "version": JOURNAL_VERSION,
+                          "project": os.path.abspath(self.project) if self.project else None,
+                          "pid": os.getpid()}) + "\n"
+        # Snapshots are O(1) and encoded by the writer thread
+        rewrite = _Rewrite(self.path, header, self.document.snapshot() if snapshot else None)
+        self._ops = 0
+        self._queue(rewrite)
+
+    def _queue_remove(self, path):
+        self._queue(_Remove(path))
+
+    def _queue(self, item):
+        with self._lock:
+            self._pending.append(item)
+            self._idle.clear()
+
+    def _on_document_event(self, event, *args):
+        if event == "added":
+            op = ["a", args[1], [_row(args[0])]]
+        elif event == "added_many":
+            op = ["a", args[1], [_row(element) for element in args[0]]]
+        elif event == "removed":
+            op = ["r", args[0].id]
+        elif event == "removed_many":
+            op = ["R", args[1], len(args[0])]
+        elif event == "moved":
+            op = ["m", args[0].id, args[2]]
+        elif event == "changed":
+            op = ["c", _row(args[0])]
+        elif event == "settings":
+            op = ["s", args[0]]
+        elif event == "cleared":
+            op = ["x"]
+        else:
+            return
+        self._queue(_encode(op) + "\n")
+        self._ops += 1
+        if self._ops >= self.compact_every:
+            self._queue_rewrite(snapshot=True)
+
+    # -- writer thread ---------------------------------------------------
+
+    def _start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout=None):
+        # Wake the writer and wait until everything queued so far is on disk
+        self._wake.set()
+        return self._idle.wait(timeout)
+
+    def close(self, discard=False):
+        self.detach()
+        if discard and self.path:
+            self._queue_remove(self.path)
+            self.path = None
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        path = None
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                items, self._pending = self._pending, []
+            try:
+                if items:
+                    with profiler.span("journal write", "io"):
+                        path = self._write(path, items)
+            except OSError as e:
+                self.errors.append(e)
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
+            if self._stopping and not self._pending:
+                return
+
+    def _write(self, path, items):
+        rewrite = None  # lines starting a new journal file, if requested
+        lines = []
+        for item in items:
+            if isinstance(item, _Rewrite):
+                # Anything queued before a rewrite is superseded by it
+                path = item.path
+                rewrite = [item.header]
+                if item.snapshot is not None:
+                    snapshot = item.snapshot
+                    rows = [_row(element) for element in snapshot]
+                    rewrite.append(_encode(["S", snapshot.settings, rows]) + "\n")
+                lines = []
+            elif isinstance(item, _Remove):
+                if item.path == path:
+                    path = rewrite = None
+                    lines = []
+                try:
+                    os.remove(item.path)
+                except FileNotFoundError:
+                    pass
+            else:
+                lines.append(item)
+
+        if path is None:
+            return None
+        if rewrite is not None:
+            # Write the new journal next to the old one and swap it in, so a
+            # crash leaves either the old or the new journal, never half of one
+            os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as fp:
+                fp.writelines(rewrite)
+                fp.writelines(lines)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(temp_path, path)
+        elif lines:
+            with open(path, "a", encoding="utf-8") as fp:
+                fp.writelines(lines)
+                fp.flush()
+                os.fsync(fp.fileno())
+        return path
+
+
+# -- recovery -----------------------------------------------------------------
+
+def read_journal(path):
+    """Header and operations of a journal, or None if there is none.
+
+    A torn last line (crash in the middle of a write) is ignored.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            lines = fp.readlines()
+    except FileNotFoundError:
+        return None
+    if not lines:
+        return None
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("format") != JOURNAL_FORMAT \
+            or header.get("version") != JOURNAL_VERSION:
+        return None
+    body = [line for line in lines[1:] if line.endswith("\n")]
+    try:
+        ops = json.loads("[" + ",".join(body) + "]") if body else []
+    except ValueError:
+        # Damaged in the middle: keep the operations before the damage
+        ops = []
+        for line in body:
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                break
+    return header, ops
+
+
+def has_changes(path):
+    journal = read_journal(path)
+    return journal is not None and bool(journal[1])
+
+
+def _process_running(pid):
+    if os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # running, as another user
+    return True
+
+
+def is_orphaned(path):
+    """True if the journal holds changes and its writer is no longer running.
+
+    Journals of a running session, including this one, are never offered
+    for recovery; journals without a pid come from older versions.
+    """
+    journal = read_journal(path)
+    if journal is None or not journal[1]:
+        return False
+    pid = journal[0].get("pid")
+    return not (isinstance(pid, int) and (pid == os.getpid() or _process_running(pid)))
+
+
+def orphaned_untitled_journals():
+    """Paths of recoverable untitled journals, newest first."""
+    try:
+        names = os.listdir(JOURNAL_DIR)
+    except OSError:
+        return []
+    paths = [os.path.join(JOURNAL_DIR, name) for name in names
+             if name.startswith(UNTITLED_PREFIX) and name.endswith(UNTITLED_SUFFIX)]
+    paths = [path for path in paths if is_orphaned(path)]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return paths
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def recover(path):
+    """Rebuild the document recorded by a journal.
+
+    Returns (project path or None, Document), or None if the journal holds
+    no changes. Replay stops at the first operation that does not apply.
+    Reading the project file the journal builds on can raise OSError,
+    UnicodeDecodeError or project_file.ProjectFormatError.
+    """
+    journal = read_journal(path)
+    if journal is None or not journal[1]:
+        return None
+    header, ops = journal
+    project = header.get("project")
+    if ops[0][0] != "S" and project and os.path.exists(project):
+        document = project_file.load_project(project)
+    else:
+        document = Document()
+    replay(document, ops)
+    return project, document
+
+
+def replay(document, ops):
+    for op in ops:
+        try:
+            _apply(document, op)
+        except (LookupError, TypeError, ValueError, AttributeError):
+            break
+    return document
+
+
+def _apply(document, op):
+    kind = op[0]
+    if kind == "a":
+        document.insert_elements([Element(*row) for row in op[2]], op[1])
+    elif kind == "r":
+        document.remove_element(document.get(op[1]))
+    elif kind == "R":
+        document.remove_elements(op[1], op[2])
+    elif kind == "m":
+        document.move_element(document.get(op[1]), op[2])
+    elif kind == "c":
+        row = op[1]
+        element = document.get(row[0])
+        x, y = (row[4], row[5]) if len(row) > 4 else (None, None)
+        document.update_element(element, row[2], row[3], x, y)
+    elif kind == "s":
+        document.update_settings(**op[1])
+    elif kind == "x":
+        document.clear()
+    elif kind == "S":
+        document.clear()
+        document.update_settings(**op[1])
+        document.insert_elements([Element(*row) for row in op[2]])
+    else:
+        raise ValueError(f"unknown journal operation {kind!r}")
@@ -0,0 +1,231 @@
+from bisect import bisect_right
+from itertools import accumulate, chain
+
+# Tk-free geometry helpers for the design canvas.
+
+
+class RowLayout:
+    """Vertical stack of rows with individual heights.
+
+    Laid out like Document's position index: the heights are cut into
+    blocks of at most 2 * BLOCK rows, with Fenwick trees over the block
+    sizes and the block heights. Asking for the y offset of a row, finding
+    the row under a y coordinate, changing a height and inserting, removing
+    or moving rows each touch one or two blocks (list operations in C) and
+    O(log n) tree nodes, wherever the rows are. Only splitting or dropping
+    a block re-derives the trees, in O(n / BLOCK).
+    """
+
+    BLOCK = 256
+
+    def __init__(self, heights=()):
+        self.clear()
+        self.insert_many(0, heights)
+
+    def _rebuild(self):
+        blocks = self._blocks
+        totals = self._block_totals
+        n = len(blocks)
+        sizes = [0] * (n + 1)
+        sums = [0] * (n + 1)
+        for i in range(1, n + 1):
+            sizes[i] += len(blocks[i - 1])
+            sums[i] += totals[i - 1]
+            parent = i + (i & -i)
+            if parent <= n:
+                sizes[parent] += sizes[i]
+                sums[parent] += sums[i]
+        self._sizes = sizes
+        self._sums = sums
+
+    def _add(self, block_index, rows, height):
+        self._block_totals[block_index] += height
+        sizes = self._sizes
+        sums = self._sums
+        n = len(sizes) - 1
+        i = block_index + 1
+        while i <= n:
+            sizes[i] += rows
+            sums[i] += height
+            i += i & -i
+
+    @staticmethod
+    def _before(tree, block_index):
+        # Sum of the values of the blocks before block_index
+        total = 0
+        while block_index > 0:
+            total += tree[block_index]
+            block_index -= block_index & -block_index
+        return total
+
+    @staticmethod
+    def _descend(tree, value):
+        # Number of leading blocks whose values add up to at most value, and
+        # what is left of value after them
+        n = len(tree) - 1
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            candidate = pos + step
+            if candidate <= n and tree[candidate] <= value:
+                pos = candidate
+                value -= tree[candidate]
+            step >>= 1
+        return pos, value
+
+    def _find(self, index):
+        # Block holding row index and the offset in it; (len(blocks), 0) for
+        # the end of the stack
+        return self._descend(self._sizes, index)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return chain.from_iterable(self._blocks)
+
+    def total(self):
+        return self._total
+
+    def height(self, index):
+        pos, offset = self._find(index)
+        return self._blocks[pos][offset]
+
+    def offset(self, index):
+        # Sum of the heights of all rows before index
+        pos, offset = self._find(index)
+        top = self._before(self._sums, pos)
+        if offset:
+            top += sum(self._blocks[pos][:offset])
+        return top
+
+    def extent(self, index):
+        top = self.offset(index)
+        return top, top + self.height(index)
+
+    def index_at(self, y):
+        # Index of the row containing y, clamped to the existing rows
+        if self._size == 0 or y <= 0:
+            return 0
+        pos, y = self._descend(self._sums, y)
+        if pos == len(self._blocks):
+            return self._size - 1
+        block = self._blocks[pos]
+        offset = bisect_right(list(accumulate(block)), y)
+        return self._before(self._sizes, pos) + min(offset, len(block) - 1)
+
+    def insertion_index(self, y):
+        # Gap (0 to len) closest to y: before the row under y if y is in
+        # its upper half, after it otherwise
+        n = self._size
+        if n == 0 or y <= 0:
+            return 0
+        if y >= self._total:
+            return n
+        index = self.index_at(y)
+        top, bottom = self.extent(index)
+        return index + 1 if y >= (top + bottom) / 2 else index
+
+    def visible_range(self, top, bottom):
+        if not self._size:
+            return 0, 0
+        return self.index_at(top), self.index_at(bottom) + 1
+
+    def append(self, height):
+        self.insert_many(self._size, [height])
+
+    def insert(self, index, height):
+        self.insert_many(index, [height])
+
+    def insert_many(self, index, heights):
+        heights = list(heights)
+        if not heights:
+            return
+        blocks = self._blocks
+        count = len(heights)
+        added = sum(heights)
+        if index >= self._size and blocks:
+            pos = len(blocks) - 1  # appending, the common case
+            offset = len(blocks[pos])
+        else:
+            pos, offset = self._find(index)
+        self._size += count
+        self._total += added
+        if pos < len(blocks) and len(blocks[pos]) + count <= 2 * self.BLOCK:
+            blocks[pos][offset:offset] = heights
+            self._add(pos, count, added)
+            return
+        # Re-cut the block and the new rows into blocks of BLOCK
+        if pos < len(blocks):
+            block = blocks[pos]
+            heights = block[:offset] + heights + block[offset:]
+        step = self.BLOCK
+        new_blocks = [heights[i:i + step] for i in range(0, len(heights), step)]
+        blocks[pos:pos + 1] = new_blocks
+        self._block_totals[pos:pos + 1] = [sum(block) for block in new_blocks]
+        self._rebuild()
+
+    def pop(self, index):
+        height = self.height(index)
+        self.delete(index, 1)
+        return height
+
+    def delete(self, index, count):
+        count = min(count, self._size - index)
+        if count <= 0:
+            return
+        blocks = self._blocks
+        totals = self._block_totals
+        start, start_offset = self._find(index)
+        self._size -= count
+        block = blocks[start]
+        if start_offset + count <= len(block):
+            end_offset = start_offset + count
+            removed = sum(block[start_offset:end_offset])
+            del block[start_offset:end_offset]
+            self._total -= removed
+            if block:
+                self._add(start, -count, -removed)
+                return
+            del blocks[start]
+            del totals[start]
+        else:
+            end, end_offset = self._find(index + count)
+            before = sum(totals[start:end + 1])
+            del blocks[start][start_offset:]
+            totals[start] = sum(blocks[start])
+            after = totals[start]
+            if end < len(blocks):
+                del blocks[end][:end_offset]
+                totals[end] = sum(blocks[end])
+                after += totals[end]
+            del blocks[start + 1:end]
+            del totals[start + 1:end]
+            self._total -= before - after
+            if not blocks[start]:
+                del blocks[start]
+                del totals[start]
+        self._rebuild()
+
+    def move(self, old_index, new_index):
+        if old_index == new_index:
+            return
+        self.insert(new_index, self.pop(old_index))
+
+    def set_height(self, index, height):
+        pos, offset = self._find(index)
+        block = self._blocks[pos]
+        delta = height - block[offset]
+        if not delta:
+            return
+        block[offset] = height
+        self._total += delta
+        self._add(pos, 0, delta)
+
+    def clear(self):
+        self._blocks = []
+        self._block_totals = []
+        self._sizes = [0]
+        self._sums = [0]
+        self._size = 0
+        self._total = 0
@@ -1,20 +1,61 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+import background
+from canvas_events import add_bindtag, canvas_point
+import html_export
+from document import Document
+
+ELEMENT_TAG = "DesignElement"  # bind tag shared by the canvas and all element widgets
+
+# Elements are drawn either as native canvas items (text, rectangles),
+# which thousands of elements can use with fast redraw, zoom and scroll, or
+# as embedded Frame/Label/Button windows. In both modes a real Entry only
+# exists for the element being edited in place.
+RENDER_ITEMS = "items"
+RENDER_WIDGETS = "widgets"
+
+IMAGE_PLACEHOLDER_SIZE = (150, 80)
+ZOOM_STEP = 1.25
+ZOOM_RANGE = (0.25, 4.0)
+
 class WebDesignerApp:
-    def __init__(self, root):
+    def __init__(self, root, render_mode=RENDER_ITEMS):
         self.root = root
         self.root.title("Modern Web Designer")
-        self.canvas = tk.Canvas(root, bg="white", height=600, width=800)
+        self.scrollbar = tk.Scrollbar(root, orient="vertical")
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(root, bg="white", height=600, width=800,
+                                yscrollcommand=self.scrollbar.set)
         self.canvas.pack(fill="both", expand=True)
-
-        self.elements = []
+        self.scrollbar.config(command=self.canvas.yview)
+
+        self.document = Document()
+        self.document.subscribe(self.on_document_event)
+        self.fragment_cache = html_export.FragmentCache(
+            self.document, render=html_export.render_freeform_element, dependencies={})
+        self.render_mode = render_mode
+        self.zoom = 1.0
+        self.element_items = {}  # element id -> canvas item ids, items mode only
+        self.element_widgets = {}  # element id -> (frame, canvas window id), widgets mode only
+        self.editor = None  # (element, Entry, canvas window id) while editing in place
+        self._scrollregion_pending = None
         self.selected_element = None
         self.next_element_y = 30  # To avoid overlapping placed elements
 
         self.setup_toolbar()
         self.setup_right_click_menu()
 
+        # One handler per event for all elements, whichever item or child
+        # widget is clicked; the element is found by hit-testing the canvas
+        add_bindtag(self.canvas, ELEMENT_TAG)
+        self.root.bind_class(ELEMENT_TAG, "<Button-1>", self.on_element_press)
+        self.root.bind_class(ELEMENT_TAG, "<Double-Button-1>", self.on_element_double_click)
+        self.root.bind_class(ELEMENT_TAG, "<Button-3>", self.on_element_menu)
+        for sequence in ("<MouseWheel>", "<Control-MouseWheel>", "<Button-4>", "<Button-5>",
+                         "<Control-Button-4>", "<Control-Button-5>"):
+            self.root.bind_class(ELEMENT_TAG, sequence, self.on_mouse_wheel)
+
     def setup_toolbar(self):
         toolbar = tk.Frame(self.root, bg="#f0f0f0", height=40)
         toolbar.pack(fill="x")
@@ -24,6 +65,12 @@ class WebDesignerApp:
         tk.Button(toolbar, text="Add Button", command=lambda: self.add_element("button")).pack(side="left", padx=5)
         tk.Button(toolbar, text="Add Image", command=lambda: self.add_element("image")).pack(side="left", padx=5)
         tk.Button(toolbar, text="Export HTML", command=self.export_html).pack(side="right", padx=10)
+        tk.Button(toolbar, text="Export Minified", command=lambda: self.export_html(minify=True)).pack(side="right")
+        self.render_items_var = tk.BooleanVar(value=self.render_mode == RENDER_ITEMS)
+        tk.Checkbutton(toolbar, text="Canvas Items", variable=self.render_items_var,
+                       command=self.toggle_render_mode).pack(side="right", padx=5)
+        tk.Button(toolbar, text="Zoom In", command=lambda: self.set_zoom(self.zoom * ZOOM_STEP)).pack(side="right")
+        tk.Button(toolbar, text="Zoom Out", command=lambda: self.set_zoom(self.zoom / ZOOM_STEP)).pack(side="right")
 
     def setup_right_click_menu(self):
         self.right_click_menu = tk.Menu(self.root, tearoff=0)
@@ -31,13 +78,149 @@ class WebDesignerApp:
         self.right_click_menu.add_command(label="Delete", command=self.delete_selected_element)
 
     def add_element(self, type_):
-        frame = tk.Frame(self.canvas, bd=1, relief="solid")
         content = {
             "header": "Header Text",
             "paragraph": "Paragraph text goes here.",
             "button": "Click Me",
             "image": "Image description"
         }[type_]
+        styles = {
+            "bg_color": "white",
+            "text_color": "black",
+            "padding": 10,
+            "margin": 5,
+            "border_radius": 0,
+            "font_size": 24 if type_ == "header" else 14
+        }
+        # Place each new window at a lower Y position to avoid overlap
+        self.document.add_element(type_, content, styles, x=100, y=self.next_element_y)
+        self.next_element_y += 80
+
+    def on_document_event(self, event, *args):
+        if event == "added":
+            self.show_element(args[0])
+        elif event == "added_many":
+            for element in args[0]:
+                self.show_element(element)
+        elif event == "removed":
+            self.hide_element(args[0])
+        elif event == "removed_many":
+            for element in args[0]:
+                self.hide_element(element)
+        elif event == "changed":
+            if self.render_mode == RENDER_ITEMS:
+                self.draw_element(args[0])
+            else:
+                self.refresh_element_widget(args[0])
+        elif event == "cleared":
+            self.clear_canvas()
+        else:
+            return
+        self.schedule_scrollregion()
+
+    def show_element(self, element):
+        if self.render_mode == RENDER_ITEMS:
+            self.draw_element(element)
+        else:
+            self.create_element_widget(element)
+
+    def hide_element(self, element):
+        if self.editor and self.editor[0] is element:
+            self.finish_inline_edit()
+        if self.render_mode == RENDER_ITEMS:
+            self.canvas.delete(*self.element_items.pop(element.id))
+        else:
+            frame, window = self.element_widgets.pop(element.id)
+            self.canvas.delete(window)
+            frame.destroy()
+
+    def clear_canvas(self):
+        self.finish_inline_edit()
+        self.canvas.delete("element")
+        self.element_items = {}
+        for frame, window in self.element_widgets.values():
+            frame.destroy()
+        self.element_widgets = {}
+
+    def element_bbox(self, element):
+        if self.render_mode == RENDER_ITEMS:
+            return self.canvas.bbox(*self.element_items[element.id])
+        return self.canvas.bbox(self.element_widgets[element.id][1])
+
+    def rerender(self):
+        self.clear_canvas()
+        for element in self.document:
+            self.show_element(element)
+        self.schedule_scrollregion()
+
+    def toggle_render_mode(self):
+        self.render_mode = RENDER_ITEMS if self.render_items_var.get() else RENDER_WIDGETS
+        if self.render_mode == RENDER_WIDGETS:
+            self.zoom = 1.0  # widgets cannot be scaled
+        self.rerender()
+
+    def set_zoom(self, zoom):
+        if self.render_mode != RENDER_ITEMS:
+            return
+        zoom = max(ZOOM_RANGE[0], min(zoom, ZOOM_RANGE[1]))
+        if zoom != self.zoom:
+            self.zoom = zoom
+            self.rerender()
+
+    def schedule_scrollregion(self):
+        # One bbox pass per idle cycle, however many elements changed
+        if self._scrollregion_pending is None:
+            self._scrollregion_pending = self.root.after_idle(self.update_scrollregion)
+
+    def update_scrollregion(self):
+        self._scrollregion_pending = None
+        bbox = self.canvas.bbox("element")
+        self.canvas.configure(scrollregion=(0, 0, bbox[2] + 50, bbox[3] + 50) if bbox else (0, 0, 0, 0))
+
+    def draw_element(self, element):
+        # Native canvas items for one element, all tagged with its id;
+        # replaces whatever was drawn for it before. Items are deleted by
+        # number, which Tk looks up directly, instead of by tag, which
+        # scans every item on the canvas.
+        canvas = self.canvas
+        zoom = self.zoom
+        styles = element.styles
+        tags = ("element", element.id)
+        old_items = self.element_items.get(element.id)
+        if old_items:
+            canvas.delete(*old_items)
+        x, y = element.x * zoom, element.y * zoom
+        inset = (10 + styles.get("padding", 1)) * zoom
+        box = canvas.create_rectangle(x, y, x, y, outline="black", fill=styles.get("bg_color", "white"),
+                                      tags=tags)
+        if element.type == "image":
+            width, height = IMAGE_PLACEHOLDER_SIZE
+            right, bottom = x + inset + width * zoom, y + inset + height * zoom
+            items = (box,
+                     canvas.create_rectangle(x + inset, y + inset, right, bottom, fill="gray", outline="",
+                                             tags=tags),
+                     canvas.create_text((x + inset + right) / 2, (y + inset + bottom) / 2, text="[Image]",
+                                        tags=tags, font=("Arial", max(1, round(10 * zoom)))))
+        else:
+            text = canvas.create_text(x + inset, y + inset, text=element.content, anchor="nw", tags=tags,
+                                      fill=styles.get("text_color", "black"),
+                                      font=("Arial", max(1, round(styles.get("font_size", 14) * zoom))))
+            items = (box, text)
+            left, top, right, bottom = canvas.bbox(text)
+            if element.type == "button":
+                face = canvas.create_rectangle(left - 6 * zoom, top - 3 * zoom, right + 6 * zoom,
+                                               bottom + 3 * zoom, fill="#e1e1e1", outline="#adadad",
+                                               tags=tags)
+                canvas.tag_lower(face, text)
+                items += (face,)
+                right, bottom = right + 6 * zoom, bottom + 3 * zoom
+        canvas.coords(box, x, y, right + inset, bottom + inset)
+        self.element_items[element.id] = items
+
+    def create_element_widget(self, element):
+        type_ = element.type
+        content = element.content
+        frame = tk.Frame(self.canvas, bd=1, relief="solid")
 
         widget = None
         if type_ == "header":
@@ -50,29 +233,83 @@ class WebDesignerApp:
             widget = tk.Label(frame, text="[Image]", bg="gray", width=20, height=5)
 
         widget.pack(padx=10, pady=10)
-        # Place each new window at a lower Y position to avoid overlap
-        window = self.canvas.create_window(100, self.next_element_y, window=frame, anchor="nw")
-        self.next_element_y += 80
-
-        element = {
-            "type": type_,
-            "content": content,
-            "frame": frame,
-            "window": window,
-            "styles": {
-                "bg_color": "white",
-                "text_color": "black",
-                "padding": 10,
-                "margin": 5,
-                "border_radius": 0,
-                "font_size": 24 if type_ == "header" else 14
-            }
-        }
-
-        frame.bind("<Button-1>", lambda e, el=element: self.select_element(el))
-        frame.bind("<Button-3>", lambda e, el=element: self.show_right_click_menu(e, el))
-
-        self.elements.append(element)
+        # The element id tag maps canvas items back to elements
+        window = self.canvas.create_window(element.x, element.y, window=frame, anchor="nw",
+                                           tags=("element", element.id))
+        self.element_widgets[element.id] = (frame, window)
+        add_bindtag(frame, ELEMENT_TAG)
+
+    def refresh_element_widget(self, element):
+        frame, window = self.element_widgets[element.id]
+        styles = element.styles
+        for widget in frame.winfo_children():
+            if isinstance(widget, (tk.Label, tk.Button)):
+                widget.config(
+                    text=element.content,
+                    bg=styles['bg_color'],
+                    fg=styles['text_color'],
+                    font=("Arial", styles['font_size']),
+                    padx=styles['padding'],
+                    pady=styles['padding']
+                )
+        self.canvas.coords(window, element.x, element.y)
+
+    def element_at(self, x, y):
+        # Topmost element under canvas point (x, y)
+        for item in reversed(self.canvas.find_overlapping(x, y, x, y)):
+            tags = self.canvas.gettags(item)
+            if "element" in tags:
+                for tag in tags:
+                    if tag != "element":
+                        return self.document.get(tag)
+        return None
+
+    def on_element_press(self, event):
+        element = self.element_at(*canvas_point(self.canvas, event))
+        if element is not None:
+            self.select_element(element)
+
+    def on_element_double_click(self, event):
+        element = self.element_at(*canvas_point(self.canvas, event))
+        if element is not None:
+            self.start_inline_edit(element)
+
+    def start_inline_edit(self, element):
+        # The only real widget an element gets in canvas-items mode
+        self.finish_inline_edit()
+        left, top, right, bottom = self.element_bbox(element)
+        font_size = max(1, round(element.styles.get("font_size", 14) * self.zoom))
+        entry = tk.Entry(self.canvas, font=("Arial", font_size))
+        entry.insert(0, element.content or "")
+        entry.select_range(0, "end")
+        window = self.canvas.create_window(left, top, window=entry, anchor="nw", width=right - left)
+        entry.bind("<Return>", lambda e: self.finish_inline_edit(commit=True))
+        entry.bind("<FocusOut>", lambda e: self.finish_inline_edit(commit=True))
+        entry.bind("<Escape>", lambda e: self.finish_inline_edit())
+        entry.focus_set()
+        self.editor = (element, entry, window)
+
+    def finish_inline_edit(self, commit=False):
+        if self.editor is None:
+            return
+        (element, entry, window), self.editor = self.editor, None
+        content = entry.get()
+        self.canvas.delete(window)
+        entry.destroy()
+        if commit and element in self.document and content != element.content:
+            self.document.update_element(element, content=content)
+
+    def on_mouse_wheel(self, event):
+        up = event.num == 4 or event.delta > 0
+        if event.state & 0x0004:  # Control
+            self.set_zoom(self.zoom * ZOOM_STEP if up else self.zoom / ZOOM_STEP)
+        else:
+            self.canvas.yview_scroll(-1 if up else 1, "units")
+
+    def on_element_menu(self, event):
+        element = self.element_at(*canvas_point(self.canvas, event))
+        if element is not None:
+            self.show_right_click_menu(event, element)
 
     def select_element(self, element):
         self.selected_element = element
@@ -83,8 +320,7 @@ class WebDesignerApp:
 
     def delete_selected_element(self):
         if self.selected_element:
-            self.canvas.delete(self.selected_element["window"])
-            self.elements.remove(self.selected_element)
+            self.document.remove_element(self.selected_element)
             self.selected_element = None
 
     def show_properties(self, element):
@@ -96,37 +332,37 @@ class WebDesignerApp:
 
         tk.Label(properties_window, text="Content:").pack()
         content_entry = tk.Entry(properties_window)
-        content_entry.insert(0, element['content'])
+        content_entry.insert(0, element.content)
         content_entry.pack()
 
         tk.Label(properties_window, text="Background Color (hex):").pack()
         bg_entry = tk.Entry(properties_window)
-        bg_entry.insert(0, element['styles'].get("bg_color", "white"))
+        bg_entry.insert(0, element.styles.get("bg_color", "white"))
         bg_entry.pack()
 
         tk.Label(properties_window, text="Text Color (hex):").pack()
         fg_entry = tk.Entry(properties_window)
-        fg_entry.insert(0, element['styles'].get("text_color", "black"))
+        fg_entry.insert(0, element.styles.get("text_color", "black"))
         fg_entry.pack()
 
         tk.Label(properties_window, text="Padding (px):").pack()
         padding_entry = tk.Entry(properties_window)
-        padding_entry.insert(0, str(element['styles'].get("padding", 10)))
+        padding_entry.insert(0, str(element.styles.get("padding", 10)))
         padding_entry.pack()
 
         tk.Label(properties_window, text="Margin (px):").pack()
         margin_entry = tk.Entry(properties_window)
-        margin_entry.insert(0, str(element['styles'].get("margin", 5)))
+        margin_entry.insert(0, str(element.styles.get("margin", 5)))
         margin_entry.pack()
 
         tk.Label(properties_window, text="Border Radius (px):").pack()
         radius_entry = tk.Entry(properties_window)
-        radius_entry.insert(0, str(element['styles'].get("border_radius", 0)))
+        radius_entry.insert(0, str(element.styles.get("border_radius", 0)))
         radius_entry.pack()
 
         tk.Label(properties_window, text="Font Size (px):").pack()
         font_entry = tk.Entry(properties_window)
-        font_entry.insert(0, str(element['styles'].get("font_size", 14)))
+        font_entry.insert(0, str(element.styles.get("font_size", 14)))
         font_entry.pack()
 
         def apply_properties():
@@ -139,78 +375,24 @@ class WebDesignerApp:
                 messagebox.showerror("Invalid input", "Padding, Margin, Border Radius, and Font Size must be integers.")
                 return
 
-            element['content'] = content_entry.get()
-            element['styles'] = {
+            self.document.update_element(element, content=content_entry.get(), styles={
                 "bg_color": bg_entry.get(),
                 "text_color": fg_entry.get(),
                 "padding": padding,
                 "margin": margin,
                 "border_radius": border_radius,
                 "font_size": font_size
-            }
-
-            for widget in element['frame'].winfo_children():
-                if isinstance(widget, tk.Label):
-                    widget.config(
-                        text=element['content'],
-                        bg=element['styles']['bg_color'],
-                        fg=element['styles']['text_color'],
-                        font=("Arial", element['styles']['font_size']),
-                        padx=element['styles']['padding'],
-                        pady=element['styles']['padding']
-                    )
-                elif isinstance(widget, tk.Button):
-                    widget.config(
-                        text=element['content'],
-                        bg=element['styles']['bg_color'],
-                        fg=element['styles']['text_color'],
-                        font=("Arial", element['styles']['font_size']),
-                        padx=element['styles']['padding'],
-                        pady=element['styles']['padding']
-                    )
+            })
             properties_window.destroy()
 
         tk.Button(properties_window, text="Apply", command=apply_properties).pack(pady=10)
 
-    def export_html(self):
-        html = """<!DOCTYPE html>
-<html>
-<head>
-<style>
-body { font-family: Arial, sans-serif; }
-</style>
-</head>
-<body>
-"""
-
-        for element in self.elements:
-            styles = element.get("styles", {})
-            style_str = (
-                f"background-color: {styles.get('bg_color', '#ffffff')}; "
-                f"color: {styles.get('text_color', '#000000')}; "
-                f"padding: {styles.get('padding', 10)}px; "
-                f"margin: {styles.get('margin', 5)}px; "
-                f"border-radius: {styles.get('border_radius', 0)}px; "
-                f"font-size: {styles.get('font_size', 14)}px; "
-            )
-
-            content = element['content']
-            if element['type'] == 'header':
-                html += f'<h1 style="{style_str}">{content}</h1>\n'
-            elif element['type'] == 'paragraph':
-                html += f'<p style="{style_str}">{content}</p>\n'
-            elif element['type'] == 'button':
-                html += f'<button style="{style_str}">{content}</button>\n'
-            elif element['type'] == 'image':
-                html += f'<img src="#" alt="{content}" style="{style_str} width:100%; height:auto;">\n'
-
-        html += "</body>\n</html>"
-
+    def export_html(self, minify=False):
         file_path = filedialog.asksaveasfilename(defaultextension=".html", filetypes=[("HTML files", "*.html")])
         if file_path:
             try:
-                with open(file_path, "w", encoding="utf-8") as file:
-                    file.write(html)
+                background.atomic_write(file_path, lambda file: html_export.write_freeform_html(
+                    self.document, file, self.fragment_cache, minify=minify))
             except Exception as e:
                 messagebox.showerror("Error", f"Could not save file: {e}")
 
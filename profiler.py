@@ -0,0 +1,254 @@
+import bisect
+import json
+import os
+import time
+import types
+from contextlib import contextmanager
+from functools import wraps
+
+# Per-handler latency profiling for the Tk front ends.
+#
+# install_tk_hook() routes every Tk callback registered afterwards (widget
+# commands, bindings, after/after_idle, variable traces) through a timing
+# wrapper, and @profiled marks major operations that are not callbacks of
+# their own. While nothing is recording a wrapped call costs one flag
+# check; otherwise it adds two clock reads and a histogram update, so it
+# can stay available in normal builds.
+#
+# The same measurements feed a tracing.TraceRecorder when one is set as
+# profiler.trace, so a session can be recorded span by span, and a
+# stall_watchdog.Watchdog set as profiler.watchdog, which blames stalls
+# of the event loop on the slow calls that caused them. span() can also
+# be used on worker threads (file writes); everything else runs on the Tk
+# thread.
+
+ENV_VAR = "WEB_DESIGNER_PROFILE"
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket holds
+# everything slower than the last bound
+BUCKET_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class HandlerStats:
+    __slots__ = ("name", "count", "total", "max", "buckets")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def p95(self):
+        return self.percentile(0.95)
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of calls
+        # (the exact maximum for the open-ended last bucket)
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "calls": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "histogram": self.buckets,
+        }
+
+
+class HandlerProfiler:
+    """Call counts and latency histograms per handler name.
+
+    enabled turns the statistics on; trace and watchdog, if not None,
+    receive every measured call whether or not enabled is set.
+    """
+
+    def __init__(self, enabled=False):
+        self._enabled = enabled
+        self._trace = None
+        self._watchdog = None
+        self.active = enabled  # any of the above; checked on every call
+        self.stats = {}
+        self.started = time.time()
+
+    def _update_active(self):
+        self.active = self._enabled or self._trace is not None or self._watchdog is not None
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = enabled
+        self._update_active()
+
+    @property
+    def trace(self):
+        return self._trace
+
+    @trace.setter
+    def trace(self, recorder):
+        self._trace = recorder
+        self._update_active()
+
+    @property
+    def watchdog(self):
+        return self._watchdog
+
+    @watchdog.setter
+    def watchdog(self, watchdog):
+        self._watchdog = watchdog
+        self._update_active()
+
+    def record(self, name, seconds):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats(name)
+        stats.add(seconds)
+
+    def reset(self):
+        self.stats = {}
+        self.started = time.time()
+
+    def finish(self, name, category, start):
+        # A measured call that began at start (perf_counter) just ended
+        end = time.perf_counter()
+        if self._enabled:
+            self.record(name, end - start)
+        trace = self._trace
+        if trace is not None:
+            trace.complete(name, category, start, end)
+        watchdog = self._watchdog
+        if watchdog is not None and end - start >= watchdog.threshold:
+            watchdog.slow_call(name, start, end)
+
+    def wrap(self, name, func, category="op"):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.active:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.finish(name, category, start)
+        return wrapper
+
+    @contextmanager
+    def span(self, name, category="op"):
+        if not self.active:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.finish(name, category, start)
+
+    def slowest(self, key="total"):
+        return sorted(self.stats.values(), key=lambda stats: getattr(stats, key), reverse=True)
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "exported": time.time(),
+            "bucket_bounds": list(BUCKET_BOUNDS),
+            "handlers": {stats.name: stats.to_dict() for stats in self.slowest()},
+        }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.to_dict(), fp, indent=2)
+
+
+# The profiler of this process, shared by the Tk hook and @profiled
+profiler = HandlerProfiler(enabled=bool(os.environ.get(ENV_VAR)))
+
+
+def profiled(func):
+    """Decorator recording a function under its qualified name."""
+    return profiler.wrap(func.__qualname__, func)
+
+
+def callback_name(func):
+    owner = getattr(func, "__self__", None)
+    if owner is not None and not isinstance(owner, types.ModuleType):
+        return f"{type(owner).__name__}.{func.__name__}"
+    name = getattr(func, "__qualname__", None) or repr(func)
+    if name.endswith("after.<locals>.callit"):
+        # after() wraps the callback; it copies the callback's __name__
+        return f"after:{func.__name__}"
+    return name
+
+
+# True while after_idle() registers its callback, so the wrapper can tell
+# idle callbacks from timers (both are registered through after())
+_registering_idle = False
+
+
+def install_tk_hook():
+    """Time every Tk callback registered from now on (idempotent)."""
+    import tkinter as tk
+
+    if getattr(tk.CallWrapper, "profiled", False):
+        return
+
+    class ProfiledCallWrapper(tk.CallWrapper):
+        profiled = True
+
+        def __init__(self, func, subst, widget):
+            super().__init__(func, subst, widget)
+            self.name = callback_name(func)
+            self.idle = _registering_idle
+
+        def __call__(self, *args):
+            if not profiler.active:
+                return super().__call__(*args)
+            trace = profiler.trace
+            start = time.perf_counter()
+            if trace is not None:
+                # Event bindings get Tk's %-substitutions; %T, the event
+                # type, is the 16th (see Misc._subst_format)
+                event_type = args[15] if self.subst and len(args) > 15 else None
+                trace.callback_started(self.name, start, event_type, self.idle)
+            try:
+                return super().__call__(*args)
+            finally:
+                profiler.finish(self.name, "tk", start)
+
+    after_idle = tk.Misc.after_idle
+
+    def profiled_after_idle(self, func, *args):
+        global _registering_idle
+        _registering_idle = True
+        try:
+            return after_idle(self, func, *args)
+        finally:
+            _registering_idle = False
+
+    tk.CallWrapper = ProfiledCallWrapper
+    tk.Misc.after_idle = profiled_after_idle
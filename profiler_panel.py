@@ -0,0 +1,209 @@
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from profiler import profiler
+
+COLUMNS = (
+    ("calls", "Calls", 70),
+    ("total", "Total ms", 90),
+    ("mean", "Mean ms", 80),
+    ("p95", "p95 ms", 80),
+    ("max", "Max ms", 80),
+)
+
+
+class ProfilerWindow(tk.Toplevel):
+    """Live table of the handler profiler, slowest (by total time) first.
+
+    The table is refreshed every `refresh_ms` while the window is open;
+    closing it stops the refresh but not the recording.
+    """
+
+    def __init__(self, master, refresh_ms=1000, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Handler Profiler")
+        self.geometry("640x400")
+        self.refresh_ms = refresh_ms
+        self.sort_key = "total"
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(fill="x", padx=5, pady=5)
+        self.enabled_var = tk.BooleanVar(value=profiler.enabled)
+        tk.Checkbutton(toolbar, text="Record", variable=self.enabled_var,
+                       command=self.toggle_recording).pack(side="left")
+        tk.Button(toolbar, text="Reset", command=self.reset).pack(side="left", padx=5)
+        tk.Button(toolbar, text="Export JSON...", command=self.export_json).pack(side="left")
+        self.summary = tk.Label(toolbar, anchor=tk.E)
+        self.summary.pack(side="right")
+
+        self.table = ttk.Treeview(self, columns=[key for key, _, _ in COLUMNS])
+        self.table.heading("#0", text="Handler", command=lambda: self.sort_by("name"))
+        self.table.column("#0", width=240)
+        for key, title, width in COLUMNS:
+            self.table.heading(key, text=title, command=lambda k=key: self.sort_by(k))
+            self.table.column(key, width=width, anchor=tk.E)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(fill="both", expand=True)
+
+        self._refresh_id = None
+        self.refresh()
+
+    def refresh(self):
+        self._refresh_id = self.after(self.refresh_ms, self.refresh)
+        self.enabled_var.set(profiler.enabled)
+        rows = profiler.slowest(self.sort_key)
+        if self.sort_key == "name":
+            rows.reverse()
+        self.table.delete(*self.table.get_children())
+        for stats in rows:
+            self.table.insert("", "end", text=stats.name, values=(
+                stats.count,
+                f"{stats.total * 1000:.1f}",
+                f"{stats.mean * 1000:.2f}",
+                f"{stats.percentile(0.95) * 1000:.2f}",
+                f"{stats.max * 1000:.2f}",
+            ))
+        calls = sum(stats.count for stats in rows)
+        self.summary.config(text=f"{len(rows)} handlers, {calls} calls")
+
+    def sort_by(self, key):
+        self.sort_key = "count" if key == "calls" else key
+        self.refresh_now()
+
+    def refresh_now(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+        self.refresh()
+
+    def toggle_recording(self):
+        profiler.enabled = self.enabled_var.get()
+
+    def reset(self):
+        profiler.reset()
+        self.refresh_now()
+
+    def export_json(self):
+        file_path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")])
+        if not file_path:
+            return
+        try:
+            profiler.export_json(file_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export profile: {e}", parent=self)
+
+    def destroy(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        super().destroy()
+
+
+STALL_COLUMNS = (
+    ("duration", "Duration ms", 90),
+    ("handler", "Blocking handler", 300),
+)
+
+
+class StallWindow(tk.Toplevel):
+    """Diagnostics of a stall_watchdog.Watchdog.
+
+    Shows the lag figures and the longest stalls; selecting a stall shows
+    the calls blamed for it and, if one was taken, its stack sample.
+    """
+
+    def __init__(self, master, watchdog, refresh_ms=1000, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Responsiveness")
+        self.geometry("640x480")
+        self.watchdog = watchdog
+        self.refresh_ms = refresh_ms
+        self.stalls = []
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(fill="x", padx=5, pady=5)
+        self.sample_var = tk.BooleanVar(value=watchdog.sample_stacks)
+        tk.Checkbutton(toolbar, text="Sample Stacks", variable=self.sample_var,
+                       command=self.toggle_sampling).pack(side="left")
+        tk.Button(toolbar, text="Reset", command=self.reset).pack(side="left", padx=5)
+        tk.Button(toolbar, text="Export JSON...", command=self.export_json).pack(side="left")
+        self.summary = tk.Label(self, anchor=tk.W, justify=tk.LEFT)
+        self.summary.pack(fill="x", padx=5)
+
+        self.table = ttk.Treeview(self, columns=[key for key, _, _ in STALL_COLUMNS], height=8)
+        self.table.heading("#0", text="Time")
+        self.table.column("#0", width=90)
+        for key, title, width in STALL_COLUMNS:
+            self.table.heading(key, text=title)
+            self.table.column(key, width=width, anchor=tk.E if key == "duration" else tk.W)
+        self.table.pack(fill="both", expand=True, padx=5)
+        self.table.bind("<<TreeviewSelect>>", self.show_details)
+
+        self.details = tk.Text(self, height=10, wrap="none", state="disabled")
+        self.details.pack(fill="both", padx=5, pady=5)
+
+        self._refresh_id = None
+        self.refresh()
+
+    def refresh(self):
+        self._refresh_id = self.after(self.refresh_ms, self.refresh)
+        watchdog = self.watchdog
+        self.summary.config(text=(
+            f"{watchdog.stall_count} stalls over {watchdog.threshold * 1000:.0f} ms in "
+            f"{watchdog.beats} heartbeats; lag mean {watchdog.mean_lag * 1000:.1f} ms, "
+            f"max {watchdog.max_lag * 1000:.1f} ms, last {watchdog.last_lag * 1000:.1f} ms"))
+        if self.stalls == watchdog.worst:
+            return
+        self.stalls = list(watchdog.worst)
+        self.table.delete(*self.table.get_children())
+        for index, stall in enumerate(self.stalls):
+            started = time.strftime("%H:%M:%S", time.localtime(stall.time))
+            self.table.insert("", "end", iid=str(index), text=started,
+                              values=(f"{stall.duration * 1000:.0f}", stall.culprit))
+
+    def show_details(self, event=None):
+        selection = self.table.selection()
+        if not selection:
+            return
+        stall = self.stalls[int(selection[0])]
+        handlers = stall.handlers or ["(none measured)"]
+        text = "Slow calls during the stall:\n" + "\n".join(f"  {name}" for name in handlers)
+        if stall.stack:
+            text += "\n\nStack of the Tk thread during the stall:\n" + stall.stack
+        self.details.config(state="normal")
+        self.details.delete("1.0", "end")
+        self.details.insert("1.0", text)
+        self.details.config(state="disabled")
+
+    def toggle_sampling(self):
+        self.watchdog.sample_stacks = self.sample_var.get()
+
+    def reset(self):
+        self.watchdog.reset()
+        self.refresh_now()
+
+    def refresh_now(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+        self.refresh()
+
+    def export_json(self):
+        file_path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")])
+        if not file_path:
+            return
+        try:
+            self.watchdog.export_json(file_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export stalls: {e}", parent=self)
+
+    def destroy(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        super().destroy()
@@ -0,0 +1,211 @@
+import itertools
+import json
+import re
+
+from document import ELEMENT_DEFAULTS, Document, Element, intern_styles
+
+# Project files (.wdp) in a versioned JSON-lines format.
+#
+# The first line is a header object:
+#   {"format": "wdp", "version": 1, "settings": {...}, "elements": 3}
+# followed by one JSON value per line, in document order:
+#   {"styles": {...}}                     defines the next style set index
+#   ["header_0", "header", "Title", 0]    id, type, content, style index
+#   ["button_7", "button", "Go", 1, 40, 80]   ... plus x, y (freeform)
+#
+# Identical style sets are written once and referenced by index, so a page
+# of thousands of similarly styled elements stays small and loading
+# interns each style set only once. Reading is streamed: lines are parsed
+# in chunks and handed out as lists of elements, so a caller can show the
+# first screen while the rest of the file is still being read.
+
+FORMAT_NAME = "wdp"
+FORMAT_VERSION = 1
+CHUNK_SIZE = 2000
+
+LEGACY_HEADER = "Web Design Project File"
+_LEGACY_LINE = re.compile(r"Element: (\w+), Content: (.*)$")
+
+_STYLE_VALUE_TYPES = (str, int, float, bool)
+_NUMBER_TYPES = (int, float)
+
+
+class ProjectFormatError(ValueError):
+    """Raised for files that are not valid projects of a supported version."""
+
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def iter_project(document):
+    """Serialized project as a stream of lines."""
+    yield _dumps({"format": FORMAT_NAME, "version": FORMAT_VERSION,
+                  "settings": dict(document.settings), "elements": len(document)}) + "\n"
+    style_index = {}  # id(styles) -> (styles, index)
+    for element in document:
+        styles = element.styles
+        entry = style_index.get(id(styles))
+        if entry is None or entry[0] is not styles:
+            entry = style_index[id(styles)] = (styles, len(style_index))
+            yield _dumps({"styles": styles}) + "\n"
+        row = [element.id, element.type, element.content, entry[1]]
+        if element.x is not None:
+            row += [element.x, element.y]
+        yield _dumps(row) + "\n"
+
+
+def write_project(document, fp):
+    fp.writelines(iter_project(document))
+
+
+def save_project(document, path):
+    with open(path, "w", encoding="utf-8") as fp:
+        write_project(document, fp)
+
+
+class ProjectReader:
+    """Streaming project loader.
+
+    The header is read on construction (settings, count, version); iterating
+    yields lists of up to chunk_size Element objects. Each chunk of lines is
+    parsed with a single json.loads call and validated before it is handed
+    out. Legacy text projects are read as well; they only stored element
+    types and content, so their elements get the default styles.
+    """
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.line_number = 1
+        self.legacy = False
+        self.read_count = 0
+        self._styles = []
+
+        first = fp.readline()
+        if first.rstrip("\r\n") == LEGACY_HEADER:
+            self.legacy = True
+            self.version = 0
+            self.settings = {}
+            self.count = None
+            return
+        try:
+            header = json.loads(first)
+        except ValueError:
+            raise ProjectFormatError("Not a web design project file") from None
+        if not isinstance(header, dict) or header.get("format") != FORMAT_NAME:
+            raise ProjectFormatError("Not a web design project file")
+        version = header.get("version")
+        if not isinstance(version, int) or version < 1:
+            raise ProjectFormatError("Missing project format version")
+        if version > FORMAT_VERSION:
+            raise ProjectFormatError(f"Project format version {version} is newer than this program "
+                                     f"supports (version {FORMAT_VERSION})")
+        settings = header.get("settings", {})
+        if not isinstance(settings, dict) or not all(isinstance(value, str) for value in settings.values()):
+            raise ProjectFormatError("line 1: settings must map names to strings")
+        count = header.get("elements")
+        if count is not None and (not isinstance(count, int) or count < 0):
+            raise ProjectFormatError("line 1: invalid element count")
+        self.version = version
+        self.settings = settings
+        self.count = count
+
+    def __iter__(self):
+        read = self._read_legacy if self.legacy else self._read_chunk
+        while True:
+            lines = list(itertools.islice(self.fp, self.chunk_size))
+            if not lines:
+                if self.count is not None and self.read_count != self.count:
+                    raise ProjectFormatError(f"file ends after {self.read_count} of "
+                                             f"{self.count} elements")
+                return
+            elements = read(lines)
+            self.read_count += len(elements)
+            if self.count is not None and self.read_count > self.count:
+                raise ProjectFormatError(f"more elements than the {self.count} in the header")
+            if elements:
+                yield elements
+
+    def _error(self, offset, message):
+        return ProjectFormatError(f"line {self.line_number + offset + 1}: {message}")
+
+    def _read_chunk(self, lines):
+        line_count = len(lines)
+        offsets = [offset for offset, line in enumerate(lines) if not line.isspace()]
+        if len(offsets) < len(lines):
+            lines = [lines[offset] for offset in offsets]
+        try:
+            values = json.loads("[" + ",".join(lines) + "]") if lines else []
+        except ValueError:
+            # Find the offending line for the error message
+            for offset, line in zip(offsets, lines):
+                try:
+                    json.loads(line)
+                except ValueError as e:
+                    raise self._error(offset, f"invalid JSON ({e.msg})") from None
+            raise
+
+        styles_table = self._styles
+        elements = []
+        for offset, value in zip(offsets, values):
+            if type(value) is list:
+                size = len(value)
+                if size != 4 and size != 6:
+                    raise self._error(offset, "element rows need 4 or 6 fields")
+                element_id, type_, content, style_index = value[:4]
+                if type(element_id) is not str or type(type_) is not str:
+                    raise self._error(offset, "element id and type must be strings")
+                if type_ not in ELEMENT_DEFAULTS:
+                    raise self._error(offset, f"unknown element type {type_!r}")
+                if content is not None and type(content) is not str:
+                    raise self._error(offset, "element content must be a string or null")
+                if type(style_index) is not int or not 0 <= style_index < len(styles_table):
+                    raise self._error(offset, f"undefined style set {style_index!r}")
+                x = y = None
+                if size == 6:
+                    x, y = value[4], value[5]
+                    if not isinstance(x, _NUMBER_TYPES) or not isinstance(y, _NUMBER_TYPES):
+                        raise self._error(offset, "element position must be numbers")
+                elements.append(Element(element_id, type_, content, styles_table[style_index], x, y))
+            elif type(value) is dict and "styles" in value:
+                styles = value["styles"]
+                if type(styles) is not dict or not all(
+                        isinstance(item, _STYLE_VALUE_TYPES) for item in styles.values()):
+                    raise self._error(offset, "style sets must map names to strings or numbers")
+                # Interned once here; elements then share the StyleSet as is
+                styles_table.append(intern_styles(styles))
+            else:
+                raise self._error(offset, "expected an element row or a style set")
+        self.line_number += line_count
+        return elements
+
+    def _read_legacy(self, lines):
+        elements = []
+        for offset, line in enumerate(lines):
+            if line.isspace():
+                continue
+            match = _LEGACY_LINE.match(line.rstrip("\r\n"))
+            if match is None or match.group(1) not in ELEMENT_DEFAULTS:
+                raise self._error(offset, "unrecognized line in legacy project")
+            type_, content = match.groups()
+            default_content, default_styles = ELEMENT_DEFAULTS[type_]
+            if default_content is None and content == "None":
+                content = None
+            element_id = f"{type_}_{self.line_number + offset}"
+            elements.append(Element(element_id, type_, content, default_styles))
+        self.line_number += len(lines)
+        return elements
+
+
+def load_project(path, document=None):
+    """Read a whole project into document (a new Document if None)."""
+    with open(path, "r", encoding="utf-8") as fp:
+        reader = ProjectReader(fp)
+        if document is None:
+            document = Document(reader.settings)
+        else:
+            document.clear()
+            document.update_settings(**reader.settings)
+        for elements in reader:
+            document.insert_elements(elements)
+    return document
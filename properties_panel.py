@@ -0,0 +1,151 @@
+import tkinter as tk
+from tkinter import messagebox
+
+from document import ELEMENT_DEFAULTS
+
+FONT_WEIGHTS = ("normal", "bold")
+
+
+class PropertyTemplate:
+    # Widgets for one element type, built once and rebound on selection
+    __slots__ = ("frame", "type_var", "content_var", "style_vars", "rows")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.type_var = tk.StringVar()
+        self.content_var = None
+        self.style_vars = {}
+        self.rows = None
+
+
+class PropertiesPanel(tk.Frame):
+    """Element properties editor.
+
+    One PropertyTemplate is built per element type the first time such an
+    element is selected and then cached. Changing the selection only swaps
+    the packed template and sets a few Tk variables, so no widgets are
+    created or destroyed while clicking through elements.
+
+    on_apply(element, content, styles) is called when the user presses
+    Apply or Return in one of the fields.
+    """
+
+    def __init__(self, master, on_apply, bg=None, fg=None, **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.on_apply = on_apply
+        self.bg = bg
+        self.fg = fg
+        self.templates = {}
+        self.element = None
+
+        self.empty_label = tk.Label(self, text="No element selected", bg=bg, fg="#7f8c8d")
+        self.empty_label.pack(pady=20)
+        self.shown = self.empty_label
+
+    def show(self, element):
+        self.element = element
+        if element is None:
+            self._swap(self.empty_label, pady=20)
+            return
+        template = self.templates.get(element.type)
+        if template is None:
+            template = self.templates[element.type] = self._build_template(element.type)
+        self._rebind(template, element)
+        self._swap(template.frame, fill="both", expand=True)
+
+    def _swap(self, widget, **pack_options):
+        if widget is not self.shown:
+            self.shown.pack_forget()
+            widget.pack(**pack_options)
+            self.shown = widget
+
+    def _build_template(self, type_):
+        default_content, default_styles = ELEMENT_DEFAULTS.get(type_, (None, {}))
+        template = PropertyTemplate(tk.Frame(self, bg=self.bg))
+        frame = template.frame
+
+        tk.Label(frame, textvariable=template.type_var, bg=self.bg, fg=self.fg,
+                 font=('Helvetica', 10, 'bold')).pack(pady=5)
+
+        if default_content is not None:
+            tk.Label(frame, text="Content:", bg=self.bg).pack(anchor="w")
+            template.content_var = tk.StringVar()
+            content_entry = tk.Entry(frame, width=30, textvariable=template.content_var)
+            content_entry.pack(fill="x", pady=2)
+            content_entry.bind("<Return>", lambda e: self.apply())
+
+        tk.Label(frame, text="Styles:", bg=self.bg, font=('Helvetica', 9, 'italic')).pack(anchor="w", pady=(10, 0))
+        template.rows = tk.Frame(frame, bg=self.bg)
+        template.rows.pack(fill="x")
+        template.rows.grid_columnconfigure(1, weight=1)
+        for key in default_styles:
+            self._add_style_row(template, key)
+
+        tk.Button(frame, text="Apply", command=self.apply).pack(fill="x", pady=(10, 0))
+        return template
+
+    def _add_style_row(self, template, key):
+        row = len(template.style_vars)
+        tk.Label(template.rows, text=f"{key}:", bg=self.bg).grid(row=row, column=0, sticky="w")
+        var = tk.StringVar()
+        entry = tk.Entry(template.rows, width=14, textvariable=var)
+        entry.grid(row=row, column=1, sticky="we", pady=1)
+        entry.bind("<Return>", lambda e: self.apply())
+        template.style_vars[key] = var
+
+    def _rebind(self, template, element):
+        template.type_var.set(f"Type: {element.type.capitalize()}")
+        if template.content_var is not None:
+            template.content_var.set("" if element.content is None else element.content)
+        for key in element.styles:
+            if key not in template.style_vars:
+                # Styles outside the type's defaults get a row the first time
+                # they are seen; the row is then part of the cached template
+                self._add_style_row(template, key)
+        for key, var in template.style_vars.items():
+            value = element.styles.get(key)
+            var.set("" if value is None else str(value))
+
+    def apply(self):
+        element = self.element
+        if element is None:
+            return
+        template = self.templates[element.type]
+        content = element.content
+        if template.content_var is not None:
+            content = template.content_var.get()
+
+        styles = dict(element.styles)
+        for key, var in template.style_vars.items():
+            text = var.get().strip()
+            if key not in styles and not text:
+                continue
+            current = styles.get(key, ELEMENT_DEFAULTS.get(element.type, (None, {}))[1].get(key))
+            try:
+                if isinstance(current, bool) or not isinstance(current, (int, float)):
+                    styles[key] = text
+                elif isinstance(current, int):
+                    styles[key] = int(text)
+                else:
+                    styles[key] = float(text)
+            except ValueError:
+                messagebox.showerror("Invalid input", f"'{key}' must be a number.")
+                return
+            error = self.check_style(key, styles[key])
+            if error:
+                messagebox.showerror("Invalid input", error)
+                return
+
+        if content != element.content or styles != element.styles:
+            self.on_apply(element, content, styles)
+
+    def check_style(self, key, value):
+        # Values the canvas widgets would reject; None if value is fine
+        if key.endswith("color"):
+            try:
+                self.winfo_rgb(value)
+            except tk.TclError:
+                return f"'{key}' must be a color name or #rrggbb, not '{value}'."
+        elif key == "font_weight" and value not in FONT_WEIGHTS:
+            return f"'{key}' must be one of: {', '.join(FONT_WEIGHTS)}."
+        return None
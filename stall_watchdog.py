@@ -0,0 +1,191 @@
+import collections
+import json
+import sys
+import threading
+import time
+import traceback
+
+from profiler import profiler
+
+# Event-loop responsiveness watchdog.
+#
+# A heartbeat after() timer fires every interval_ms; how late it fires is
+# the time the event loop could not respond. A lag of threshold_ms or more
+# is recorded as a stall, blamed on the measured calls (Tk callbacks and
+# @profiled operations, via profiler.watchdog) that were running during
+# it. With sample_stacks, a helper thread also takes a Python stack sample
+# of the Tk thread while a stall is still going on. Like BackgroundWorker,
+# the watchdog only needs a widget's after(); it never imports Tk.
+
+DEFAULT_INTERVAL_MS = 100
+DEFAULT_THRESHOLD_MS = 250
+
+
+class Stall:
+    __slots__ = ("time", "duration", "handlers", "stack")
+
+    def __init__(self, time_, duration, handlers, stack=None):
+        self.time = time_  # wall-clock start
+        self.duration = duration
+        self.handlers = handlers  # names of the slow calls, slowest first
+        self.stack = stack
+
+    @property
+    def culprit(self):
+        return self.handlers[0] if self.handlers else "unknown"
+
+    def to_dict(self):
+        return {"time": self.time, "duration": self.duration, "handlers": self.handlers,
+                "stack": self.stack}
+
+
+class Watchdog:
+    """Measures main-loop lag of `widget`'s Tk interpreter.
+
+    start() must be called on the Tk thread. on_stall(stall) is called on
+    the Tk thread after each stall.
+    """
+
+    def __init__(self, widget, interval_ms=DEFAULT_INTERVAL_MS, threshold_ms=DEFAULT_THRESHOLD_MS,
+                 sample_stacks=False, on_stall=None, keep=100):
+        self.widget = widget
+        self.interval = interval_ms / 1000.0
+        self.threshold = threshold_ms / 1000.0
+        self.on_stall = on_stall
+        self.stalls = collections.deque(maxlen=keep)  # newest last
+        self.worst = []  # the `keep` longest stalls, longest first
+        self.keep = keep
+        self.stall_count = 0
+        self.beats = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.last_lag = 0.0
+        self._slow_calls = collections.deque(maxlen=64)  # (name, start, end)
+        self._beat_id = None
+        self._next = None  # (number, due time) of the pending heartbeat
+        self._beat_number = 0
+        self._sample = None  # (beat number, stack) taken by the helper thread
+        self._sampler = None
+        self._sample_stacks = False
+        self._tk_ident = None
+        self.sample_stacks = sample_stacks
+
+    # -- heartbeat (Tk thread) -------------------------------------------
+
+    @property
+    def running(self):
+        return self._beat_id is not None
+
+    def start(self):
+        if self._beat_id is not None:
+            return
+        self._tk_ident = threading.get_ident()
+        profiler.watchdog = self
+        self._schedule()
+        if self._sample_stacks:
+            self._start_sampler()
+
+    def stop(self):
+        if self._beat_id is not None:
+            self.widget.after_cancel(self._beat_id)
+            self._beat_id = None
+        if profiler.watchdog is self:
+            profiler.watchdog = None
+        self._next = None
+
+    def _schedule(self):
+        self._beat_number += 1
+        self._next = (self._beat_number, time.perf_counter() + self.interval)
+        self._beat_id = self.widget.after(int(self.interval * 1000), self._beat)
+
+    def _beat(self):
+        now = time.perf_counter()
+        number, due = self._next
+        lag = max(0.0, now - due)
+        self.beats += 1
+        self.total_lag += lag
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self._schedule()
+        if lag >= self.threshold:
+            self._record_stall(due, now, lag, number)
+
+    def _record_stall(self, due, now, lag, number):
+        # Calls that overlapped the stall, slowest first, each name once
+        overlapping = sorted((call for call in self._slow_calls if call[2] >= due and call[1] <= now),
+                             key=lambda call: call[2] - call[1], reverse=True)
+        handlers = list(dict.fromkeys(name for name, _, _ in overlapping))
+        sample = self._sample
+        stack = sample[1] if sample is not None and sample[0] == number else None
+        stall = Stall(time.time() - lag, lag, handlers, stack)
+        self.stall_count += 1
+        self.stalls.append(stall)
+        self.worst.append(stall)
+        self.worst.sort(key=lambda s: s.duration, reverse=True)
+        del self.worst[self.keep:]
+        trace = profiler.trace
+        if trace is not None:
+            trace.complete("event loop stall", "watchdog", due, now, {"handlers": handlers})
+        if self.on_stall:
+            self.on_stall(stall)
+
+    def slow_call(self, name, start, end):
+        # From the profiler: a measured call took at least threshold
+        if threading.get_ident() == self._tk_ident:
+            self._slow_calls.append((name, start, end))
+
+    def reset(self):
+        self.stalls.clear()
+        self.worst = []
+        self.stall_count = 0
+        self.beats = 0
+        self.max_lag = self.total_lag = self.last_lag = 0.0
+
+    @property
+    def mean_lag(self):
+        return self.total_lag / self.beats if self.beats else 0.0
+
+    def to_dict(self):
+        return {
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "beats": self.beats,
+            "stalls": self.stall_count,
+            "mean_lag": self.mean_lag,
+            "max_lag": self.max_lag,
+            "worst": [stall.to_dict() for stall in self.worst],
+        }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.to_dict(), fp, indent=2)
+
+    # -- stack sampling (helper thread) ----------------------------------
+
+    @property
+    def sample_stacks(self):
+        return self._sample_stacks
+
+    @sample_stacks.setter
+    def sample_stacks(self, enabled):
+        self._sample_stacks = enabled
+        if enabled and self.running:
+            self._start_sampler()
+
+    def _start_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample_loop, name="watchdog-sampler",
+                                             daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        # One sample per stall, taken once the heartbeat is threshold late
+        while self._sample_stacks and self._beat_id is not None:
+            pending = self._next
+            if pending is not None and time.perf_counter() - pending[1] >= self.threshold \
+                    and (self._sample is None or self._sample[0] != pending[0]):
+                frame = sys._current_frames().get(self._tk_ident)
+                if frame is not None:
+                    self._sample = (pending[0], "".join(traceback.format_stack(frame, limit=40)))
+            time.sleep(self.threshold / 2)
@@ -0,0 +1,100 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+
+
+class StatusBar(tk.Frame):
+    """Status line with a single reset timer and rate-limited repaints.
+
+    show() only records the message; the label is repainted at most once
+    per `min_interval_ms`, and identical messages arriving in a burst are
+    merged into one ("Header added. (x12)"). Whatever the message rate,
+    at most one reset timer and one repaint timer are pending.
+    """
+
+    def __init__(self, master, idle_text="Ready", reset_ms=3000, min_interval_ms=100, **kwargs):
+        bg = kwargs.pop("bg", None)
+        fg = kwargs.pop("fg", None)
+        super().__init__(master, bd=1, relief=tk.SUNKEN, bg=bg, **kwargs)
+        self.idle_text = idle_text
+        self.reset_ms = reset_ms
+        self.min_interval = min_interval_ms / 1000.0
+
+        self.label = tk.Label(self, text=idle_text, anchor=tk.W, bg=bg, fg=fg)
+        self.label.pack(side="left", fill="x", expand=True)
+        self.progress = ttk.Progressbar(self, length=160, mode="determinate")
+
+        self._message = idle_text
+        self._repeat = 0
+        self._shown = None
+        self._last_paint = 0.0
+        self._paint_id = None
+        self._reset_id = None
+        self._reset_at = 0.0
+        self._progress_total = 0
+        self._progress_done = 0
+
+    def show(self, message):
+        if message == self._message and message != self.idle_text:
+            self._repeat += 1
+        else:
+            self._message = message
+            self._repeat = 1
+        self._reset_at = time.monotonic() + self.reset_ms / 1000.0
+        if self._reset_id is None:
+            self._reset_id = self.after(self.reset_ms, self._on_reset_timer)
+        self._request_paint()
+
+    def _request_paint(self):
+        if self._paint_id is not None:
+            return
+        wait = self._last_paint + self.min_interval - time.monotonic()
+        if wait <= 0:
+            self._paint()
+        else:
+            self._paint_id = self.after(int(wait * 1000) + 1, self._paint)
+
+    def _paint(self):
+        self._paint_id = None
+        self._last_paint = time.monotonic()
+        text = self._message
+        if self._repeat > 1:
+            text = f"{text} (x{self._repeat})"
+        if self._progress_total:
+            text = f"{text} [{self._progress_done}/{self._progress_total}]"
+            self.progress.config(value=self._progress_done)
+        if text != self._shown:
+            self._shown = text
+            self.label.config(text=text)
+
+    def _on_reset_timer(self):
+        # Re-arm for the remaining time instead of cancelling and re-adding
+        # a timer for every message
+        remaining = self._reset_at - time.monotonic()
+        if remaining > 0.001:
+            self._reset_id = self.after(int(remaining * 1000) + 1, self._on_reset_timer)
+            return
+        self._reset_id = None
+        if self._progress_total:
+            return  # keep the message while an operation is running
+        self._message = self.idle_text
+        self._repeat = 0
+        self._request_paint()
+
+    # -- progress for long operations ------------------------------------
+
+    def start_progress(self, message, total):
+        self._progress_total = max(int(total), 1)
+        self._progress_done = 0
+        self.progress.config(maximum=self._progress_total, value=0)
+        self.progress.pack(side="right", padx=4)
+        self.show(message)
+
+    def step_progress(self, done):
+        self._progress_done = done
+        self._request_paint()
+
+    def finish_progress(self, message=None):
+        self._progress_total = 0
+        self.progress.pack_forget()
+        self.show(message or self._message)
@@ -0,0 +1,52 @@
+import os
+import stat
+
+import pytest
+
+import background
+
+
+def read(path):
+    with open(path, encoding="utf-8") as fp:
+        return fp.read()
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("old", encoding="utf-8")
+    background.atomic_write(str(path), lambda fp: fp.write("new"))
+    assert read(path) == "new"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["page.html"]
+
+
+def test_failed_write_leaves_the_old_file(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("old", encoding="utf-8")
+
+    def write(fp):
+        fp.write("half of the new")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        background.atomic_write(str(path), write)
+    assert read(path) == "old"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["page.html"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX file modes")
+def test_mode_of_the_replaced_file_is_kept(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("old", encoding="utf-8")
+    os.chmod(path, 0o644)
+    background.atomic_write(str(path), lambda fp: fp.write("new"))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX file modes")
+def test_new_files_follow_the_umask(tmp_path):
+    path = tmp_path / "site.wdp"
+    background.atomic_write(str(path), lambda fp: fp.write("new"))
+    reference = tmp_path / "reference"
+    with open(reference, "w"):
+        pass
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(reference).st_mode)
@@ -0,0 +1,154 @@
+import gc
+import random
+import threading
+
+from document import Document, Element
+
+
+def state(elements):
+    return [(element.id, element.content) for element in elements]
+
+
+def make_document():
+    document = Document()
+    elements = [document.add_element(type_, f"{type_} text") for type_ in ("header", "paragraph", "button")]
+    return document, elements
+
+
+def test_snapshots_keep_their_state_through_updates_moves_and_removals():
+    document, (header, paragraph, button) = make_document()
+    first = document.snapshot()
+    first_state = state(document)
+
+    document.update_element(header, "header 1")
+    document.move_element(button, 0)
+    second = document.snapshot()
+    second_state = state(document)
+
+    document.update_element(header, "header 2")
+    document.remove_element(paragraph)
+    document.update_element(button, styles={"color": "red"})
+    third = document.snapshot()
+    third_state = state(document)
+
+    document.update_element(header, "header 3")
+    document.add_element("divider", index=1)
+
+    assert state(first) == first_state
+    assert state(second) == second_state
+    assert state(third) == third_state
+    assert [element.styles.get("color") for element in third] == ["red", "#333333"]
+    assert [element.styles.get("color") for element in second][0] == "white"
+    assert len(first) == 3 and len(third) == 2
+    assert state(document) == [("button_2", "button text"), ("divider_3", None), ("header_0", "header 3")]
+
+
+def test_snapshot_yields_independent_copies():
+    document, (header, _, _) = make_document()
+    snapshot = document.snapshot()
+    copy = next(iter(snapshot))
+    copy.content = "changed"
+    assert header.content == "header text"
+    assert next(iter(snapshot)).content == "header text"
+
+
+def test_snapshot_settings_are_copy_on_write():
+    document = Document()
+    snapshot = document.snapshot()
+    document.update_settings(bg_color="#000000")
+    assert snapshot.settings["bg_color"] == "#ffffff"
+    assert document.settings["bg_color"] == "#000000"
+
+
+def test_old_versions_are_pruned_when_no_snapshot_needs_them():
+    document, (header, _, _) = make_document()
+    old = document.snapshot()
+    document.update_element(header, "v1")
+    kept = document.snapshot()
+    document.update_element(header, "v2")
+    assert header.older is not None and header.older.older is not None
+
+    del old
+    gc.collect()
+    document.update_element(header, "v3")
+    # Only the version the remaining snapshot sees is kept
+    assert [element.content for element in kept][0] == "v1"
+    depth = 0
+    node = header.older
+    while node is not None:
+        depth += 1
+        node = node.older
+    assert depth <= 2
+
+    del kept
+    gc.collect()
+    document.update_element(header, "v4")
+    assert header.older is None
+
+
+def test_snapshot_iterated_on_a_worker_thread_stays_consistent():
+    document = Document()
+    elements = document.add_elements([{"type": "paragraph", "content": "0"}] * 2000)
+    snapshot = document.snapshot()
+    seen = []
+    worker = threading.Thread(target=lambda: seen.extend(element.content for element in snapshot))
+    worker.start()
+    for round_ in range(1, 6):
+        for element in elements[::7]:
+            document.update_element(element, str(round_))
+        document.move_element(elements[round_], 1500)
+    worker.join()
+    assert seen == ["0"] * 2000
+
+
+def test_index_of_follows_random_edits():
+    random_ = random.Random(4)
+    document = Document()
+    for step in range(3000):
+        size = len(document)
+        choice = random_.random()
+        if choice < 0.3:
+            document.add_element("header", index=random_.randint(0, size))
+        elif choice < 0.4:
+            document.add_elements([{"type": "paragraph"}] * random_.randint(1, 600), random_.randint(0, size))
+        elif choice < 0.6 and size:
+            document.remove_element(document.elements[random_.randrange(size)])
+        elif choice < 0.7 and size:
+            document.remove_elements(random_.randrange(size), random_.randint(1, 700))
+        elif size:
+            document.move_element(document.elements[random_.randrange(size)], random_.randrange(size))
+        if step % 100 == 0:
+            assert [document.index_of(element) for element in document] == list(range(len(document)))
+    assert [document.index_of(element) for element in document] == list(range(len(document)))
+
+
+def test_a_failing_listener_does_not_hide_the_change_from_the_others():
+    document = Document()
+    seen = []
+
+    def failing(event, *args):
+        raise RuntimeError("listener failed")
+
+    document.subscribe(failing)
+    document.subscribe(lambda event, *args: seen.append(event))
+    try:
+        document.add_element("header")
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("the listener's error was swallowed")
+    assert seen == ["added"]
+
+
+def test_ids_of_inserted_elements_are_never_handed_out_again():
+    source = Document()
+    source.add_elements([{"type": "header"}] * 3)
+    document = Document.from_dict(source.to_dict())
+    document.remove_element(document.get("header_2"))
+    assert document.add_element("header").id == "header_3"
+
+    document = Document()
+    document.insert_elements([Element("header_7", "header"), Element("header_7", "header")])
+    assert [element.id for element in document] == ["header_7", "header_8"]
+    document.remove_element(document.get("header_8"))
+    assert document.add_element("paragraph").id == "paragraph_9"
@@ -0,0 +1,108 @@
+from document import Document
+from history import UndoHistory
+
+
+def build():
+    document = Document()
+    history = UndoHistory(document, coalesce_seconds=60)
+    return document, history
+
+
+def test_undo_and_redo_round_trip_every_kind_of_change():
+    document, history = build()
+    states = [document.to_dict()]
+
+    def step(action):
+        action()
+        history.seal()
+        states.append(document.to_dict())
+
+    step(lambda: document.add_element("header"))
+    step(lambda: document.add_elements([{"type": "paragraph"}, {"type": "button"}, {"type": "image"}]))
+    step(lambda: document.update_element(document.elements[1], "Edited", {"color": "red"}))
+    step(lambda: document.move_element(document.elements[0], 3))
+    step(lambda: document.remove_element(document.elements[2]))
+    step(lambda: document.remove_elements(0, 2))
+    step(lambda: document.update_settings(bg_color="#101010"))
+    step(lambda: document.clear())
+    step(lambda: document.add_element("divider"))
+
+    for expected in reversed(states[:-1]):
+        assert history.undo()
+        assert document.to_dict() == expected
+    assert not history.undo()
+    for expected in states[1:]:
+        assert history.redo()
+        assert document.to_dict() == expected
+    assert not history.redo()
+
+
+def test_repeated_edits_of_one_element_coalesce():
+    document, history = build()
+    element = document.add_element("header", "Title")
+    history.seal()
+    for text in ("T", "Ti", "Tit"):
+        document.update_element(element, text)
+    assert len(history.undo_stack) == 2
+
+    history.undo()
+    assert element.content == "Title"
+    history.redo()
+    assert element.content == "Tit"
+
+
+def test_edits_of_different_elements_or_after_seal_do_not_coalesce():
+    document, history = build()
+    first, second = document.add_element("header"), document.add_element("paragraph")
+    history.seal()
+    document.update_element(first, "a")
+    document.update_element(second, "b")
+    history.seal()
+    document.update_element(second, "c")
+    assert len(history.undo_stack) == 5
+
+
+def test_group_is_one_entry():
+    document, history = build()
+    with history.group():
+        document.add_element("header")
+        document.add_element("paragraph")
+        document.update_settings(accent_color="#000000")
+    assert len(history.undo_stack) == 1
+    history.undo()
+    assert len(document) == 0
+    assert document.settings["accent_color"] == "#3498db"
+
+
+def test_new_edit_clears_redo():
+    document, history = build()
+    document.add_element("header")
+    history.undo()
+    assert history.can_redo()
+    document.add_element("paragraph")
+    assert not history.can_redo()
+
+
+def test_memory_budget_drops_the_oldest_entries():
+    document = Document()
+    history = UndoHistory(document, memory_budget=2000, coalesce_seconds=0)
+    for _ in range(50):
+        document.add_element("paragraph")
+        history.seal()
+    assert 1 <= len(history.undo_stack) < 50
+    assert history.memory_used <= 2000
+    while history.undo():
+        pass
+    # The dropped additions stay in the document
+    assert len(document) == 50 - len(history.redo_stack)
+
+
+def test_paused_changes_are_not_recorded():
+    document, history = build()
+    document.add_element("header", "Title")
+    history.seal()
+    with history.paused():
+        document.add_elements([{"type": "paragraph"}] * 3)
+    assert len(history.undo_stack) == 1
+    history.undo()
+    assert [element.type for element in document] == ["paragraph"] * 3
@@ -0,0 +1,277 @@
+import html_export
+from document import Document, Element
+
+
+def flow_document():
+    document = Document()
+    document.add_elements([{"type": type_, "content": f"{type_} text"}
+                           for type_ in ("header", "paragraph", "button", "image", "divider", "form")])
+    return document
+
+
+# -- fragment cache -------------------------------------------------------------
+
+def test_cached_export_matches_and_reuses_fragments():
+    document = flow_document()
+    cache = html_export.FragmentCache(document)
+    expected = html_export.generate_html(document)
+    assert html_export.generate_html(document, cache) == expected
+    assert cache.misses == len(document) and cache.hits == 0
+    assert html_export.generate_html(document, cache) == expected
+    assert cache.hits == len(document)
+
+
+def test_edited_elements_are_rendered_again():
+    document = flow_document()
+    cache = html_export.FragmentCache(document)
+    html_export.generate_html(document, cache)
+    header = document.elements[0]
+    document.update_element(header, "Changed <title>")
+    misses = cache.misses
+    page = html_export.generate_html(document, cache)
+    assert cache.misses == misses + 1
+    assert "Changed &lt;title&gt;" in page
+    assert page == html_export.generate_html(document)
+
+
+def test_accent_color_change_renders_buttons_again():
+    document = flow_document()
+    cache = html_export.FragmentCache(document)
+    button = document.elements[2]
+    document.update_element(button, styles={k: v for k, v in button.styles.items() if k != "background_color"})
+    html_export.generate_html(document, cache)
+    document.update_settings(accent_color="#ff0000")
+    misses = cache.misses
+    page = html_export.generate_html(document, cache)
+    assert cache.misses == misses + 1  # only the button depends on the setting
+    assert '<button style="background-color: #ff0000;' in page
+    assert page == html_export.generate_html(document)
+
+
+def test_removed_elements_are_dropped_and_never_served_to_a_new_element():
+    document = flow_document()
+    cache = html_export.FragmentCache(document)
+    snapshot = document.snapshot()
+    header = document.elements[0]
+    document.remove_element(header)
+    assert len(cache) == 0
+    # An export of an older snapshot, e.g. on the worker, caches the
+    # removed element again
+    html_export.generate_html(snapshot, cache)
+
+    document.insert_elements([Element(header.id, "header", "Another header")], 0)
+    page = html_export.generate_html(document, cache)
+    assert "Another header" in page and "header text" not in page
+
+
+def test_snapshot_copies_share_the_live_elements_entries():
+    document = flow_document()
+    cache = html_export.FragmentCache(document)
+    html_export.generate_html(document.snapshot(), cache)
+    html_export.generate_html(document, cache)
+    assert cache.hits == len(document)
+
+
+# -- renderer registry -------------------------------------------------------------
+# The if/elif renderers and page head that the registry replaced, as the
+# reference for the readable export
+
+REFERENCE_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <title>My Web Design</title>
+    <style>
+        body {{
+            font-family: {font_family}, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background-color: {bg_color};
+        }}
+        .container {{
+            max-width: 800px;
+            margin: 0 auto;
+        }}
+        h1 {{
+            color: #333333;
+            font-size: 18px;
+            font-weight: bold;
+        }}
+        p {{
+            color: #333333;
+            font-size: 12px;
+            line-height: 1.5;
+        }}
+        button {{
+            background-color: {accent_color};
+            color: white;
+            padding: 10px 15px;
+            border: none;
+            cursor: pointer;
+            font-size: 12px;
+            font-weight: bold;
+        }}
+        .image-placeholder {{
+            width: 150px;
+            height: 100px;
+            background-color: #f0f0f0;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            border: 1px dashed #ccc;
+            color: #7f8c8d;
+            font-size: 12px;
+        }}
+        .divider {{
+            height: 2px;
+            background-color: #cccccc;
+            margin: 20px 0;
+        }}
+        .form-container {{
+            padding: 20px;
+            border: 1px solid #eee;
+            background-color: #f9f9f9;
+        }}
+        .form-container input[type="text"],
+        .form-container input[type="email"],
+        .form-container textarea {{
+            width: calc(100% - 20px);
+            padding: 8px;
+            margin-bottom: 10px;
+            border: 1px solid #ddd;
+        }}
+        .form-container button {{
+            width: auto;
+            padding: 8px 20px;
+        }}
+        </style>
+        </head>
+        <body>
+        <div class="container">
+"""
+
+
+def reference_element(element, settings):
+    styles = element.styles
+    if element.type == "header":
+        return (f"<h1 style=\"font-size: {styles.get('font_size', 18)}px; "
+                f"font-weight: {styles.get('font_weight', 'bold')}; "
+                f"color: {styles.get('color', '#333333')};\">{element.content}</h1>\n")
+    if element.type == "paragraph":
+        return (f"<p style=\"font-size: {styles.get('font_size', 12)}px; color: {styles.get('color', '#333333')}; "
+                f"line-height: {styles.get('line_height', 1.5)};\">{element.content}</p>\n")
+    if element.type == "button":
+        return (f"<button style=\"background-color: {styles.get('background_color', settings['accent_color'])}; "
+                f"color: {styles.get('color', 'white')}; font-size: {styles.get('font_size', 12)}px; "
+                f"font-weight: {styles.get('font_weight', 'bold')};\">{element.content}</button>\n")
+    if element.type == "image":
+        return f"<div class=\"image-placeholder\">{element.content}</div>\n"
+    if element.type == "divider":
+        return "<div class=\"divider\"></div>\n"
+    if element.type == "form":
+        return html_export.FORM_HTML
+    return ""
+
+
+def reference_freeform_element(element):
+    styles = element.styles
+    style = (f"background-color: {styles.get('bg_color', '#ffffff')}; "
+             f"color: {styles.get('text_color', '#000000')}; "
+             f"padding: {styles.get('padding', 10)}px; "
+             f"margin: {styles.get('margin', 5)}px; "
+             f"border-radius: {styles.get('border_radius', 0)}px; "
+             f"font-size: {styles.get('font_size', 14)}px; ")
+    tags = {"header": "h1", "paragraph": "p", "button": "button"}
+    if element.type in tags:
+        tag = tags[element.type]
+        return f'<{tag} style="{style}">{element.content}</{tag}>\n'
+    if element.type == "image":
+        return f'<img src="#" alt="{element.content}" style="{style} width:100%; height:auto;">\n'
+    return ""
+
+
+def test_readable_export_is_byte_identical_to_the_if_elif_renderers():
+    document = flow_document()
+    document.add_elements([
+        {"type": "header", "content": "No styles", "styles": {}},
+        {"type": "header", "content": "Custom", "styles": {"font_size": 30, "color": "red"}},
+        {"type": "paragraph", "content": "Loose", "styles": {"line_height": 2}},
+        {"type": "button", "content": "Accent", "styles": {"font_size": 20}},
+        {"type": "unknown", "content": "Dropped"},
+    ])
+    document.update_settings(accent_color="#ff0000", font_family="Georgia", bg_color="#eeeeee")
+    settings = document.settings
+    expected = (REFERENCE_HEAD.format_map(settings)
+                + "".join(reference_element(element, settings) for element in document)
+                + html_export.PAGE_FOOTER)
+    assert html_export.generate_html(document) == expected
+    assert html_export.generate_html(document, html_export.FragmentCache(document)) == expected
+
+
+def test_freeform_export_is_byte_identical_to_the_if_elif_renderers():
+    document = Document()
+    document.add_elements([
+        {"type": "header", "content": "Title", "styles": {"font_size": 24, "bg_color": "white"}},
+        {"type": "paragraph", "content": "Text", "styles": {}},
+        {"type": "button", "content": "Go", "styles": {"border_radius": 4}},
+        {"type": "image", "content": "photo", "styles": {"padding": 0}},
+    ])
+    expected = ("<!DOCTYPE html>\n<html>\n<head>\n<style>\nbody { font-family: Arial, sans-serif; }\n"
+                "</style>\n</head>\n<body>\n"
+                + "".join(reference_freeform_element(element) for element in document)
+                + "</body>\n</html>")
+    assert html_export.generate_freeform_html(document) == expected
+
+
+# -- minified export --------------------------------------------------------------
+
+def test_minified_export_shares_classes_and_drops_default_declarations():
+    document = Document()
+    large = {"font_size": 30, "font_weight": "bold", "color": "#333333"}
+    red = {"font_size": 12, "color": "red", "line_height": 1.5}
+    document.add_elements([{"type": "header", "content": "A", "styles": dict(large)},
+                           {"type": "header", "content": "B", "styles": dict(large)},
+                           {"type": "header", "content": "C"},
+                           {"type": "paragraph", "content": "D", "styles": red}])
+    page = html_export.generate_html(document, minify=True)
+    assert '<h1 class="s0">A</h1><h1 class="s0">B</h1><h1>C</h1><p class="s1">D</p>' in page
+    # Classes only hold what differs from the type's base rule
+    assert ".s0{font-size:30px}.s1{color:red}" in page
+    assert "h1{color:#333333;font-size:18px;font-weight:bold}" in page
+    assert "style=" not in page and "\n" not in page
+
+
+# -- stylesheet selection -----------------------------------------------------------
+
+def test_only_rules_of_the_types_on_the_page_are_emitted():
+    document = Document()
+    document.add_elements([{"type": "header"}, {"type": "paragraph"}])
+    page = html_export.generate_html(document)
+    assert "body {" in page and ".container {" in page
+    assert "h1 {" in page and "p {" in page
+    assert "button {" not in page and ".divider" not in page and ".form-container" not in page
+
+
+def test_a_form_brings_the_button_rule():
+    document = Document()
+    document.add_element("form")
+    page = html_export.generate_html(document)
+    assert "button {" in page and ".form-container button {" in page
+
+
+def test_rules_below_the_first_screen_go_to_the_external_stylesheet():
+    document = Document()
+    document.add_elements([{"type": "header"}] * html_export.CRITICAL_ELEMENTS
+                          + [{"type": "divider"}, {"type": "header"}])
+    assert html_export.used_types(document, html_export.RENDERERS, html_export.CRITICAL_ELEMENTS) == (
+        {"header"}, {"divider"})
+
+    page = html_export.generate_html(document, stylesheet_href="site.css")
+    assert '<link rel="stylesheet" href="site.css">' in page
+    assert "h1 {" in page and ".divider" not in page
+    css = "".join(html_export.iter_stylesheet(document))
+    assert css.startswith(".divider {") and "h1" not in css and "body" not in css
+    assert "".join(html_export.iter_stylesheet(document, minify=True)) == (
+        ".divider{height:2px;background-color:#cccccc;margin:20px 0}")
+
+    # Without an external stylesheet everything stays inline
+    assert ".divider {" in html_export.generate_html(document)
@@ -0,0 +1,143 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import journal
+import project_file
+from document import Document
+
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "journals"))
+
+
+def edit(document):
+    header = document.add_element("header", "Title")
+    document.add_elements([{"type": "paragraph", "content": f"p{i}"} for i in range(5)])
+    document.update_element(header, "New title", {"color": "red"})
+    document.move_element(header, 3)
+    document.remove_element(document.elements[0])
+    document.remove_elements(1, 2)
+    document.update_settings(bg_color="#222222")
+
+
+def crash(recorder):
+    # Stop the writer without discarding the journal, as a crash would
+    recorder.flush()
+    recorder.close()
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def set_owner(path, pid):
+    with open(path, encoding="utf-8") as fp:
+        lines = fp.readlines()
+    header = json.loads(lines[0])
+    header["pid"] = pid
+    lines[0] = json.dumps(header) + "\n"
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.writelines(lines)
+
+
+def test_untitled_session_is_recovered_after_a_crash():
+    document = Document()
+    recorder = journal.Journal(flush_interval=0.01)
+    recorder.attach(document)
+    edit(document)
+    crash(recorder)
+
+    assert os.path.dirname(recorder.path) == journal.JOURNAL_DIR
+    assert str(os.getpid()) in os.path.basename(recorder.path)
+    project, recovered = journal.recover(recorder.path)
+    assert project is None
+    assert recovered.to_dict() == document.to_dict()
+
+
+def test_project_journal_replays_on_top_of_the_saved_file(tmp_path):
+    path = str(tmp_path / "site.wdp")
+    document = Document()
+    document.add_elements([{"type": "header"}, {"type": "form"}])
+    project_file.save_project(document, path)
+    recorder = journal.Journal(flush_interval=0.01)
+    recorder.attach(document, path)
+    edit(document)
+    crash(recorder)
+
+    project, recovered = journal.recover(journal.journal_path(path))
+    assert project == os.path.abspath(path)
+    assert recovered.to_dict() == document.to_dict()
+
+
+def test_compaction_keeps_the_journal_recoverable():
+    document = Document()
+    recorder = journal.Journal(flush_interval=0.01, compact_every=4)
+    recorder.attach(document)
+    for _ in range(5):
+        edit(document)
+    crash(recorder)
+
+    _, ops = journal.read_journal(recorder.path)
+    assert ops[0][0] == "S" and len(ops) <= 4
+    assert journal.recover(recorder.path)[1].to_dict() == document.to_dict()
+
+
+def test_torn_last_line_is_ignored():
+    document = Document()
+    recorder = journal.Journal(flush_interval=0.01)
+    recorder.attach(document)
+    document.add_element("header")
+    crash(recorder)
+    expected = document.to_dict()
+    with open(recorder.path, "a", encoding="utf-8") as fp:
+        fp.write('["a",1,[["x_1","head')
+    assert journal.recover(recorder.path)[1].to_dict() == expected
+
+
+def test_only_journals_of_finished_sessions_are_offered():
+    document = Document()
+    recorder = journal.Journal(flush_interval=0.01)
+    recorder.attach(document)
+    document.add_element("header")
+    crash(recorder)
+
+    # Written by this (running) process
+    assert not journal.is_orphaned(recorder.path)
+    assert journal.orphaned_untitled_journals() == []
+
+    set_owner(recorder.path, dead_pid())
+    assert journal.is_orphaned(recorder.path)
+    assert journal.orphaned_untitled_journals() == [recorder.path]
+
+
+def test_clean_close_removes_the_journal():
+    document = Document()
+    recorder = journal.Journal(flush_interval=0.01)
+    recorder.attach(document)
+    document.add_element("header")
+    recorder.flush()
+    path = recorder.path
+    assert os.path.exists(path)
+    recorder.close(discard=True)
+    assert not os.path.exists(path)
+
+
+def test_recovering_onto_an_unreadable_project_raises_a_format_error(tmp_path):
+    path = str(tmp_path / "site.wdp")
+    document = Document()
+    project_file.save_project(document, path)
+    recorder = journal.Journal(flush_interval=0.01)
+    recorder.attach(document, path)
+    document.add_element("header")
+    crash(recorder)
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write('{"format":"wdp","version":99}\n')
+    with pytest.raises(project_file.ProjectFormatError):
+        journal.recover(journal.journal_path(path))
@@ -0,0 +1,70 @@
+import random
+from itertools import accumulate
+
+import pytest
+
+from layout import RowLayout
+
+
+def assert_matches(layout, heights, indices):
+    assert list(layout) == heights
+    assert len(layout) == len(heights)
+    assert layout.total() == sum(heights)
+    tops = list(accumulate(heights, initial=0))
+    for i in indices:
+        assert layout.offset(i) == tops[i]
+        if i < len(heights) and heights[i]:
+            assert layout.index_at(tops[i]) == i
+
+
+@pytest.mark.parametrize("block", [2, 5, RowLayout.BLOCK])
+def test_random_edits_match_a_plain_list(monkeypatch, block):
+    monkeypatch.setattr(RowLayout, "BLOCK", block)
+    random_ = random.Random(7)
+    layout = RowLayout()
+    heights = []
+    for _ in range(3000):
+        size = len(heights)
+        choice = random_.random()
+        if choice < 0.25:
+            index, height = random_.randint(0, size), random_.randint(1, 50)
+            layout.insert(index, height)
+            heights.insert(index, height)
+        elif choice < 0.35:
+            index = random_.randint(0, size)
+            new = [random_.randint(1, 50)] * random_.randint(0, 2 * block + 1)
+            layout.insert_many(index, new)
+            heights[index:index] = new
+        elif choice < 0.5 and size:
+            index = random_.randrange(size)
+            assert layout.pop(index) == heights.pop(index)
+        elif choice < 0.55 and size:
+            index, count = random_.randrange(size), random_.randint(1, 3 * block)
+            layout.delete(index, count)
+            del heights[index:index + count]
+        elif choice < 0.9 and size:
+            old_index, new_index = random_.randrange(size), random_.randrange(size)
+            layout.move(old_index, new_index)
+            heights.insert(new_index, heights.pop(old_index))
+        elif size:
+            index, height = random_.randrange(size), random_.randint(0, 50)
+            layout.set_height(index, height)
+            heights[index] = height
+        assert_matches(layout, heights, [random_.randint(0, len(heights)) for _ in range(5)])
+
+
+def test_offsets_and_hit_testing():
+    layout = RowLayout([10, 20, 30])
+    assert [layout.offset(i) for i in range(4)] == [0, 10, 30, 60]
+    assert [layout.index_at(y) for y in (-5, 0, 9, 10, 29, 30, 59, 99)] == [0, 0, 0, 1, 1, 2, 2, 2]
+    assert [layout.insertion_index(y) for y in (0, 4, 6, 21, 70)] == [0, 0, 1, 2, 3]
+    layout.move(0, 2)
+    assert list(layout) == [20, 30, 10]
+    assert layout.extent(2) == (50, 60)
+    assert layout.visible_range(25, 55) == (1, 3)
+
+
+def test_zero_height_rows_are_skipped_by_hit_testing(monkeypatch):
+    monkeypatch.setattr(RowLayout, "BLOCK", 1)
+    layout = RowLayout([10, 0, 0, 5])
+    assert [layout.index_at(y) for y in (9, 10, 14, 15)] == [0, 3, 3, 3]
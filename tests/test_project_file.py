@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+import project_file
+from document import Document
+from project_file import ProjectFormatError, ProjectReader
+
+HEADER = '{"format":"wdp","version":1,"settings":{},"elements":%d}\n'
+STYLES = '{"styles":{"color":"red"}}\n'
+
+
+def read(text, chunk_size=project_file.CHUNK_SIZE):
+    reader = ProjectReader(io.StringIO(text), chunk_size)
+    return [element for chunk in reader for element in chunk]
+
+
+def test_round_trip(tmp_path):
+    document = Document({"bg_color": "#eeeeee"})
+    document.add_elements([{"type": type_} for type_ in ("header", "paragraph", "button", "divider")] * 3)
+    document.add_element("image", "logo.png", {"width": 40}, x=10, y=20)
+    path = str(tmp_path / "site.wdp")
+    project_file.save_project(document, path)
+    assert project_file.load_project(path).to_dict() == document.to_dict()
+
+
+def test_reads_in_chunks():
+    rows = "".join(f'["header_{i}","header","t",0]\n' for i in range(5))
+    reader = ProjectReader(io.StringIO(HEADER % 5 + STYLES + rows), chunk_size=2)
+    assert [len(chunk) for chunk in reader] == [1, 2, 2]
+
+
+@pytest.mark.parametrize("row, message", [
+    ('["x_1","bogus","c",0]', "unknown element type 'bogus'"),
+    ('["x_1","header","c"]', "4 or 6 fields"),
+    ('["x_1","header","c",0,5]', "4 or 6 fields"),
+    ('[1,"header","c",0]', "id and type must be strings"),
+    ('["x_1","header",7,0]', "content must be a string"),
+    ('["x_1","header","c",3]', "undefined style set 3"),
+    ('["x_1","header","c",0,"a","b"]', "position must be numbers"),
+    ('{"styles":{"color":[1]}}', "style sets must map"),
+    ('"text"', "expected an element row"),
+    ('["x_1","header",', "invalid JSON"),
+])
+def test_malformed_rows_name_their_line(row, message):
+    text = HEADER % 2 + STYLES + '["ok_1","header","c",0]\n' + row + "\n"
+    with pytest.raises(ProjectFormatError, match=f"line 4: .*{message}"):
+        read(text)
+
+
+def test_element_count_must_match_the_header():
+    row = '["x_1","header","c",0]\n'
+    with pytest.raises(ProjectFormatError, match="ends after 1 of 2"):
+        read(HEADER % 2 + STYLES + row)
+    with pytest.raises(ProjectFormatError, match="more elements"):
+        read(HEADER % 1 + STYLES + row + row.replace("x_1", "x_2"))
+
+
+@pytest.mark.parametrize("first_line, message", [
+    ("hello\n", "Not a web design project"),
+    ('{"format":"wdp"}\n', "Missing project format version"),
+    ('{"format":"wdp","version":99}\n', "newer than this program"),
+    ('{"format":"wdp","version":1,"settings":{"a":1}}\n', "settings must map"),
+    ('{"format":"wdp","version":1,"elements":-1}\n', "invalid element count"),
+])
+def test_bad_headers_are_rejected(first_line, message):
+    with pytest.raises(ProjectFormatError, match=message):
+        read(first_line)
+
+
+def test_legacy_projects_get_default_styles():
+    text = "Web Design Project File\nElement: header, Content: Hi\nElement: divider, Content: None\n"
+    elements = read(text)
+    assert [(element.type, element.content) for element in elements] == [("header", "Hi"), ("divider", None)]
+    assert elements[0].styles["font_size"] == 18
+    with pytest.raises(ProjectFormatError, match="line 2: unrecognized"):
+        read("Web Design Project File\nElement: bogus, Content: x\n")
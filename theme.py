@@ -0,0 +1,38 @@
+import weakref
+
+# ttk theme handling. ttkthemes is optional and slow to load (it sources
+# the theme's Tcl code and images), so it is only imported when a theme is
+# actually applied, normally right after the main window has been drawn.
+
+DEFAULT_THEME = "arc"  # Or "adapta", "plastik", etc.
+
+# root -> (requested theme, style or None), so a theme is resolved only
+# once per Tk interpreter
+_resolved = weakref.WeakKeyDictionary()
+
+
+def apply_theme(root, name=DEFAULT_THEME):
+    """Apply a ttkthemes theme to root; returns the style or None.
+
+    Requires the ttkthemes package (pip install ttkthemes). Without it,
+    or if the theme fails to load, the default ttk theme stays in place.
+    """
+    cached = _resolved.get(root)
+    if cached is not None and cached[0] == name:
+        return cached[1]
+
+    try:
+        from ttkthemes import ThemedStyle
+    except ImportError:
+        ThemedStyle = None
+
+    style = None
+    if ThemedStyle:
+        try:
+            style = ThemedStyle(root)
+            style.set_theme(name)
+        except Exception as e:
+            print(f"Failed to set theme: {e}")
+            style = None  # Continue without theme if it fails
+    _resolved[root] = (name, style)
+    return style
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+# Session traces in the Chrome trace-event format, for chrome://tracing,
+# Perfetto or any other trace viewer.
+#
+# A TraceRecorder set as profiler.profiler.trace receives every Tk callback
+# and @profiled operation as a complete ("X") event, and worker jobs and
+# file writes through profiler.span(). Work that Tk does in C (geometry
+# management, redrawing) never reaches Python, so it is inferred: when a
+# <Configure>/<Expose>/<Map> binding or an after_idle callback starts
+# shortly after the previous callback ended, the gap is recorded as a Tk
+# span marked "inferred". Timer callbacks (after with a delay) are left
+# out: the gap before them is mostly the requested delay.
+
+ENV_VAR = "WEB_DESIGNER_TRACE"  # path to write a trace of the whole session to
+
+# Event types (%T) whose bindings follow Tk geometry or redisplay work
+GEOMETRY_EVENTS = {"12": "Expose", "19": "Map", "22": "Configure"}
+
+# Longer gaps are taken to be the event loop waiting, not Tk working
+INFER_MAX_GAP = 0.05
+
+
+class TraceRecorder:
+    """Collects trace events; write() or save() emits the JSON.
+
+    At most max_events are kept; later events are counted as dropped.
+    """
+
+    def __init__(self, max_events=1000000):
+        self.max_events = max_events
+        self.origin = time.perf_counter()
+        self.started = time.time()
+        self.events = []
+        self.dropped = 0
+        self.pid = os.getpid()
+        self._threads = {}  # thread ident -> (tid, name)
+        self._tk_thread = threading.get_ident()
+        self._tk_idle_since = None  # end of the last Tk callback
+
+    def _tid(self):
+        ident = threading.get_ident()
+        entry = self._threads.get(ident)
+        if entry is None:
+            entry = self._threads[ident] = (len(self._threads) + 1, threading.current_thread().name)
+        return entry[0]
+
+    def _add(self, event):
+        if len(self.events) < self.max_events:
+            self.events.append(event)
+        else:
+            self.dropped += 1
+
+    def complete(self, name, category, start, end, args=None):
+        event = {"name": name, "cat": category, "ph": "X", "pid": self.pid, "tid": self._tid(),
+                 "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+        if args:
+            event["args"] = args
+        self._add(event)
+        if category == "tk":
+            self._tk_idle_since = end
+
+    def instant(self, name, category="mark", args=None):
+        event = {"name": name, "cat": category, "ph": "i", "s": "g", "pid": self.pid,
+                 "tid": self._tid(), "ts": (time.perf_counter() - self.origin) * 1e6}
+        if args:
+            event["args"] = args
+        self._add(event)
+
+    def callback_started(self, name, start, event_type=None, idle=False):
+        # Attribute the gap before a Tk callback to Tk's own work if the
+        # callback is one that Tk runs right after that work
+        since = self._tk_idle_since
+        if since is None or threading.get_ident() != self._tk_thread:
+            return
+        gap = start - since
+        if gap <= 0 or gap > INFER_MAX_GAP:
+            return
+        if event_type in GEOMETRY_EVENTS:
+            label = f"Tk geometry/redraw before <{GEOMETRY_EVENTS[event_type]}>"
+        elif idle:
+            label = "Tk idle work"
+        else:
+            return
+        self._add({"name": label, "cat": "tk.inferred", "ph": "X", "pid": self.pid,
+                   "tid": self._tid(), "ts": (since - self.origin) * 1e6, "dur": gap * 1e6,
+                   "args": {"inferred": True, "before": name}})
+
+    def to_dict(self):
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                     "args": {"name": "Tk main loop" if ident == self._tk_thread else name}}
+                    for ident, (tid, name) in list(self._threads.items())]
+        return {
+            "traceEvents": metadata + self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"started": self.started, "dropped_events": self.dropped},
+        }
+
+    def write(self, fp):
+        json.dump(self.to_dict(), fp, separators=(",", ":"))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as fp:
+            self.write(fp)
@@ -1,13 +1,73 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import webbrowser
+from contextlib import contextmanager
 import os
+import time
+
+import background
+from canvas_events import OutlineGhost, add_bindtag, canvas_point
+import html_export
+import journal
+import project_file
+from document import Document, TEMPLATES
+from history import UndoHistory
+from layout import RowLayout
+from profiler import install_tk_hook, profiled, profiler
+from stall_watchdog import Watchdog
+from properties_panel import PropertiesPanel
+from status_bar import StatusBar
+from theme import apply_theme
+import tracing
+
+# Estimated row heights (including ROW_PADDING above and below) used for
+# element types that have not been measured on screen yet
+ROW_HEIGHT_ESTIMATES = {
+    "header": 70,
+    "paragraph": 90,
+    "button": 70,
+    "image": 80,
+    "divider": 32,
+    "form": 290
+}
+ROW_PADDING = 5
+ROW_MARGIN_X = 10
+MAX_POOLED_VIEWS = 64  # recycled rows kept per element type
+ELEMENT_TAG = "DesignElement"  # bind tag shared by all element row widgets
+DRAG_THRESHOLD = 4  # pixels the pointer must move before a press becomes a drag
+DRAG_FRAME_MS = 16  # drag feedback is redrawn at most once per frame
+DRAG_SCROLL_MARGIN = 30  # dragging this close to the canvas edge scrolls it
+
+
+class ElementView:
+    # A row of widgets on the design canvas. Views are pooled per element
+    # type and rebound to whichever element scrolls into view.
+    __slots__ = ("type", "frame", "window", "body", "element")
+
+    def __init__(self, type_, frame, window, body):
+        self.type = type_
+        self.frame = frame
+        self.window = window
+        self.body = body
+        self.element = None
+
+
+class DragState:
+    # A row being dragged. Pointer motion only records the position; the
+    # ghost and drop marker follow once per frame and the document is
+    # changed on drop.
+    __slots__ = ("element", "press_y", "grab_offset", "height", "pointer", "active", "target",
+                 "frame_id")
+
+    def __init__(self, element, press_y, grab_offset, height):
+        self.element = element
+        self.press_y = press_y
+        self.grab_offset = grab_offset
+        self.height = height
+        self.pointer = None  # latest (x_root, y_root)
+        self.active = False
+        self.target = None  # gap index the row would be dropped into
+        self.frame_id = None
 
-# Try to import ThemedStyle for better themes
-try:
-    from ttkthemes import ThemedStyle
-except ImportError:
-    ThemedStyle = None
 
 class WebDesignApp:
     def __init__(self, root):
@@ -26,10 +86,40 @@ class WebDesignApp:
         
         # Create variables to store design elements
         self.current_project = None
-        self.elements = []
+        self.project_load = None  # (file, chunk iterator, name) while a project is being read
+        self.project_load_revision = None  # what the document revision would be without user edits
+        self.project_load_job = None
+        self.document = Document({"accent_color": self.accent_color})
+        self.document.subscribe(self.on_document_event)
+        self.history = UndoHistory(self.document)
+        # Rendered HTML per element, reused until the element changes
+        self.fragment_cache = html_export.FragmentCache(self.document)
+        self.element_widgets = {}  # element id -> ElementView currently on the canvas
+        self.view_pool = {}  # element type -> recycled ElementViews
+        self.layout = RowLayout()
+        self.row_heights = dict(ROW_HEIGHT_ESTIMATES)
+        self.canvas_width = 1
+        self._applied_width = None
+        self._applied_region = None
+        self._layout_pending = None  # after_idle id of the queued layout pass
+        self._batch_depth = 0
+        self._batch_status = None
+        # Only rows within `overscan` pixels of the visible area get widgets
+        self.virtualize = True
+        self.overscan = 300
         self.selected_element = None
+        self.drag = None  # DragState while a row is pressed or dragged
         self.custom_styles = {}
-        
+        self.profiler_window = None
+        self.stall_window = None
+
+        # Callbacks registered from here on can be timed by the handler
+        # profiler (View > Handler Profiler, or WEB_DESIGNER_PROFILE=1)
+        install_tk_hook()
+        # WEB_DESIGNER_TRACE=trace.json records the whole session
+        self.trace_path = os.environ.get(tracing.ENV_VAR)
+        if self.trace_path:
+            self.start_trace()
         self.setup_ui()
 
     def setup_ui(self):
@@ -61,6 +151,51 @@ class WebDesignApp:
         self.create_canvas()
         self.create_status_bar()
 
+        # File output runs on a worker thread against document snapshots
+        self.worker = background.BackgroundWorker(self.root)
+        self.journal = journal.Journal()
+        # Flags event-loop stalls; started once startup work is done
+        self.watchdog = Watchdog(self.root, on_stall=self.on_stall)
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
+
+        # Anything not needed for the first frame is done once the window
+        # has been drawn (or after a short delay if it is never exposed)
+        self.first_paint_time = None
+        self.startup_time = None
+        self._first_paint_actions = [self.finish_startup]
+        self._first_paint_binding = self.root.bind("<Expose>", self.on_first_paint, add="+")
+        self._first_paint_fallback = self.root.after(500, self.on_first_paint)
+
+    def after_first_paint(self, action):
+        if self._first_paint_actions is None:
+            action()
+        else:
+            self._first_paint_actions.append(action)
+
+    def on_first_paint(self, event=None):
+        if self._first_paint_actions is None:
+            return
+        self.first_paint_time = time.perf_counter()
+        self.root.unbind("<Expose>", self._first_paint_binding)
+        self.root.after_cancel(self._first_paint_fallback)
+        actions, self._first_paint_actions = self._first_paint_actions, None
+        for action in actions:
+            self.root.after_idle(action)
+
+    def finish_startup(self):
+        # Rarely used panels
+        self.create_global_styles_section()
+
+        # Every edit is journaled next to the project so that a session that
+        # did not exit cleanly can be recovered
+        for journal_file in journal.orphaned_untitled_journals():
+            if self.recover_session(journal_file):
+                break
+        else:
+            self.journal.attach(self.document, snapshot=len(self.document) > 0)
+        self.watchdog.start()
+        self.startup_time = time.perf_counter()
+
     def create_toolbox(self):
         # Toolbox header
         header = tk.Label(self.sidebar, text="ELEMENTS", bg=self.sidebar_color, 
@@ -99,7 +234,9 @@ class WebDesignApp:
             btn.pack(fill="x", pady=2, padx=5)
 
     def create_canvas(self):
-        # Canvas for web design preview
+        # Canvas for web design preview. Element rows are embedded directly
+        # as canvas windows; only the rows near the visible area exist as
+        # widgets (see refresh_viewport).
         self.design_canvas = tk.Canvas(self.canvas_frame, bg="white", bd=0,
                                       highlightthickness=0)
         self.design_canvas.pack(fill="both", expand=True)
@@ -108,22 +245,143 @@ class WebDesignApp:
         self.scroll_y = ttk.Scrollbar(self.canvas_frame, orient="vertical", 
                                      command=self.design_canvas.yview)
         self.scroll_y.pack(side="right", fill="y")
-        self.design_canvas.configure(yscrollcommand=self.scroll_y.set)
-        
-        # Frame inside canvas for elements
-        self.elements_frame = tk.Frame(self.design_canvas, bg="white")
-        self.canvas_window = self.design_canvas.create_window(
-            (0, 0), window=self.elements_frame, anchor="nw")
+        self.design_canvas.configure(yscrollcommand=self.on_canvas_scroll)
         
-        # Bind events
-        self.elements_frame.bind("<Configure>", self.on_frame_configure)
+        # Bind events. Pointer events of all rows go to one set of handlers
+        # that hit-test the row layout (see canvas_events)
         self.design_canvas.bind("<Configure>", self.on_canvas_configure)
+        add_bindtag(self.design_canvas, ELEMENT_TAG)
+        self.root.bind_class(ELEMENT_TAG, "<Button-1>", self.on_element_press)
+        self.root.bind_class(ELEMENT_TAG, "<B1-Motion>", self.on_drag)
+        self.root.bind_class(ELEMENT_TAG, "<ButtonRelease-1>", self.on_drop)
+        self.drag_ghost = OutlineGhost(self.design_canvas, self.accent_color)
+        self.schedule_layout()
         
-    def on_frame_configure(self, event):
-        self.design_canvas.configure(scrollregion=self.design_canvas.bbox("all"))
+    def on_canvas_scroll(self, first, last):
+        self.scroll_y.set(first, last)
+        self.schedule_layout()
         
     def on_canvas_configure(self, event):
-        self.design_canvas.itemconfig(self.canvas_window, width=event.width)
+        # Resizes arrive once per pixel while dragging the window edge; only
+        # remember the width and let the idle flush apply it once
+        self.canvas_width = event.width
+        self.schedule_layout()
+
+    def row_width(self):
+        return max(self.canvas_width - 2 * ROW_MARGIN_X, 1)
+
+    def schedule_layout(self):
+        # Coalesce scrollregion, row width and viewport updates into at most
+        # one pass per idle cycle
+        if self._layout_pending is None:
+            self._layout_pending = self.root.after_idle(self.flush_layout)
+
+    @profiled
+    def flush_layout(self):
+        self._layout_pending = None
+        if self.canvas_width != self._applied_width:
+            self._applied_width = self.canvas_width
+            for view in self.element_widgets.values():
+                self.design_canvas.itemconfig(view.window, width=self.row_width())
+        self.update_scrollregion()
+        self.refresh_viewport()
+
+    def update_scrollregion(self):
+        # The extent comes from the row layout's running total; no bbox scan
+        region = (0, 0, self.canvas_width, self.layout.total())
+        if region != self._applied_region:
+            self._applied_region = region
+            self.design_canvas.configure(scrollregion=region)
+
+    def toggle_virtualization(self):
+        self.virtualize = self.virtualize_var.get()
+        self.schedule_layout()
+        self.update_status("Virtualized canvas " + ("enabled." if self.virtualize else "disabled."))
+
+    def visible_rows(self):
+        if not self.virtualize:
+            return 0, len(self.layout)
+        top = self.design_canvas.canvasy(0)
+        bottom = top + self.design_canvas.winfo_height()
+        return self.layout.visible_range(top - self.overscan, bottom + self.overscan)
+
+    @profiled
+    def refresh_viewport(self):
+        # Realize rows that scrolled into range, recycle the ones that left it
+        start, end = self.visible_rows()
+        wanted = self.document.elements[start:end]
+        wanted_ids = {element.id for element in wanted}
+        for element_id in [i for i in self.element_widgets if i not in wanted_ids]:
+            self.release_view(self.element_widgets.pop(element_id))
+
+        for index, element in enumerate(wanted, start):
+            view = self.element_widgets.get(element.id)
+            if view is None:
+                view = self.acquire_view(element, index)
+            self.design_canvas.coords(view.window, ROW_MARGIN_X, self.layout.offset(index) + ROW_PADDING)
+
+    def acquire_view(self, element, index):
+        pool = self.view_pool.get(element.type)
+        if pool:
+            view = pool.pop()
+            self.design_canvas.itemconfig(view.window, state="normal", width=self.row_width())
+        else:
+            view = self.create_element_view(element.type)
+        view.element = element
+        self.bind_view(view)
+        self.element_widgets[element.id] = view
+
+        # Rows that were never on screen use the last height measured for their type
+        height = self.row_heights[element.type]
+        if self.layout.height(index) != height:
+            self.layout.set_height(index, height)
+            self.schedule_layout()
+        return view
+
+    def release_view(self, view):
+        view.element = None
+        pool = self.view_pool.setdefault(view.type, [])
+        if len(pool) < MAX_POOLED_VIEWS:
+            self.design_canvas.itemconfig(view.window, state="hidden")
+            pool.append(view)
+        else:
+            self.design_canvas.delete(view.window)
+            view.frame.destroy()
+
+    def create_element_view(self, type_):
+        if type_ == "divider":
+            frame = tk.Frame(self.design_canvas, bd=0, bg="white")
+        else:
+            frame = tk.Frame(self.design_canvas, bd=1, relief=tk.RIDGE, bg="white")
+        body = getattr(self, f"build_{type_}_widget")(frame)
+        window = self.design_canvas.create_window(ROW_MARGIN_X, 0, window=frame, anchor="nw",
+                                                  width=self.row_width())
+        view = ElementView(type_, frame, window, body)
+
+        # Clicks anywhere in the row reach the delegated handlers
+        add_bindtag(frame, ELEMENT_TAG)
+        frame.bind("<Configure>", lambda e, v=view: self.on_view_configure(v, e))
+        return view
+
+    def bind_view(self, view):
+        getattr(self, f"bind_{view.type}_widget")(view.body, view.element)
+        if view.element is self.selected_element:
+            view.frame.config(bd=2, relief=tk.SOLID, highlightbackground=self.accent_color)
+        elif view.type == "divider":
+            view.frame.config(bd=0, relief=tk.FLAT)
+        else:
+            view.frame.config(bd=1, relief=tk.RIDGE)
+
+    def on_view_configure(self, view, event):
+        # Keep the layout in step with the measured height of realized rows
+        if view.element is None:
+            return
+        height = event.height + 2 * ROW_PADDING
+        self.row_heights[view.type] = height
+        index = self.document.index_of(view.element)
+        if self.layout.height(index) != height:
+            self.layout.set_height(index, height)
+            self.schedule_layout()
 
     def create_properties_panel(self):
         # Properties header
@@ -131,17 +389,13 @@ class WebDesignApp:
                          fg=self.text_color, font=('Helvetica', 10, 'bold'))
         header.pack(fill="x", pady=(10,5), padx=5)
         
-        # Element properties frame
-        self.element_properties = tk.Frame(self.properties_panel, bg=self.bg_color)
+        # Element properties frame; its per-type editors are cached and
+        # rebound on selection
+        self.element_properties = PropertiesPanel(self.properties_panel, self.apply_element_properties,
+                                                  bg=self.bg_color, fg=self.text_color)
         self.element_properties.pack(fill="both", expand=True, padx=5, pady=5)
         
-        # Default empty state
-        empty_label = tk.Label(self.element_properties, text="No element selected",
-                             bg=self.bg_color, fg="#7f8c8d")
-        empty_label.pack(pady=20)
-        
-        # Global styles section
-        self.create_global_styles_section()
+        # The global styles section is built by finish_startup()
         
     def create_global_styles_section(self):
         styles_frame = tk.LabelFrame(self.properties_panel, text="Global Styles",
@@ -167,182 +421,296 @@ class WebDesignApp:
         apply_btn.grid(row=2, column=0, columnspan=2, pady=5, sticky="we")
 
     def add_header(self):
-        element_id = f"header_{len(self.elements)}"
-        header_frame = tk.Frame(self.elements_frame, bd=1, relief=tk.RIDGE, bg="white")
-        header_frame.pack(fill="x", pady=5, padx=10)
-        
-        # Header content
-        header_label = tk.Label(header_frame, text="New Header", font=('Helvetica', 18, 'bold'),
-                              bg="white", fg="#333333")
-        header_label.pack(pady=10, padx=10)
-        
-        # Store element data
-        element_data = {
-            "id": element_id,
-            "type": "header",
-            "frame": header_frame,
-            "content": "New Header",
-            "styles": {
-                "font_size": 18,
-                "font_weight": "bold",
-                "color": "#333333",
-                "alignment": "left"
-            }
-        }
-        self.elements.append(element_data)
-        
-        # Make draggable and selectable
-        self.make_draggable(header_frame, element_data)
+        self.document.add_element("header")
         self.update_status("Header added.")
         
     def add_paragraph(self):
-        element_id = f"paragraph_{len(self.elements)}"
-        para_frame = tk.Frame(self.elements_frame, bd=1, relief=tk.RIDGE, bg="white")
-        para_frame.pack(fill="x", pady=5, padx=10)
-        
-        # Paragraph content
-        para_text = tk.Text(para_frame, height=3, wrap=tk.WORD, font=('Helvetica', 12),
-                          bg="white", fg="#333333", padx=5, pady=5)
-        para_text.insert(tk.END, "Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
-        para_text.pack(fill="x", padx=5, pady=5)
-        
-        # Store element data
-        element_data = {
-            "id": element_id,
-            "type": "paragraph",
-            "frame": para_frame,
-            "content": "Lorem ipsum...",
-            "styles": {
-                "font_size": 12,
-                "color": "#333333",
-                "line_height": 1.5
-            }
-        }
-        self.elements.append(element_data)
-        
-        # Make draggable and selectable
-        self.make_draggable(para_frame, element_data)
+        self.document.add_element("paragraph")
         self.update_status("Paragraph added.")
 
     def add_button(self):
-        element_id = f"button_{len(self.elements)}"
-        button_frame = tk.Frame(self.elements_frame, bd=1, relief=tk.RIDGE, bg="white")
-        button_frame.pack(fill="x", pady=5, padx=10)
-
-        btn = tk.Button(button_frame, text="Click Me", bg=self.accent_color, fg="white",
-                        relief=tk.FLAT, font=('Helvetica', 12, 'bold'))
-        btn.pack(pady=10, padx=10)
-
-        element_data = {
-            "id": element_id,
-            "type": "button",
-            "frame": button_frame,
-            "content": "Click Me",
-            "styles": {
-                "background_color": self.accent_color,
-                "color": "white",
-                "font_size": 12,
-                "font_weight": "bold"
-            }
-        }
-        self.elements.append(element_data)
-        self.make_draggable(button_frame, element_data)
+        self.document.add_element("button")
         self.update_status("Button added.")
 
     def add_image(self):
-        element_id = f"image_{len(self.elements)}"
-        image_frame = tk.Frame(self.elements_frame, bd=1, relief=tk.RIDGE, bg="white")
-        image_frame.pack(fill="x", pady=5, padx=10)
+        self.document.add_element("image")
+        self.update_status("Image placeholder added.")
+
+    def add_divider(self):
+        self.document.add_element("divider")
+        self.update_status("Divider added.")
+
+    def add_form(self):
+        self.document.add_element("form")
+        self.update_status("Form added.")
+
+    def insert_template(self, name):
+        with self.batch_update():
+            self.document.add_elements([{"type": type_} for type_ in TEMPLATES[name]])
+            self.update_status(f"Template '{name}' inserted.")
+
+    def duplicate_selected(self):
+        element = self.selected_element
+        if not element:
+            messagebox.showinfo("Duplicate", "Select an element to duplicate first.")
+            return
+        from tkinter import simpledialog
+
+        count = simpledialog.askinteger("Duplicate Element", "Number of copies:",
+                                        parent=self.root, minvalue=1, maxvalue=100000)
+        if not count:
+            return
+        item = {"type": element.type, "content": element.content, "styles": element.styles}
+        with self.batch_update():
+            self.document.add_elements([item] * count, self.document.index_of(element) + 1)
+            self.update_status(f"Inserted {count} copies of {element.type}.")
+
+    @contextmanager
+    def batch_update(self):
+        # Group many edits: layout runs once afterwards (schedule_layout is
+        # already coalesced) and only the last status message is shown
+        self._batch_depth += 1
+        try:
+            # ...and undo reverts the whole batch at once
+            with self.history.group():
+                yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_status is not None:
+                message, self._batch_status = self._batch_status, None
+                self.update_status(message)
+
+    @profiled
+    def on_document_event(self, event, *args):
+        # The canvas only mirrors the document; all element data lives there
+        if event == "added":
+            element, index = args
+            self.layout.insert(index, self.row_heights[element.type])
+            self.schedule_layout()
+        elif event == "added_many":
+            elements, index = args
+            row_heights = self.row_heights
+            self.layout.insert_many(index, [row_heights[element.type] for element in elements])
+            self.schedule_layout()
+        elif event == "moved":
+            element, old_index, new_index = args
+            self.layout.move(old_index, new_index)
+            self.schedule_layout()
+        elif event == "removed":
+            element, index = args
+            if self.selected_element is element:
+                self.selected_element = None
+                self.update_properties_panel()
+            self.layout.pop(index)
+            view = self.element_widgets.pop(element.id, None)
+            if view:
+                self.release_view(view)
+            self.schedule_layout()
+        elif event == "removed_many":
+            elements, index = args
+            if self.selected_element in elements:
+                self.selected_element = None
+                self.update_properties_panel()
+            self.layout.delete(index, len(elements))
+            for element in elements:
+                view = self.element_widgets.pop(element.id, None)
+                if view:
+                    self.release_view(view)
+            self.schedule_layout()
+        elif event == "changed":
+            view = self.element_widgets.get(args[0].id)
+            if view:
+                self.bind_view(view)
+            if args[0] is self.selected_element:
+                self.update_properties_panel()
+        elif event == "settings":
+            self.design_canvas.config(bg=args[0]["bg_color"])
+        elif event == "cleared":
+            self.selected_element = None
+            for view in self.element_widgets.values():
+                self.release_view(view)
+            self.element_widgets = {}
+            self.layout.clear()
+            self.schedule_layout()
+            self.update_properties_panel()
+
+    # Each element type has a build_* method that creates the row's widgets
+    # once and a bind_* method that shows an element's data in them, so rows
+    # can be recycled between elements of the same type.
+
+    def build_header_widget(self, frame):
+        header_label = tk.Label(frame, bg="white")
+        header_label.pack(pady=10, padx=10)
+        return header_label
+
+    def bind_header_widget(self, header_label, element):
+        styles = element.styles
+        header_label.config(text=element.content,
+                            font=('Helvetica', styles.get("font_size", 18), styles.get("font_weight", "bold")),
+                            fg=styles.get("color", "#333333"))
+
+    def build_paragraph_widget(self, frame):
+        # Read-only: the content is edited in the properties panel, and the
+        # widget is recycled for other paragraphs
+        para_text = tk.Text(frame, height=3, wrap=tk.WORD, bg="white", padx=5, pady=5,
+                            state="disabled")
+        para_text.pack(fill="x", padx=5, pady=5)
+        return para_text
+
+    def bind_paragraph_widget(self, para_text, element):
+        styles = element.styles
+        para_text.config(font=('Helvetica', styles.get("font_size", 12)), fg=styles.get("color", "#333333"),
+                         state="normal")
+        para_text.delete("1.0", tk.END)
+        para_text.insert(tk.END, element.content or "")
+        para_text.config(state="disabled")
+
+    def build_button_widget(self, frame):
+        btn = tk.Button(frame, relief=tk.FLAT)
+        btn.pack(pady=10, padx=10)
+        return btn
+
+    def bind_button_widget(self, btn, element):
+        styles = element.styles
+        btn.config(text=element.content, bg=styles.get("background_color", self.accent_color),
+                   fg=styles.get("color", "white"),
+                   font=('Helvetica', styles.get("font_size", 12), styles.get("font_weight", "bold")))
 
-        image_label = tk.Label(image_frame, text="[Image Placeholder]", bg="white", fg="#7f8c8d",
+    def build_image_widget(self, frame):
+        image_label = tk.Label(frame, text="[Image Placeholder]", bg="white", fg="#7f8c8d",
                                font=('Helvetica', 12))
         image_label.pack(pady=20, padx=20)
+        return image_label
 
-        element_data = {
-            "id": element_id,
-            "type": "image",
-            "frame": image_frame,
-            "content": "placeholder.png", # In a real app, this would be an image path
-            "styles": {
-                "width": "auto",
-                "height": "auto"
-            }
-        }
-        self.elements.append(element_data)
-        self.make_draggable(image_frame, element_data)
-        self.update_status("Image placeholder added.")
-
-    def add_divider(self):
-        element_id = f"divider_{len(self.elements)}"
-        divider_frame = tk.Frame(self.elements_frame, bd=0, bg="white")
-        divider_frame.pack(fill="x", pady=5, padx=10)
+    def bind_image_widget(self, image_label, element):
+        pass  # In a real app, load element.content as the image
 
-        divider_line = tk.Frame(divider_frame, height=2, bg="#cccccc", relief=tk.GROOVE)
+    def build_divider_widget(self, frame):
+        divider_line = tk.Frame(frame, relief=tk.GROOVE)
         divider_line.pack(fill="x", pady=10)
+        return divider_line
 
-        element_data = {
-            "id": element_id,
-            "type": "divider",
-            "frame": divider_frame,
-            "styles": {
-                "height": 2,
-                "color": "#cccccc"
-            }
-        }
-        self.elements.append(element_data)
-        self.make_draggable(divider_frame, element_data)
-        self.update_status("Divider added.")
+    def bind_divider_widget(self, divider_line, element):
+        divider_line.config(height=element.styles.get("height", 2), bg=element.styles.get("color", "#cccccc"))
 
-    def add_form(self):
-        element_id = f"form_{len(self.elements)}"
-        form_frame = tk.Frame(self.elements_frame, bd=1, relief=tk.RIDGE, bg="white")
-        form_frame.pack(fill="x", pady=5, padx=10)
-
-        tk.Label(form_frame, text="Contact Form", font=('Helvetica', 14, 'bold'), bg="white").pack(pady=5)
-        tk.Label(form_frame, text="Name:", bg="white").pack(anchor="w", padx=10)
-        tk.Entry(form_frame, width=40).pack(fill="x", padx=10, pady=2)
-        tk.Label(form_frame, text="Email:", bg="white").pack(anchor="w", padx=10)
-        tk.Entry(form_frame, width=40).pack(fill="x", padx=10, pady=2)
-        tk.Label(form_frame, text="Message:", bg="white").pack(anchor="w", padx=10)
-        tk.Text(form_frame, height=5, wrap=tk.WORD).pack(fill="x", padx=10, pady=2)
-        tk.Button(form_frame, text="Submit", bg=self.accent_color, fg="white", relief=tk.FLAT).pack(pady=10)
-
-        element_data = {
-            "id": element_id,
-            "type": "form",
-            "frame": form_frame,
-            "content": "Contact Form",
-            "styles": {} # Styles would be more complex for a form
-        }
-        self.elements.append(element_data)
-        self.make_draggable(form_frame, element_data)
-        self.update_status("Form added.")
+    def build_form_widget(self, frame):
+        title = tk.Label(frame, font=('Helvetica', 14, 'bold'), bg="white")
+        title.pack(pady=5)
+        tk.Label(frame, text="Name:", bg="white").pack(anchor="w", padx=10)
+        name_entry = tk.Entry(frame, width=40)
+        name_entry.pack(fill="x", padx=10, pady=2)
+        tk.Label(frame, text="Email:", bg="white").pack(anchor="w", padx=10)
+        email_entry = tk.Entry(frame, width=40)
+        email_entry.pack(fill="x", padx=10, pady=2)
+        tk.Label(frame, text="Message:", bg="white").pack(anchor="w", padx=10)
+        message_text = tk.Text(frame, height=5, wrap=tk.WORD)
+        message_text.pack(fill="x", padx=10, pady=2)
+        tk.Button(frame, text="Submit", bg=self.accent_color, fg="white", relief=tk.FLAT).pack(pady=10)
+        return title, name_entry, email_entry, message_text
 
+    def bind_form_widget(self, widgets, element):
+        title, name_entry, email_entry, message_text = widgets
+        title.config(text=element.content)
+        # Don't carry text typed into a recycled row over to another form
+        name_entry.delete(0, tk.END)
+        email_entry.delete(0, tk.END)
+        message_text.delete("1.0", tk.END)
 
-    def make_draggable(self, widget, element_data):
-        widget.bind("<Button-1>", lambda e: self.select_element(element_data))
-        widget.bind("<B1-Motion>", self.on_drag)
-        
-    def select_element(self, element_data):
+    def element_at(self, y):
+        # Element whose row contains canvas y, found in O(log n) through the
+        # row layout
+        if not 0 <= y < self.layout.total():
+            return None
+        return self.document.elements[self.layout.index_at(y)]
+
+    def on_element_press(self, event):
+        y = canvas_point(self.design_canvas, event)[1]
+        element = self.element_at(y)
+        if element is None:
+            return
+        self.select_element(element)
+        top, bottom = self.layout.extent(self.document.index_of(element))
+        self.drag = DragState(element, y, y - top - ROW_PADDING, bottom - top - 2 * ROW_PADDING)
+
+    @profiled
+    def select_element(self, element):
         # Deselect previous element if any
-        if self.selected_element and self.selected_element['frame']:
-            self.selected_element['frame'].config(bd=1, relief=tk.RIDGE)
+        previous_view = self.selected_element and self.element_widgets.get(self.selected_element.id)
+        self.selected_element = element
+        if previous_view:
+            self.bind_view(previous_view)
         
-        self.selected_element = element_data
         # Highlight selected element
-        if self.selected_element and self.selected_element['frame']:
-            self.selected_element['frame'].config(bd=2, relief=tk.SOLID, highlightbackground=self.accent_color)
+        view = self.element_widgets.get(element.id)
+        if view:
+            self.bind_view(view)
         
         self.update_properties_panel()
-        self.update_status(f"Selected element: {element_data['type'].capitalize()}")
+        self.update_status(f"Selected element: {element.type.capitalize()}")
         
     def on_drag(self, event):
-        # Simple drag implementation - in a real app you'd want to implement proper reordering
-        # For a basic visual drag, you could lift the widget to the top
-        if self.selected_element and self.selected_element['frame']:
-            self.selected_element['frame'].lift()
-        pass # Placeholder for more complex drag-and-drop logic
+        drag = self.drag
+        if drag is None:
+            return None
+        drag.pointer = (event.x_root, event.y_root)
+        if drag.frame_id is None:
+            drag.frame_id = self.root.after(DRAG_FRAME_MS, self.update_drag)
+        # Keep text fields from selecting text while a row is dragged
+        return "break" if drag.active else None
 
+    @profiled
+    def update_drag(self):
+        drag = self.drag
+        drag.frame_id = None
+        if drag.element not in self.document:
+            self.end_drag()
+            return
+        canvas = self.design_canvas
+        y_in_view = drag.pointer[1] - canvas.winfo_rooty()
+        if not drag.active:
+            if abs(canvas.canvasy(y_in_view) - drag.press_y) < DRAG_THRESHOLD:
+                return
+            drag.active = True
+        # Near an edge, keep scrolling frame by frame while the pointer rests
+        if y_in_view < DRAG_SCROLL_MARGIN or y_in_view > canvas.winfo_height() - DRAG_SCROLL_MARGIN:
+            canvas.yview_scroll(-1 if y_in_view < DRAG_SCROLL_MARGIN else 1, "units")
+            drag.frame_id = self.root.after(DRAG_FRAME_MS, self.update_drag)
+
+        # The ghost follows the pointer; the drop position is found by
+        # binary search over the row extents (RowLayout.insertion_index)
+        view_top = canvas.canvasy(0)
+        y = view_top + y_in_view
+        width = self.row_width()
+        self.drag_ghost.show(ROW_MARGIN_X, y_in_view - drag.grab_offset, width, drag.height)
+        drag.target = self.layout.insertion_index(y)
+        self.drag_ghost.show_marker(ROW_MARGIN_X, self.layout.offset(drag.target) - view_top, width)
+
+    def on_drop(self, event):
+        drag = self.drag
+        if drag is None:
+            return None
+        if drag.frame_id is not None:
+            self.root.after_cancel(drag.frame_id)
+            drag.frame_id = None
+        if drag.pointer is not None and drag.element in self.document:
+            drag.pointer = (event.x_root, event.y_root)
+            self.update_drag()
+        active = drag.active
+        if active and drag.element in self.document:
+            old_index = self.document.index_of(drag.element)
+            # The gap index counts the dragged row itself
+            new_index = drag.target - 1 if drag.target > old_index else drag.target
+            if new_index != old_index:
+                self.document.move_element(drag.element, new_index)
+                self.update_status(f"Moved {drag.element.type} to position {new_index + 1}.")
+        self.end_drag()
+        return "break" if active else None
+
+    def end_drag(self):
+        if self.drag is not None and self.drag.frame_id is not None:
+            self.root.after_cancel(self.drag.frame_id)
+        self.drag = None
+        self.drag_ghost.hide()
 
     def create_menu(self):
         menubar = tk.Menu(self.root)
@@ -354,33 +722,54 @@ class WebDesignApp:
         file_menu.add_command(label="Save Project", command=self.save_project)
         file_menu.add_separator()
         file_menu.add_command(label="Export HTML", command=self.export_html)
+        file_menu.add_command(label="Export Minified HTML...", command=lambda: self.export_html(minify=True))
+        self.external_css_var = tk.BooleanVar(value=False)
+        file_menu.add_checkbutton(label="Export Stylesheet as Separate File", variable=self.external_css_var)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.root.quit)
+        file_menu.add_command(label="Exit", command=self.exit_app)
         menubar.add_cascade(label="File", menu=file_menu)
         
         # Edit menu
         edit_menu = tk.Menu(menubar, tearoff=0)
-        edit_menu.add_command(label="Undo", command=self.undo_action)
-        edit_menu.add_command(label="Redo", command=self.redo_action)
+        edit_menu.add_command(label="Undo", command=self.undo_action, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Redo", command=self.redo_action, accelerator="Ctrl+Y")
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Duplicate Selected...", command=self.duplicate_selected)
         edit_menu.add_separator()
         edit_menu.add_command(label="Preferences", command=self.open_preferences)
         menubar.add_cascade(label="Edit", menu=edit_menu)
         
+        # Insert menu
+        insert_menu = tk.Menu(menubar, tearoff=0)
+        for name in TEMPLATES:
+            insert_menu.add_command(label=f"{name} Template", command=lambda n=name: self.insert_template(n))
+        menubar.add_cascade(label="Insert", menu=insert_menu)
+        
         # View menu
         view_menu = tk.Menu(menubar, tearoff=0)
         view_menu.add_command(label="Preview in Browser", command=self.preview_in_browser)
+        self.virtualize_var = tk.BooleanVar(value=self.virtualize)
+        view_menu.add_checkbutton(label="Virtualized Canvas", variable=self.virtualize_var,
+                                  command=self.toggle_virtualization)
+        view_menu.add_separator()
+        view_menu.add_command(label="Handler Profiler...", command=self.open_profiler)
+        view_menu.add_command(label="Responsiveness...", command=self.open_stall_window)
+        self.trace_var = tk.BooleanVar(value=profiler.trace is not None)
+        view_menu.add_checkbutton(label="Record Trace", variable=self.trace_var, command=self.toggle_trace)
         menubar.add_cascade(label="View", menu=view_menu)
         
         self.root.config(menu=menubar)
+        self.root.bind_all("<Control-z>", lambda e: self.undo_action())
+        self.root.bind_all("<Control-y>", lambda e: self.redo_action())
+        self.root.bind_all("<Control-Z>", lambda e: self.redo_action())
 
     def new_project(self):
-        self.elements = []
-        self.selected_element = None
+        self.cancel_project_load()
         self.current_project = None
-        
-        # Clear canvas
-        for widget in self.elements_frame.winfo_children():
-            widget.destroy()
+        # Clearing the document also clears the canvas
+        self.document.clear()
+        self.history.clear()
+        self.journal.attach(self.document)
             
         self.update_status("New project created. Start adding elements!")
         
@@ -389,20 +778,121 @@ class WebDesignApp:
             defaultextension=".wdp",
             filetypes=[("Web Design Projects", "*.wdp"), ("All Files", "*.*")])
         
-        if file_path:
-            self.current_project = file_path
+        if not file_path:
+            return
+        self.cancel_project_load()
+        if self.recover_session(journal.journal_path(file_path)):
+            return
+        name = os.path.basename(file_path)
+        try:
+            f = open(file_path, 'r', encoding="utf-8")
             try:
-                with open(file_path, 'r') as f:
-                    # In a real application, you'd parse the saved data
-                    # and reconstruct elements on the canvas.
-                    # For now, let's just indicate it's opened.
-                    content = f.read()
-                    print(f"Opened project content:\n{content}") # For debugging
-                self.update_status(f"Project '{os.path.basename(file_path)}' opened.")
-                messagebox.showinfo("Success", "Project opened successfully! (Reconstruction not fully implemented yet)")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to open project: {str(e)}")
-            
+                reader = project_file.ProjectReader(f)
+            except BaseException:
+                f.close()
+                raise
+        except (OSError, UnicodeDecodeError, project_file.ProjectFormatError) as e:
+            messagebox.showerror("Error", f"Failed to open project: {str(e)}")
+            return
+
+        self.current_project = file_path
+        # Loading is not journaled; the journal restarts from the file once
+        # it has been read
+        self.journal.detach()
+        self.document.clear()
+        self.document.update_settings(**reader.settings)
+        self.history.clear()
+        # Elements are read in chunks from the event loop, so the first
+        # screen is shown while the rest of the file is still being parsed.
+        # The editor stays usable meanwhile; edits made during the load are
+        # kept in the history and picked up by the journal at the end.
+        self.project_load = (f, iter(reader), name)
+        self.project_load_revision = self.document.revision
+        self.status_bar.start_progress(f"Opening '{name}'...", reader.count or 1)
+        self.load_project_chunk()
+
+    def load_project_chunk(self):
+        self.project_load_job = None
+        f, chunks, name = self.project_load
+        try:
+            elements = next(chunks, None)
+        except (OSError, UnicodeDecodeError, project_file.ProjectFormatError) as e:
+            self.cancel_project_load()
+            messagebox.showerror("Error", f"Failed to open project: {str(e)}")
+            self.update_status(f"Project '{name}' only partially opened; save it under a new name.")
+            # Saving the truncated document must not overwrite the file
+            self.current_project = None
+            self.journal.attach(self.document, snapshot=True)
+            return
+        if elements is None:
+            self.cancel_project_load()
+            self.update_status(f"Project '{name}' opened.")
+            # The journal builds on the file unless the user already edited
+            edited = self.document.revision != self.project_load_revision
+            self.journal.attach(self.document, self.current_project, snapshot=edited)
+            return
+        # Chunks are appended after everything else, so the undo entries
+        # of edits made during the load stay valid without them
+        revision = self.document.revision
+        with self.history.paused():
+            self.document.insert_elements(elements)
+        self.project_load_revision += self.document.revision - revision
+        self.status_bar.step_progress(len(self.document))
+        self.project_load_job = self.root.after(1, self.load_project_chunk)
+
+    def cancel_project_load(self):
+        if self.project_load is None:
+            return
+        if self.project_load_job is not None:
+            self.root.after_cancel(self.project_load_job)
+            self.project_load_job = None
+        self.project_load[0].close()
+        self.project_load = None
+        self.status_bar.finish_progress()
+
+    def recover_session(self, journal_file):
+        # Offer to restore the edits recorded by a session that did not exit
+        # cleanly; returns True if they were restored. A declined journal is
+        # deleted so that it is not offered again.
+        if not journal.is_orphaned(journal_file):
+            return False
+        if not messagebox.askyesno("Recover Changes",
+                                   "Unsaved changes from a previous session were found. Recover them?"):
+            journal.discard(journal_file)
+            return False
+        try:
+            recovered = journal.recover(journal_file)
+        except (OSError, UnicodeDecodeError, project_file.ProjectFormatError) as e:
+            # The journal is kept, so recovery can be retried once the
+            # project file is readable again
+            messagebox.showerror("Error", f"Failed to recover changes: {str(e)}")
+            return False
+        if recovered is None:
+            return False
+        project, document = recovered
+        self.current_project = project
+        self.document.clear()
+        self.document.update_settings(**document.settings)
+        self.document.insert_elements(list(document))
+        self.history.clear()
+        self.journal.attach(self.document, project, snapshot=True)
+        if journal_file != self.journal.path:
+            # An untitled session's journal, now carried on in ours
+            journal.discard(journal_file)
+        self.update_status("Unsaved changes recovered.")
+        return True
+
+    def exit_app(self):
+        self.watchdog.stop()
+        self.cancel_project_load()
+        # Finish a save that is still being written before leaving
+        self.worker.close()
+        if self.trace_path and profiler.trace is not None:
+            background.atomic_write(self.trace_path, self.stop_trace().write)
+        # A clean exit leaves no journal behind
+        self.journal.close(discard=True)
+        self.root.quit()
+
     def save_project(self):
         if not self.current_project:
             self.save_project_as()
@@ -418,27 +908,105 @@ class WebDesignApp:
             self.current_project = file_path
             self.save_to_file(file_path)
             
+    @profiled
     def save_to_file(self, file_path):
-        try:
-            # In a real app, you would serialize all element data (type, content, styles, position)
-            # A simple way for now is to save a representation of the elements list
-            with open(file_path, 'w') as f:
-                f.write("Web Design Project File\n")
-                for element in self.elements:
-                    f.write(f"Element: {element['type']}, Content: {element['content']}\n")
-                
+        # Written in the background from a snapshot, so editing can go on
+        # while a large project is saved
+        snapshot = self.document.snapshot()
+        name = os.path.basename(file_path)
+
+        def run(progress):
+            background.atomic_write(file_path, lambda f: f.writelines(
+                background.counted(project_file.iter_project(snapshot), progress)))
+
+        def done(result):
+            # The saved file is the new base of the journal; edits made while
+            # it was written go into the journal's snapshot
+            self.journal.attach(self.document, file_path,
+                                snapshot=self.document.revision != snapshot.revision)
+            self.status_bar.finish_progress(f"Project saved to {name}.")
             messagebox.showinfo("Success", "Project saved successfully!")
-            self.update_status(f"Project saved to {os.path.basename(file_path)}.")
-        except Exception as e:
+
+        def failed(e):
+            self.status_bar.finish_progress("Failed to save project.")
             messagebox.showerror("Error", f"Failed to save project: {str(e)}")
 
+        self.run_in_background(run, f"Saving {name}...", len(snapshot), done, failed)
+
+    def run_in_background(self, run, message, total, on_done, on_error):
+        # total is the expected number of progress steps (roughly one per
+        # element); the status bar shows progress while the job runs
+        self.worker.submit(
+            run,
+            on_start=lambda: self.status_bar.start_progress(message, total),
+            on_progress=lambda done: self.status_bar.step_progress(min(done, total)),
+            on_done=on_done, on_error=on_error)
+
     def undo_action(self):
-        messagebox.showinfo("Undo", "Undo functionality not yet implemented.")
-        self.update_status("Undo action.")
+        if self.history.undo():
+            self.update_status("Undo.")
+        else:
+            self.update_status("Nothing to undo.")
 
     def redo_action(self):
-        messagebox.showinfo("Redo", "Redo functionality not yet implemented.")
-        self.update_status("Redo action.")
+        if self.history.redo():
+            self.update_status("Redo.")
+        else:
+            self.update_status("Nothing to redo.")
+
+    def open_profiler(self):
+        if self.profiler_window is not None and self.profiler_window.winfo_exists():
+            self.profiler_window.lift()
+            return
+        from profiler_panel import ProfilerWindow
+
+        self.profiler_window = ProfilerWindow(self.root)
+
+    def open_stall_window(self):
+        if self.stall_window is not None and self.stall_window.winfo_exists():
+            self.stall_window.lift()
+            return
+        from profiler_panel import StallWindow
+
+        self.stall_window = StallWindow(self.root, self.watchdog)
+
+    def on_stall(self, stall):
+        self.update_status(f"UI was unresponsive for {stall.duration * 1000:.0f} ms ({stall.culprit}).")
+
+    def start_trace(self):
+        profiler.trace = tracing.TraceRecorder()
+
+    def stop_trace(self):
+        recorder, profiler.trace = profiler.trace, None
+        return recorder
+
+    def toggle_trace(self):
+        if self.trace_var.get():
+            self.start_trace()
+            self.update_status("Recording trace...")
+            return
+        recorder = self.stop_trace()
+        if recorder is None:
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Chrome Trace Files", "*.json"), ("All Files", "*.*")])
+        if not file_path:
+            self.update_status("Trace discarded.")
+            return
+        name = os.path.basename(file_path)
+
+        def run(progress):
+            background.atomic_write(file_path, recorder.write)
+
+        def done(result):
+            self.status_bar.finish_progress(f"Trace saved to {name}.")
+
+        def failed(e):
+            self.status_bar.finish_progress("Failed to save trace.")
+            messagebox.showerror("Error", f"Failed to save trace: {str(e)}")
+
+        self.run_in_background(run, f"Saving {name}...", 1, done, failed)
 
     def open_preferences(self):
         messagebox.showinfo("Preferences", "Preferences dialog not yet implemented.")
@@ -456,235 +1024,111 @@ class WebDesignApp:
         messagebox.showinfo("Layout Tools", "Layout tools dialog not yet implemented.")
         self.update_status("Opened layout tools.")
 
+    @profiled
     def apply_global_styles(self):
-        new_bg_color = self.bg_color_entry.get()
+        new_bg_color = self.bg_color_entry.get().strip()
         new_font_family = self.font_family_var.get()
+        error = self.element_properties.check_style("bg_color", new_bg_color)
+        if error:
+            messagebox.showerror("Invalid input", error)
+            return
 
-        self.elements_frame.config(bg=new_bg_color)
-        # Apply font family to existing elements (simplified)
-        for element in self.elements:
-            if element['type'] in ['header', 'paragraph', 'button']:
-                # This is a simplified application. In a real app, you'd access the specific
-                # text widget or label and update its font.
-                # For example, if header_label is accessible:
-                # element['label_widget'].config(font=(new_font_family, element['styles']['font_size']))
-                pass # More detailed implementation needed here
+        # The canvas background follows the document's "settings" event.
+        # Font application to existing elements is still simplified: the
+        # family only affects generated HTML.
+        self.document.update_settings(bg_color=new_bg_color, font_family=new_font_family)
 
         self.update_status(f"Applied global styles: BG={new_bg_color}, Font={new_font_family}")
         messagebox.showinfo("Global Styles", "Global styles applied. (Note: Font application to existing elements is simplified)")
 
+    @profiled
     def update_properties_panel(self):
-        # Clear existing properties
-        for widget in self.element_properties.winfo_children():
-            widget.destroy()
+        self.element_properties.show(self.selected_element)
 
-        if self.selected_element:
-            tk.Label(self.element_properties, text=f"Type: {self.selected_element['type'].capitalize()}",
-                     bg=self.bg_color, fg=self.text_color, font=('Helvetica', 10, 'bold')).pack(pady=5)
-            
-            # Example: display content for editable elements
-            if 'content' in self.selected_element:
-                tk.Label(self.element_properties, text="Content:", bg=self.bg_color).pack(anchor="w")
-                content_entry = tk.Entry(self.element_properties, width=30)
-                content_entry.insert(0, self.selected_element['content'])
-                content_entry.pack(fill="x", pady=2)
-                
-                # You'd add a command to update the element's content here
-                # content_entry.bind("<Return>", lambda e: self.update_element_content(self.selected_element, content_entry.get()))
-
-            # Example: display styles
-            if 'styles' in self.selected_element:
-                tk.Label(self.element_properties, text="Styles:", bg=self.bg_color, font=('Helvetica', 9, 'italic')).pack(anchor="w", pady=(10,0))
-                for style_key, style_value in self.selected_element['styles'].items():
-                    tk.Label(self.element_properties, text=f"  - {style_key}: {style_value}", bg=self.bg_color).pack(anchor="w")
-            
-            # Add more specific property controls based on element type
-            # e.g., for 'header': font size, alignment, color pickers
-            # e.g., for 'image': source path, width, height
-        else:
-            empty_label = tk.Label(self.element_properties, text="No element selected",
-                                 bg=self.bg_color, fg="#7f8c8d")
-            empty_label.pack(pady=20)
+    def apply_element_properties(self, element, content, styles):
+        self.document.update_element(element, content=content, styles=styles)
+        self.update_status(f"Updated {element.type}.")
 
 
     def preview_in_browser(self):
-        # Create temporary HTML file
-        html_content = self.generate_html()
-        temp_file = "preview.html"
-        
-        try:
-            with open(temp_file, 'w') as f:
-                f.write(html_content)
-                
+        # Create temporary HTML file, streamed from a snapshot of the document
+        temp_file = os.path.abspath("preview.html")
+        snapshot = self.document.snapshot()
+        cache = self.fragment_cache
+
+        def run(progress):
+            background.atomic_write(temp_file, lambda f: f.writelines(
+                background.counted(html_export.iter_html(snapshot, cache), progress)))
+
+        def done(result):
             # Open in default browser
-            webbrowser.open(f"file://{os.path.abspath(temp_file)}")
-            self.update_status("Preview opened in browser.")
-        except Exception as e:
+            import webbrowser
+
+            webbrowser.open(f"file://{temp_file}")
+            self.status_bar.finish_progress("Preview opened in browser.")
+
+        def failed(e):
+            self.status_bar.finish_progress("Failed to open preview.")
             messagebox.showerror("Error", f"Failed to open preview: {str(e)}")
-            self.update_status("Failed to open preview.")
+
+        self.run_in_background(run, "Rendering preview...", len(snapshot) + 2, done, failed)
         
-    def export_html(self):
+    def export_html(self, minify=False):
         file_path = filedialog.asksaveasfilename(
             defaultextension=".html",
             filetypes=[("HTML Files", "*.html"), ("All Files", "*.*")])
             
-        if file_path:
-            html_content = self.generate_html()
-            
-            try:
-                with open(file_path, 'w') as f:
-                    f.write(html_content)
-                messagebox.showinfo("Success", "HTML exported successfully!")
-                self.update_status(f"HTML exported to {os.path.basename(file_path)}.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to export HTML: {str(e)}")
-                self.update_status("Failed to export HTML.")
+        if not file_path:
+            return
+        snapshot = self.document.snapshot()
+        external_css = self.external_css_var.get()
+        # The fragment cache is shared with the worker; element versions in
+        # the snapshot keep its entries consistent with what is exported
+        cache = self.fragment_cache
+
+        def run(progress):
+            stylesheet_href = None
+            if external_css:
+                # Rules for the first screen stay inline, the rest goes
+                # into a .css file next to the page
+                css_path = os.path.splitext(file_path)[0] + ".css"
+                background.atomic_write(css_path, lambda f: html_export.write_stylesheet(
+                    snapshot, f, minify=minify))
+                stylesheet_href = os.path.basename(css_path)
+            background.atomic_write(file_path, lambda f: f.writelines(background.counted(
+                html_export.iter_html(snapshot, cache, minify, stylesheet_href), progress)))
+
+        def done(result):
+            self.status_bar.finish_progress(f"HTML exported to {os.path.basename(file_path)}.")
+            messagebox.showinfo("Success", "HTML exported successfully!")
+
+        def failed(e):
+            self.status_bar.finish_progress("Failed to export HTML.")
+            messagebox.showerror("Error", f"Failed to export HTML: {str(e)}")
+
+        self.run_in_background(run, f"Exporting {os.path.basename(file_path)}...", len(snapshot) + 2,
+                               done, failed)
                 
+    @profiled
     def generate_html(self):
-        # Basic HTML template
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>My Web Design</title>
-    <style>
-        body {{
-            font-family: {self.font_family_var.get()}, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: {self.bg_color_entry.get()};
-        }}
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-        }}
-        h1 {{
-            color: #333333;
-            font-size: 18px;
-            font-weight: bold;
-        }}
-        p {{
-            color: #333333;
-            font-size: 12px;
-            line-height: 1.5;
-        }}
-        button {{
-            background-color: {self.accent_color};
-            color: white;
-            padding: 10px 15px;
-            border: none;
-            cursor: pointer;
-            font-size: 12px;
-            font-weight: bold;
-        }}
-        .image-placeholder {{
-            width: 150px;
-            height: 100px;
-            background-color: #f0f0f0;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            border: 1px dashed #ccc;
-            color: #7f8c8d;
-            font-size: 12px;
-        }}
-        .divider {{
-            height: 2px;
-            background-color: #cccccc;
-            margin: 20px 0;
-        }}
-        .form-container {{
-            padding: 20px;
-            border: 1px solid #eee;
-            background-color: #f9f9f9;
-        }}
-        .form-container input[type="text"],
-        .form-container input[type="email"],
-        .form-container textarea {{
-            width: calc(100% - 20px);
-            padding: 8px;
-            margin-bottom: 10px;
-            border: 1px solid #ddd;
-        }}
-        .form-container button {{
-            width: auto;
-            padding: 8px 20px;
-        }}
-        </style>
-        </head>
-        <body>
-        <div class="container">
-"""
-        
-        # Add elements to HTML
-        for element in self.elements:
-            if element['type'] == 'header':
-                # Apply styles from element_data if they exist and are relevant
-                font_size = element['styles'].get('font_size', 18)
-                font_weight = element['styles'].get('font_weight', 'bold')
-                color = element['styles'].get('color', '#333333')
-                html += f"<h1 style=\"font-size: {font_size}px; font-weight: {font_weight}; color: {color};\">{element['content']}</h1>\n"
-            elif element['type'] == 'paragraph':
-                font_size = element['styles'].get('font_size', 12)
-                color = element['styles'].get('color', '#333333')
-                line_height = element['styles'].get('line_height', 1.5)
-                html += f"<p style=\"font-size: {font_size}px; color: {color}; line-height: {line_height};\">{element['content']}</p>\n"
-            elif element['type'] == 'button':
-                bg_color = element['styles'].get('background_color', self.accent_color)
-                text_color = element['styles'].get('color', 'white')
-                font_size = element['styles'].get('font_size', 12)
-                font_weight = element['styles'].get('font_weight', 'bold')
-                html += f"<button style=\"background-color: {bg_color}; color: {text_color}; font-size: {font_size}px; font-weight: {font_weight};\">{element['content']}</button>\n"
-            elif element['type'] == 'image':
-                # In a real app, use element['content'] as the image source
-                html += f"<div class=\"image-placeholder\">{element['content']}</div>\n"
-            elif element['type'] == 'divider':
-                html += "<div class=\"divider\"></div>\n"
-            elif element['type'] == 'form':
-                html += """
-            <div class="form-container">
-                <h2>Contact Form</h2>
-                <form>
-                    <label for="name">Name:</label><br>
-                    <input type="text" id="name" name="name"><br>
-                    <label for="email">Email:</label><br>
-                    <input type="email" id="email" name="email"><br>
-                    <label for="message">Message:</label><br>
-                    <textarea id="message" name="message" rows="5"></textarea><br>
-                    <button type="submit">Submit</button>
-                </form>
-            </div>
-            """
-        
-        html += """
-        </div>
-        </body>
-        </html>"""
-        
-        return html
+        return html_export.generate_html(self.document, self.fragment_cache)
 
 
     def create_status_bar(self):
-        self.status_bar = tk.Label(self.root, text="Ready", bd=1, relief=tk.SUNKEN,
-                                 anchor=tk.W, bg=self.bg_color, fg=self.text_color)
+        self.status_bar = StatusBar(self.root, bg=self.bg_color, fg=self.text_color)
         self.status_bar.grid(row=1, column=0, columnspan=3, sticky="we")
         
 
     def update_status(self, message):
-        self.status_bar.config(text=message)
-        self.root.after(3000, lambda: self.status_bar.config(text="Ready"))
+        if self._batch_depth:
+            self._batch_status = message
+            return
+        self.status_bar.show(message)
 
 # This block ensures the code runs only when the script is executed directly
 if __name__ == "__main__":
     root = tk.Tk()
-    
-    # Set theme (requires ttkthemes package - install with pip install ttkthemes)
-    if ThemedStyle: # Check if ThemedStyle was successfully imported
-        try:
-            style = ThemedStyle(root)
-            style.set_theme("arc") # Or "adapta", "plastik", etc.
-        except Exception as e:
-            print(f"Failed to set theme: {e}")
-            pass # Continue without theme if it fails
-        
     app = WebDesignApp(root)
-    root.mainloop()
\ No newline at end of file
+    # The theme loads its images after the window has been drawn
+    app.after_first_paint(lambda: apply_theme(root))
+    root.mainloop()